@@ -0,0 +1,273 @@
+"""Menu-engineering analytics over the whole order history, with NumPy.
+
+Orders and their lines are bulk-loaded into columnar arrays, and every
+metric is computed over the arrays in one pass - no per-order Python loop.
+The arrays are cached on disk with the highest order id they cover, so a
+repeat run only reads the orders saved since. Months moved out by
+archive.py are read from their archive files. pandas is optional: with it,
+OrderHistory.frames() hands the same arrays over as DataFrames.
+
+    python analytics.py items --top 20
+    python analytics.py hours
+    python analytics.py pairs --top 15
+    python analytics.py ticket
+"""
+import argparse
+import os
+import numpy as np
+import database
+from reports import write_rows
+
+# Bump when the cached arrays change shape or meaning (2: hours in local time)
+CACHE_FORMAT = 2
+
+ORDER_DTYPE = np.dtype([('id', 'i8'), ('hour', 'i1'), ('total', 'f8')])
+LINE_DTYPE = np.dtype([('order_id', 'i8'), ('item_id', 'i4'), ('qty', 'i4'), ('unit_price', 'f8')])
+
+# {schema} is main or an attached archive. order_date is UTC; the hour is local.
+ORDER_ARRAYS_SELECT = """
+    SELECT id, CAST(strftime('%H', order_date, 'localtime') AS INTEGER), total_amount FROM {schema}.orders
+    WHERE id > ? AND id <= ?
+    ORDER BY id
+"""
+LINE_ARRAYS_SELECT = """
+    SELECT order_id, item_id, qty, COALESCE(unit_price, 0) FROM {schema}.order_lines
+    WHERE order_id > ? AND order_id <= ?
+    ORDER BY order_id
+"""
+
+ITEM_COLUMNS = ('Item', 'Orders', 'Quantity', 'Revenue', 'Share %')
+HOUR_COLUMNS = ('Hour', 'Orders', 'Items', 'Revenue', 'Average Ticket')
+PAIR_COLUMNS = ('Item', 'With', 'Orders', 'Support %', 'Confidence %', 'Lift')
+TICKET_COLUMNS = ('Metric', 'Value')
+
+
+def cache_path(db_path):
+    return os.path.splitext(db_path)[0] + '_analytics.npz'
+
+
+def read_arrays(cursor, sql, dtype, after_id, max_id):
+    """Stream a query's rows straight into a structured array"""
+    cursor.execute(sql, (after_id, max_id))
+    return np.fromiter(cursor, dtype=dtype)
+
+
+class OrderHistory:
+    """Every order and order line as NumPy arrays, kept in step with the database.
+
+    orders holds id/hour/total per order and lines holds order_id/item_id/
+    qty/unit_price per line, both sorted by order id. max_order_id is the
+    cache key: anything above it has not been loaded yet.
+    """
+
+    def __init__(self, conn, path=None):
+        self.conn = conn
+        self.path = path
+        self.max_order_id = 0
+        self.orders = np.empty(0, ORDER_DTYPE)
+        self.lines = np.empty(0, LINE_DTYPE)
+        self.loaded = 0   # orders read from the database by the last update()
+        self.item_names = {}
+
+    def load_cache(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as cache:
+                if int(cache['format']) != CACHE_FORMAT:
+                    return False
+                self.orders = cache['orders']
+                self.lines = cache['lines']
+                self.max_order_id = int(cache['max_order_id'])
+        except (OSError, KeyError, ValueError):
+            return False
+        return True
+
+    def save_cache(self):
+        # Write aside and rename, so a crash never leaves half a cache
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(f, format=CACHE_FORMAT, max_order_id=self.max_order_id,
+                     orders=self.orders, lines=self.lines)
+        os.replace(temp_path, self.path)
+
+    def update(self):
+        """Load the cache, then append the orders saved since it was written"""
+        self.load_cache()
+        cursor = self.conn.cursor()
+        # Bound both reads by the same id so orders and lines stay in step.
+        # The sequence also counts orders since moved to the archives.
+        max_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0]
+        sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'orders'").fetchone()
+        max_id = max(max_id, sequence[0] if sequence else 0)
+        if max_id < self.max_order_id:
+            # A different or restored database: start again
+            self.max_order_id = 0
+            self.orders = np.empty(0, ORDER_DTYPE)
+            self.lines = np.empty(0, LINE_DTYPE)
+
+        # Archived orders saved since the cache was written are only in their archives
+        orders, lines = [], []
+        for schema in database.order_schemas(cursor):
+            orders.append(read_arrays(cursor, ORDER_ARRAYS_SELECT.format(schema=schema), ORDER_DTYPE,
+                                      self.max_order_id, max_id))
+            lines.append(read_arrays(cursor, LINE_ARRAYS_SELECT.format(schema=schema), LINE_DTYPE,
+                                     self.max_order_id, max_id))
+        orders, lines = np.concatenate(orders), np.concatenate(lines)
+        if len(orders) and (np.diff(orders['id']) < 0).any():
+            # Ids and months need not agree exactly at an archive boundary
+            orders = np.sort(orders, order='id', kind='stable')
+            lines = lines[np.argsort(lines['order_id'], kind='stable')]
+        self.loaded = len(orders)
+        if len(orders) or max_id != self.max_order_id:
+            self.orders = np.concatenate([self.orders, orders])
+            self.lines = np.concatenate([self.lines, lines])
+            self.max_order_id = max_id
+            if self.path:
+                self.save_cache()
+
+        self.item_names = dict(cursor.execute("SELECT id, name FROM menu_items"))
+        return self
+
+    def item_name(self, item_id):
+        return self.item_names.get(int(item_id), f"#{item_id}")
+
+    def item_revenue(self):
+        """(item ids, orders, quantity, revenue) per item, highest revenue first"""
+        lines = self.lines
+        item_ids, index = np.unique(lines['item_id'], return_inverse=True)
+        orders = np.bincount(index, minlength=len(item_ids))
+        quantity = np.bincount(index, weights=lines['qty'], minlength=len(item_ids)).astype(np.int64)
+        revenue = np.bincount(index, weights=lines['qty'] * lines['unit_price'], minlength=len(item_ids))
+        order = np.argsort(-revenue, kind='stable')
+        return item_ids[order], orders[order], quantity[order], revenue[order]
+
+    def hourly_demand(self):
+        """(orders, items, revenue) for each hour of the day, as 24-long arrays"""
+        hours = self.orders['hour'].astype(np.intp)
+        orders = np.bincount(hours, minlength=24)
+        revenue = np.bincount(hours, weights=self.orders['total'], minlength=24)
+        # Each line takes its order's hour: both arrays are sorted by order id
+        line_orders = np.searchsorted(self.orders['id'], self.lines['order_id'])
+        items = np.bincount(hours[line_orders], weights=self.lines['qty'], minlength=24).astype(np.int64)
+        return orders, items, revenue
+
+    def co_occurrence(self):
+        """(item a, item b, orders with both) for every pair bought together, a < b.
+
+        Lines are grouped by order, so each line is paired with the lines
+        of its own group by index arithmetic rather than a loop over orders.
+        """
+        lines = self.lines
+        if not len(lines):
+            empty = np.empty(0, np.int64)
+            return empty, empty, empty
+        # Start and size of the group each line belongs to
+        starts = np.flatnonzero(np.r_[True, lines['order_id'][1:] != lines['order_id'][:-1]])
+        sizes = np.diff(np.r_[starts, len(lines)])
+        group_start = np.repeat(starts, sizes)
+        group_size = np.repeat(sizes, sizes)
+
+        # Every (line, later line in the same order) pair
+        after = group_start + group_size - np.arange(len(lines)) - 1
+        left = np.repeat(np.arange(len(lines)), after)
+        right = left + 1 + np.arange(after.sum()) - np.repeat(np.cumsum(after) - after, after)
+
+        item_ids = lines['item_id'].astype(np.int64)
+        a = np.minimum(item_ids[left], item_ids[right])
+        b = np.maximum(item_ids[left], item_ids[right])
+        codes, counts = np.unique(a << 32 | b, return_counts=True)
+        return codes >> 32, codes & 0xFFFFFFFF, counts
+
+    def ticket_stats(self):
+        """Average ticket and basket size over every order"""
+        totals = self.orders['total']
+        if not len(totals):
+            return {}
+        return {
+            'orders': len(totals),
+            'revenue': round(float(totals.sum()), 2),
+            'average_ticket': round(float(totals.mean()), 2),
+            'median_ticket': round(float(np.median(totals)), 2),
+            'p90_ticket': round(float(np.percentile(totals, 90)), 2),
+            'items_per_order': round(float(self.lines['qty'].sum()) / len(totals), 2),
+            'dishes_per_order': round(len(self.lines) / len(totals), 2),
+        }
+
+    def frames(self):
+        """The orders and lines as pandas DataFrames (needs pandas)"""
+        try:
+            import pandas
+        except ImportError:
+            raise RuntimeError("DataFrames need pandas (pip install pandas)") from None
+        lines = pandas.DataFrame(self.lines)
+        lines['item'] = lines['item_id'].map(self.item_names)
+        return pandas.DataFrame(self.orders), lines
+
+
+def item_rows(history, top=None):
+    item_ids, orders, quantity, revenue = history.item_revenue()
+    total = revenue.sum() or 1
+    return [(history.item_name(item_id), int(n), int(qty), round(float(rev), 2), round(100 * rev / total, 1))
+            for item_id, n, qty, rev in list(zip(item_ids, orders, quantity, revenue))[:top]]
+
+
+def hour_rows(history):
+    orders, items, revenue = history.hourly_demand()
+    return [(f"{hour:02d}:00", int(orders[hour]), int(items[hour]), round(float(revenue[hour]), 2),
+             round(float(revenue[hour] / orders[hour]), 2))
+            for hour in range(24) if orders[hour]]
+
+
+def pair_rows(history, top=None):
+    """Pairs ranked by how many orders had both, with support, confidence and lift"""
+    a, b, together = history.co_occurrence()
+    order_count = len(history.orders) or 1
+    item_ids, item_orders = np.unique(history.lines['item_id'], return_counts=True)
+    support = dict(zip(item_ids.tolist(), item_orders.tolist()))
+    rows = []
+    for i in np.argsort(-together, kind='stable')[:top]:
+        with_a, with_b, n = support[int(a[i])], support[int(b[i])], int(together[i])
+        rows.append((history.item_name(a[i]), history.item_name(b[i]), n,
+                     round(100 * n / order_count, 2), round(100 * n / with_a, 1),
+                     round(n * order_count / (with_a * with_b), 2)))
+    return rows
+
+
+def ticket_rows(history):
+    return list(history.ticket_stats().items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Menu-engineering analytics over the order history")
+    parser.add_argument('--db', default=database.DB_PATH, help="database file")
+    parser.add_argument('--no-cache', action='store_true', help="read every order instead of the cache")
+    commands = parser.add_subparsers(dest='command', required=True)
+    items = commands.add_parser('items', help="revenue and quantity per menu item")
+    commands.add_parser('hours', help="orders, items and revenue by hour of day")
+    pairs = commands.add_parser('pairs', help="items most often ordered together")
+    commands.add_parser('ticket', help="average ticket and basket size")
+    for command in (items, pairs):
+        command.add_argument('--top', type=int, help="show only the top N rows")
+    for command in commands.choices.values():
+        command.add_argument('--csv', metavar='FILE', help="save the table as CSV")
+    args = parser.parse_args(argv)
+
+    conn = database.connect(args.db)
+    try:
+        history = OrderHistory(conn, None if args.no_cache else cache_path(args.db)).update()
+    finally:
+        conn.close()
+
+    if args.command == 'items':
+        write_rows(ITEM_COLUMNS, item_rows(history, args.top), args.csv)
+    elif args.command == 'hours':
+        write_rows(HOUR_COLUMNS, hour_rows(history), args.csv)
+    elif args.command == 'pairs':
+        write_rows(PAIR_COLUMNS, pair_rows(history, args.top), args.csv)
+    else:
+        write_rows(TICKET_COLUMNS, ticket_rows(history), args.csv)
+
+
+if __name__ == "__main__":
+    main()
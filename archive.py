@@ -0,0 +1,209 @@
+"""Move closed months of orders out of the live database into archive files.
+
+The live database keeps only the hot window - this month and the few
+before it - so its tables, indexes and search index stay the same size
+however many years the restaurant trades. Each older month moves to its
+own archive/orders-YYYY-MM.db holding that month's orders, order lines
+and bill-number search index; customers and the menu stay in the live
+database, which lists the archives in order_archives. History and search
+attach an archive only when paging or searching reaches past the live
+orders (see database.OrderPager); exports, reprints, bill lookups and
+analytics read the archived months their dates reach (database.order_schemas).
+
+The daily rollups are left alone, so sales reports still count archived
+months. Run it when the till is quiet; --vacuum also shrinks the live file,
+which needs every other terminal to be idle while it runs.
+
+    python archive.py run --keep-months 3
+    python archive.py list
+"""
+import argparse
+import datetime
+import os
+import database
+
+ARCHIVE_DIR = 'archive'
+
+# Orders deleted from the live database per write transaction, so other
+# terminals are never kept waiting for long
+DELETE_BATCH = 2000
+
+ARCHIVE_SCHEMA = [
+    '''
+        CREATE TABLE IF NOT EXISTS {schema}.orders (
+            id INTEGER PRIMARY KEY,
+            customer_id INTEGER,
+            bill_number TEXT UNIQUE,
+            order_data TEXT,
+            subtotal REAL,
+            tax_amount REAL,
+            service_charge REAL,
+            total_amount REAL,
+            order_date DATETIME
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS {schema}.order_lines (
+            order_id INTEGER NOT NULL,
+            item_id INTEGER NOT NULL,
+            qty INTEGER NOT NULL,
+            unit_price REAL,
+            PRIMARY KEY (order_id, item_id)
+        ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_orders_customer_date ON orders (customer_id, order_date)',
+    'CREATE INDEX IF NOT EXISTS {schema}.idx_orders_date ON orders (order_date)',
+    '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.orders_fts USING fts5(
+            bill_number, content='orders', content_rowid='id', tokenize='trigram'
+        )
+    ''',
+]
+
+ORDER_COLUMNS = ('id, customer_id, bill_number, order_data, subtotal, tax_amount, '
+                 'service_charge, total_amount, order_date')
+
+
+def month_start(month):
+    """'YYYY-MM' -> 'YYYY-MM-01'"""
+    return month + '-01'
+
+
+def add_months(month, count):
+    year, number = divmod(int(month[:4]) * 12 + int(month[5:7]) - 1 + count, 12)
+    return f"{year:04d}-{number + 1:02d}"
+
+
+def hot_window_start(keep_months, today=None):
+    """First month that stays live when keeping this month and keep_months - 1 before it"""
+    if keep_months < 1:
+        raise ValueError("keep_months must be at least 1")
+    today = today or datetime.date.today()
+    return add_months(f"{today:%Y-%m}", 1 - keep_months)
+
+
+def closed_months(cursor, before_month):
+    """Months with live orders before before_month, oldest first"""
+    months = []
+    cursor.execute("SELECT substr(MIN(order_date), 1, 7) FROM orders WHERE order_date < ?",
+                   (month_start(before_month),))
+    month = cursor.fetchone()[0]
+    while month is not None:
+        months.append(month)
+        cursor.execute("SELECT substr(MIN(order_date), 1, 7) FROM orders WHERE order_date >= ? AND order_date < ?",
+                       (month_start(add_months(month, 1)), month_start(before_month)))
+        month = cursor.fetchone()[0]
+    return months
+
+
+def copy_month(conn, schema, month):
+    """Copy a month's orders and lines into the attached archive and index them"""
+    period = (month_start(month), month_start(add_months(month, 1)))
+    with conn:
+        for statement in ARCHIVE_SCHEMA:
+            conn.execute(statement.format(schema=schema))
+        # OR REPLACE: a month whose earlier run was cut short is copied again
+        conn.execute(f'''
+            INSERT OR REPLACE INTO {schema}.orders ({ORDER_COLUMNS})
+            SELECT {ORDER_COLUMNS} FROM main.orders
+            WHERE order_date >= ? AND order_date < ?
+        ''', period)
+        conn.execute(f'''
+            INSERT OR REPLACE INTO {schema}.order_lines (order_id, item_id, qty, unit_price)
+            SELECT l.order_id, l.item_id, l.qty, l.unit_price
+            FROM main.orders o
+            JOIN main.order_lines l ON l.order_id = o.id
+            WHERE o.order_date >= ? AND o.order_date < ?
+        ''', period)
+        conn.execute(f"INSERT INTO {schema}.orders_fts (orders_fts) VALUES ('rebuild')")
+        return conn.execute(f"SELECT COUNT(*) FROM {schema}.orders").fetchone()[0]
+
+
+def delete_copied(conn, schema, month):
+    """Delete the month's live orders that are safely in the archive, a batch at a time"""
+    period = (month_start(month), month_start(add_months(month, 1)))
+
+    def delete_batch(cursor):
+        cursor.execute(f'''
+            SELECT id FROM main.orders
+            WHERE order_date >= ? AND order_date < ?
+              AND id IN (SELECT id FROM {schema}.orders)
+            LIMIT ?
+        ''', period + (DELETE_BATCH,))
+        ids = cursor.fetchall()
+        cursor.executemany("DELETE FROM main.order_lines WHERE order_id = ?", ids)
+        cursor.executemany("DELETE FROM main.orders WHERE id = ?", ids)
+        return len(ids)
+
+    while database.write_transaction(conn, delete_batch):
+        pass
+
+
+def archive_month(conn, month, directory=ARCHIVE_DIR):
+    """Move one month's orders into its archive file; return the orders it now holds.
+
+    The month is copied and committed to the archive before anything is
+    deleted from the live database, and only listed in order_archives once
+    the last of it is gone, so running again after an interruption
+    finishes the job without losing or duplicating orders.
+    """
+    cursor = conn.cursor()
+    path = os.path.join(directory, f'orders-{month}.db')
+    os.makedirs(os.path.dirname(database.archive_file(cursor, path)), exist_ok=True)
+    schema = database.attach_archive(cursor, month, path)
+    try:
+        orders = copy_month(conn, schema, month)
+        delete_copied(conn, schema, month)
+        database.write_transaction(conn, lambda cursor: cursor.execute(
+            "INSERT OR REPLACE INTO order_archives (month, path, orders) VALUES (?, ?, ?)",
+            (month, path, orders)))
+    finally:
+        cursor.execute(f'DETACH DATABASE {schema}')
+    return orders
+
+
+def archive_closed_months(conn, keep_months=3, directory=ARCHIVE_DIR, today=None, progress=None):
+    """Archive every month older than the hot window; return {month: orders archived}"""
+    archived = {}
+    for month in closed_months(conn.cursor(), hot_window_start(keep_months, today)):
+        archived[month] = archive_month(conn, month, directory)
+        if progress:
+            progress(month, archived[month])
+    return archived
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move closed months of orders into archive files")
+    parser.add_argument('--db', default=database.DB_PATH, help="database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run = commands.add_parser('run', help="archive every month older than the hot window")
+    run.add_argument('--keep-months', type=int, default=3,
+                     help="months kept live, counting the current one (default 3)")
+    run.add_argument('--dir', default=ARCHIVE_DIR, help="archive folder, relative to the database")
+    run.add_argument('--vacuum', action='store_true',
+                     help="shrink the live database file afterwards (other terminals must be idle)")
+    commands.add_parser('list', help="show the archived months")
+    args = parser.parse_args(argv)
+
+    conn = database.connect(args.db)
+    try:
+        cursor = conn.cursor()
+        if args.command == 'list':
+            cursor.execute("SELECT month, path, orders FROM order_archives ORDER BY month")
+            for month, path, orders in cursor.fetchall():
+                file_path = database.archive_file(cursor, path)
+                size = f"{os.path.getsize(file_path) / 1e6:.1f} MB" if os.path.exists(file_path) else "missing"
+                print(f"{month}  {orders:>9} orders  {size:>10}  {path}")
+            return
+
+        archived = archive_closed_months(conn, args.keep_months, args.dir,
+                                         progress=lambda month, orders: print(f"{month}: {orders} orders"))
+        print(f"Archived {len(archived)} months, {sum(archived.values())} orders")
+        if args.vacuum:
+            conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
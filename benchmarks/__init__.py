@@ -0,0 +1,4 @@
+"""Load tests and benchmarks for the billing system.
+
+Run modules from the project root, e.g. ``python -m benchmarks.terminals``.
+"""
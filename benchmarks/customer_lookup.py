@@ -0,0 +1,77 @@
+"""Find Customer benchmark: database lookups against the customer cache.
+
+Seeds a database with customers and orders, then looks customers up the
+way a till does - a few regulars most of the time - with and without the
+cache, saving an order (and so invalidating that customer) every so often.
+
+    python -m benchmarks.customer_lookup --customers 5000 --lookups 20000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import database
+from billing import BillingEngine
+from customer_cache import CustomerCache
+from order_store import OrderStore
+
+
+def seed(conn, customers, orders_each=3):
+    engine = BillingEngine()
+    store = OrderStore(conn, engine.prices)
+    item_names = list(engine.prices)
+    phones = [f'03{number:09d}' for number in range(customers)]
+
+    def write(cursor):
+        for number, phone in enumerate(phones):
+            customer_id = None
+            for n in range(orders_each):
+                order = engine.new_order({name: random.randint(1, 3) for name in random.sample(item_names, 3)})
+                customer_id, order_id = store.write(cursor, f'SEED{number}-{n}', f'Customer {number}', phone,
+                                                    order.to_dict(), order.totals(), customer_id)
+    database.write_transaction(conn, write)
+    return store, engine, phones
+
+
+def run(cache, store, engine, lookups, every, prefix):
+    """Time lookups, saving an order for the customer found every `every` lookups"""
+    elapsed = 0.0
+    for number, phone in enumerate(lookups):
+        started = time.perf_counter()
+        customer = cache.lookup(phone)
+        elapsed += time.perf_counter() - started
+        if every and number % every == 0:
+            order = engine.new_order(dict(customer.last_order))
+            store.save_order(f'{prefix}{number}', customer.name, phone, order.to_dict(), order.totals(), customer.id)
+            cache.forget(customer.id, phone)
+    return len(lookups) / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare customer lookups with and without the cache")
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--save-every', type=int, default=20, help="save an order every N lookups (0: never)")
+    args = parser.parse_args(argv)
+
+    conn = database.connect(os.path.join(tempfile.mkdtemp(), 'customers.db'))
+    store, engine, phones = seed(conn, args.customers)
+    # Regulars: a Pareto-ish spread where a small share of phones gets most lookups
+    weights = [1 / (rank + 1) for rank in range(len(phones))]
+    lookups = random.choices(phones, weights, k=args.lookups)
+
+    uncached = run(CustomerCache(conn, max_size=0), store, engine, lookups, args.save_every, 'DB')
+    cache = CustomerCache(conn)
+    cached = run(cache, store, engine, lookups, args.save_every, 'CACHE')
+    stats = cache.stats()
+    saves = f"an order saved every {args.save_every}" if args.save_every else "no orders saved"
+    print(f"{args.lookups} lookups over {args.customers} customers, {saves}")
+    print(f"database : {uncached:10.0f} lookups/s")
+    print(f"cached   : {cached:10.0f} lookups/s ({cached / uncached:.1f}x, "
+          f"hit rate {stats['hit_rate']:.0%}, {stats['size']} cached)")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
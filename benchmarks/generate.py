@@ -0,0 +1,139 @@
+"""Synthetic restaurant data: fill a database with customers and orders.
+
+Orders are spread over a date range with lunch and dinner peaks, most of
+them from a small set of regulars, each with one to eight dishes weighted
+towards the popular ones - the same order_data, order_lines, search index
+and rollups a real till writes. The same seed always gives the same data.
+
+    python -m benchmarks.generate --customers 100000 --orders 1000000 --db big.db
+"""
+import argparse
+import datetime
+import json
+import random
+import time
+import database
+from billing import BILL_PREFIX
+from menu_catalog import MenuCatalog
+
+FIRST_NAMES = ['Ahmed', 'Ali', 'Ayesha', 'Bilal', 'Fatima', 'Hamza', 'Hassan', 'Hina', 'Imran', 'Maryam',
+               'Nadia', 'Omar', 'Saad', 'Sana', 'Usman', 'Zainab', 'Zara', 'Kamran', 'Asad', 'Mehwish']
+LAST_NAMES = ['Khan', 'Ahmed', 'Malik', 'Qureshi', 'Sheikh', 'Butt', 'Chaudhry', 'Raza', 'Siddiqui',
+              'Hussain', 'Mirza', 'Abbasi', 'Jaffrey', 'Rizvi', 'Iqbal']
+
+# Relative order volume by hour of day: lunch and dinner rushes
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 0, 1, 2, 3, 5, 12, 15, 10, 5, 4, 6, 10, 16, 18, 14, 8, 3]
+DISHES_WEIGHTS = [0, 15, 30, 25, 14, 8, 4, 2, 2]   # orders with 0..8 distinct dishes
+QTY_WEIGHTS = [0, 75, 18, 7]                       # 1..3 of a dish
+
+# Triggers dropped for the bulk load; the migrations that own them put them back
+BULK_TRIGGERS = ['customers_fts_insert', 'orders_fts_insert', 'daily_sales_insert', 'daily_item_sales_insert']
+
+
+def customer_rows(rng, customers, start):
+    for number in range(1, customers + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        phone = f"03{rng.randint(0, 49):02d}{number:07d}"
+        created = start + datetime.timedelta(days=rng.randint(0, 30))
+        yield number, name, phone, created.isoformat()
+
+
+def order_rows(rng, customers, orders, start, days, items, engine):
+    """Yield (order row, line rows) pairs in date order"""
+    item_names = [item.name for item in items]
+    item_ids = {item.name: item.id for item in items}
+    # A few dishes sell far more than the rest
+    popularity = [1 / (rank + 1) ** 0.8 for rank in range(len(items))]
+    rng.shuffle(popularity)
+
+    order_id = 0
+    for day in range(days):
+        date = start + datetime.timedelta(days=day)
+        count = orders * (day + 1) // days - orders * day // days
+        hours = sorted(rng.choices(range(24), HOUR_WEIGHTS, k=count))
+        seconds = sorted(hour * 3600 + rng.randrange(3600) for hour in hours)
+        for second in seconds:
+            order_id += 1
+            dishes = rng.choices(range(len(DISHES_WEIGHTS)), DISHES_WEIGHTS)[0]
+            chosen = set(rng.choices(item_names, popularity, k=dishes))
+            order_data = {name: rng.choices(range(len(QTY_WEIGHTS)), QTY_WEIGHTS)[0] for name in chosen}
+            subtotal, tax, service_charge, total = engine.totals(
+                sum(engine.prices[name] * qty for name, qty in order_data.items()))
+            # Regulars: low customer ids get most of the orders
+            customer_id = 1 + int(customers * rng.random() ** 2)
+            placed = datetime.datetime.combine(date, datetime.time()) + datetime.timedelta(seconds=second)
+            # Numbered the way a till numbers them (ids are consecutive, so never repeat within a second)
+            bill_number = f"{BILL_PREFIX}{placed:%Y%m%d%H%M%S}01{order_id % 10000:04d}"
+            # Hours above are local; order_date is stored in UTC like CURRENT_TIMESTAMP
+            order_date = placed.astimezone(datetime.timezone.utc)
+            yield ((order_id, customer_id, bill_number, json.dumps(order_data),
+                    subtotal, tax, service_charge, total, f"{order_date:%Y-%m-%d %H:%M:%S}"),
+                   [(order_id, item_ids[name], qty, engine.prices[name]) for name, qty in order_data.items()])
+
+
+def generate(db_path, customers, orders, days=365, end_date='2025-12-31', seed=0, batch=20000, progress=None):
+    """Create db_path holding the given number of customers and orders"""
+    rng = random.Random(seed)
+    end = datetime.date.fromisoformat(end_date)
+    start = end - datetime.timedelta(days=days - 1)
+
+    conn = database.connect(db_path)
+    catalog = MenuCatalog(conn)
+    engine = catalog.engine()
+    items = [item for item in catalog.items.values() if item.available]
+    cursor = conn.cursor()
+    if cursor.execute("SELECT EXISTS (SELECT 1 FROM orders)").fetchone()[0]:
+        raise RuntimeError(f"{db_path} already has orders")
+
+    # Bulk load without the per-row triggers, then rebuild what they maintain
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute("BEGIN")
+    for trigger in BULK_TRIGGERS:
+        cursor.execute(f"DROP TRIGGER {trigger}")
+    cursor.executemany("INSERT INTO customers (id, name, phone, created_date) VALUES (?, ?, ?, ?)",
+                       customer_rows(rng, customers, start))
+
+    order_batch, line_batch = [], []
+    for order, lines in order_rows(rng, customers, orders, start, days, items, engine):
+        order_batch.append(order)
+        line_batch.extend(lines)
+        if len(order_batch) >= batch:
+            write_batch(cursor, order_batch, line_batch)
+            if progress:
+                progress(order[0])
+            order_batch, line_batch = [], []
+    write_batch(cursor, order_batch, line_batch)
+
+    database.create_search_index(cursor)
+    database.create_sales_rollups(cursor)
+    cursor.execute("COMMIT")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    conn.close()
+
+
+def write_batch(cursor, orders, lines):
+    cursor.executemany("""
+        INSERT INTO orders (id, customer_id, bill_number, order_data, subtotal, tax_amount,
+                            service_charge, total_amount, order_date)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, orders)
+    cursor.executemany("INSERT INTO order_lines (order_id, item_id, qty, unit_price) VALUES (?, ?, ?, ?)", lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill a database with synthetic customers and orders")
+    parser.add_argument('--db', required=True, help="database file to create")
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help="days of trading the orders cover")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    generate(args.db, args.customers, args.orders, args.days, seed=args.seed,
+             progress=lambda done: print(f"\r{done} orders", end='', flush=True))
+    print(f"\r{args.orders} orders, {args.customers} customers in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
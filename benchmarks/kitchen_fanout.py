@@ -0,0 +1,107 @@
+"""Kitchen ticket fan-out benchmark: delivery latency to many displays.
+
+Starts a kitchen server, connects the requested number of displays plus
+a few stalled ones that never read, and sends orders through a till's
+KitchenPublisher at a steady rate. Reports how long each ticket took
+from send() to arriving at every display, and how many stalled displays
+the server disconnected instead of letting them hold the rest up.
+
+    python -m benchmarks.kitchen_fanout --displays 200 --orders 2000 --rate 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import time
+from billing import BillingEngine
+from kitchen import KitchenPublisher, KitchenServer, encode, open_connection
+
+LAST_BILL = 'KOT-END'
+
+
+async def display(address, latencies):
+    """Record each event's delivery latency until the closing ticket arrives"""
+    reader, writer = await open_connection(address)
+    writer.write(encode({'role': 'display'}))
+    async for line in reader:
+        event = json.loads(line)
+        if event['type'] == 'snapshot':
+            continue
+        if event['bill'] == LAST_BILL:
+            break
+        latencies.append(time.time() - event['sent'])
+    writer.close()
+
+
+def stalled_display(port):
+    """A display that connects and then never reads, with a tiny receive buffer"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(('127.0.0.1', port))
+    sock.sendall(encode({'role': 'display'}))
+    return sock
+
+
+async def run(displays, stalled, orders, rate, updates):
+    server = KitchenServer()
+    await server.start('127.0.0.1:0')
+    port = server.server.sockets[0].getsockname()[1]
+    address = f'127.0.0.1:{port}'
+
+    latencies = []
+    tasks = [asyncio.create_task(display(address, latencies)) for _ in range(displays)]
+    stuck = [stalled_display(port) for _ in range(stalled)]
+    while len(server.displays) < displays + stalled:
+        await asyncio.sleep(0.01)
+
+    # The till's publisher runs on its own thread, as in the GUI
+    publisher = KitchenPublisher(address, 'bench')
+    items = list(BillingEngine().prices)
+    rng = random.Random(0)
+    started = time.perf_counter()
+    open_orders = []
+    for number in range(orders):
+        order = {name: rng.randint(1, 3) for name in rng.sample(items, 3)}
+        open_orders.append((f'KOT{number:06d}', order))
+        publisher.send(open_orders[-1][0], 'Benchmark Customer', order)
+        if rng.random() < updates:
+            # A cashier adds one more of something to an earlier bill and sends it again
+            bill, order = rng.choice(open_orders[-20:-1] or open_orders)
+            name = rng.choice(items)
+            order[name] = order.get(name, 0) + 1
+            publisher.send(bill, 'Benchmark Customer', order)
+        await asyncio.sleep(max(started + (number + 1) / rate - time.perf_counter(), 0))
+    publisher.send(LAST_BILL, 'Benchmark Customer', {items[0]: 1})
+    await asyncio.wait_for(asyncio.gather(*tasks), 60)
+    elapsed = time.perf_counter() - started
+
+    publisher.close()
+    for sock in stuck:
+        sock.close()
+    await server.close()
+    return latencies, server.dropped, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure kitchen ticket delivery to many displays")
+    parser.add_argument('--displays', type=int, default=200)
+    parser.add_argument('--stalled', type=int, default=3, help="displays that never read")
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=200, help="orders sent per second")
+    parser.add_argument('--updates', type=float, default=0.5,
+                        help="chance each order is followed by a change to an earlier bill")
+    args = parser.parse_args(argv)
+
+    latencies, dropped, elapsed = asyncio.run(run(args.displays, args.stalled, args.orders, args.rate,
+                                                  args.updates))
+    latencies.sort()
+    ms = lambda fraction: latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000
+    print(f"{len(latencies)} deliveries to {args.displays} displays in {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.0f}/s)")
+    print(f"latency p50 {ms(0.5):.1f} ms  p99 {ms(0.99):.1f} ms  max {latencies[-1] * 1000:.1f} ms")
+    print(f"stalled displays disconnected: {dropped} of {args.stalled}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Load test for the order API running on localhost.
+
+Opens --concurrency keep-alive connections and sends a mix of requests as
+fast as the API answers them: new orders (some from returning customers),
+customer lookups and bill fetches for orders placed earlier in the run.
+Prints the throughput and the latency of each kind of request.
+
+    python order_api.py --db load.db --port 8080 &
+    python -m benchmarks.order_api_load --url http://127.0.0.1:8080 --requests 20000 --concurrency 50
+"""
+import argparse
+import asyncio
+import collections
+import json
+import random
+import time
+import urllib.parse
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.writer.write((f"{method} {urllib.parse.quote(path)} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode()
+                          + body)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class LoadTest:
+    def __init__(self, host, port, mix, seed=0):
+        self.host = host
+        self.port = port
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.rng = random.Random(seed)
+        self.items = []
+        self.phones = []   # customers who have ordered during the run
+        self.bills = []
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+
+    def new_order(self):
+        if self.phones and self.rng.random() < 0.5:
+            phone = self.rng.choice(self.phones)
+        else:
+            phone = f"03{self.rng.randrange(10 ** 9):09d}"
+        items = {item: self.rng.randint(1, 3) for item in self.rng.sample(self.items, 3)}
+        return {'name': 'Load Test Customer', 'phone': phone, 'items': items}
+
+    async def one(self, client):
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        if kind != 'order' and not self.bills:
+            kind = 'order'
+        if kind == 'order':
+            payload = self.new_order()
+            method, path = 'POST', '/orders'
+        elif kind == 'customer':
+            payload, method, path = None, 'GET', f'/customers/{self.rng.choice(self.phones)}'
+        else:
+            payload, method, path = None, 'GET', f'/bills/{self.rng.choice(self.bills)}'
+        started = time.perf_counter()
+        status, result = await client.request(method, path, payload)
+        self.latencies[kind].append(time.perf_counter() - started)
+        if status >= 400:
+            self.errors[f"{kind} {status}"] += 1
+        elif kind == 'order':
+            self.phones.append(payload['phone'])
+            self.bills.append(result['bill_number'])
+
+    async def worker(self, remaining):
+        client = Client(self.host, self.port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                await self.one(client)
+        finally:
+            client.close()
+
+    async def run(self, requests, concurrency):
+        client = Client(self.host, self.port)
+        status, menu = await client.request('GET', '/menu')
+        client.close()
+        self.items = [item for items in menu.values() for item in items]
+        remaining = [requests]
+        started = time.perf_counter()
+        await asyncio.gather(*(self.worker(remaining) for _ in range(concurrency)))
+        return time.perf_counter() - started
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the order API")
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=50, help="simultaneous keep-alive connections")
+    parser.add_argument('--mix', default='order=0.4,customer=0.4,bill=0.2', help="share of each request kind")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    url = urllib.parse.urlsplit(args.url)
+    test = LoadTest(url.hostname, url.port or 80, parse_mix(args.mix), args.seed)
+    elapsed = asyncio.run(test.run(args.requests, args.concurrency))
+
+    total = sum(len(latencies) for latencies in test.latencies.values())
+    print(f"{total} requests over {args.concurrency} connections in {elapsed:.1f}s: {total / elapsed:.0f} req/s")
+    for kind, latencies in sorted(test.latencies.items()):
+        latencies.sort()
+        ms = lambda fraction: latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000
+        print(f"{kind:<9} {len(latencies):>7}  p50 {ms(0.5):7.1f} ms  p95 {ms(0.95):7.1f} ms  "
+              f"p99 {ms(0.99):7.1f} ms")
+    for error, count in sorted(test.errors.items()):
+        print(f"error {error}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""PDF render benchmark: cell-by-cell FPDF layout against the cached template.
+
+Renders the same 50-line bill repeatedly on one core with each renderer
+and reports bills per second.
+
+    python -m benchmarks.pdf_render --lines 50 --bills 300
+"""
+import argparse
+import os
+import tempfile
+import time
+import bill_pdf
+from billing import BillingEngine
+
+
+def sample_job(filename, lines):
+    menu = {'Benchmark': {f'Menu Item Number {number}': 150 + number * 10 for number in range(lines)}}
+    engine = BillingEngine(menu)
+    order = engine.new_order({name: index % 4 + 1 for index, name in enumerate(engine.prices)})
+    return bill_pdf.bill_job(filename, 'BILL20250101120000010001', 'Benchmark Customer',
+                             '03001234567', order)
+
+
+def bills_per_second(render, job, bills):
+    render(job)  # Warm up (builds the template on its first call)
+    started = time.perf_counter()
+    for _ in range(bills):
+        render(job)
+    return bills / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare PDF bill render speed")
+    parser.add_argument('--lines', type=int, default=50, help="line items per bill")
+    parser.add_argument('--bills', type=int, default=300, help="bills rendered per renderer")
+    args = parser.parse_args(argv)
+
+    job = sample_job(os.path.join(tempfile.mkdtemp(), 'bill.pdf'), args.lines)
+    before = bills_per_second(bill_pdf.render_bill_direct, job, args.bills)
+    after = bills_per_second(bill_pdf.render_bill, job, args.bills)
+    print(f"{args.lines}-line bill, {args.bills} renders each")
+    print(f"cell by cell : {before:8.1f} bills/s")
+    print(f"template     : {after:8.1f} bills/s ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
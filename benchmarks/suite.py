@@ -0,0 +1,289 @@
+"""Timed scenarios for the till's hot paths at several database sizes.
+
+Each scenario runs what one GUI action runs - the same queries, cache,
+store and PDF renderer, without the Tk widgets - against a generated
+database of each requested size. Results go to a JSON file so two
+versions can be compared; compare exits non-zero when a scenario got
+slower than the threshold, which makes regressions easy to spot in CI.
+
+    python -m benchmarks.suite run --sizes 10k,1m -o results.json
+    python -m benchmarks.suite compare before.json after.json
+
+Generated databases are kept in --data-dir and reused by later runs;
+the orders save_order adds are deleted again after it is timed.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import database
+from benchmarks.generate import generate
+from billing import BillNumberGenerator
+from customer_cache import CustomerCache
+from menu_catalog import MenuCatalog
+from order_store import OrderStore
+
+SIZE_SUFFIXES = {'k': 1000, 'm': 1000000}
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1:] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def percentile(sorted_values, fraction):
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def time_scenario(step, draw, repeat, warmup=3):
+    """Call step(input) repeat times and summarise the latencies in milliseconds.
+
+    Inputs are drawn before the clock starts, so only the step is timed.
+    """
+    inputs = [draw() for _ in range(warmup + repeat)]
+    for value in inputs[:warmup]:
+        step(value)
+    latencies = []
+    for value in inputs[warmup:]:
+        started = time.perf_counter()
+        step(value)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        'runs': repeat,
+        'mean_ms': round(total / repeat * 1000, 4),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 4),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 4),
+        'max_ms': round(latencies[-1] * 1000, 4),
+        'ops_per_s': round(repeat / total, 1),
+    }
+
+
+class Scenarios:
+    """The timed steps, each drawing its inputs from one seeded generator"""
+
+    def __init__(self, conn, generated_orders, seed=0):
+        self.conn = conn
+        self.generated_orders = generated_orders
+        self.cursor = conn.cursor()
+        self.rng = random.Random(seed)
+        catalog = MenuCatalog(conn)
+        self.engine = catalog.engine()
+        self.store = OrderStore(conn, self.engine.prices, catalog.ids)
+        self.bill_numbers = BillNumberGenerator(99)
+        self.customer_count = self.cursor.execute("SELECT MAX(id) FROM customers").fetchone()[0]
+        self.phones = {}
+        # Inputs come from the generated orders only (ids 1..generated_orders)
+        self.bills = [row[0] for row in self.cursor.execute(
+            "SELECT bill_number FROM orders WHERE id <= ? ORDER BY id DESC LIMIT 1000", (generated_orders,))]
+        self.pdf_dir = tempfile.mkdtemp()
+
+    def phone(self):
+        """A customer's phone, regulars more often than not (as the generator orders)"""
+        customer_id = 1 + int(self.customer_count * self.rng.random() ** 2)
+        if customer_id not in self.phones:
+            self.phones[customer_id] = self.cursor.execute(
+                "SELECT phone FROM customers WHERE id = ?", (customer_id,)).fetchone()[0]
+        return self.phones[customer_id]
+
+    def build(self):
+        """Return {name: (step, draw)} for every scenario that can run here.
+
+        draw() makes one input and step(input) is the timed action.
+        """
+        cache = CustomerCache(self.conn)
+        uncached = CustomerCache(self.conn, max_size=0)
+        items = list(self.engine.prices)
+        cursor = self.cursor
+        fixed = lambda value: (lambda: value)
+        scenarios = {
+            'find_customer': (cache.lookup, self.phone),
+            'find_customer_uncached': (uncached.lookup, self.phone),
+            'save_order': (self.save_order, lambda: self.random_order(items)),
+            'load_order_history': (lambda _: database.OrderPager(cursor).first(), fixed(None)),
+            'search_orders_name': (lambda term: database.order_search_pager(cursor, term).first(),
+                                   fixed('Jaffrey')),
+            'search_orders_phone': (lambda term: database.order_search_pager(cursor, term).first(),
+                                    lambda: self.phone()[-5:]),
+            'search_orders_bill': (lambda term: database.order_search_pager(cursor, term).first(),
+                                   lambda: self.rng.choice(self.bills)[:14]),
+            'search_customers_name': (lambda term: database.search_customers(cursor, term),
+                                      fixed('Zainab Rizvi')),
+            'search_customers_phone': (lambda term: database.search_customers(cursor, term),
+                                       lambda: self.phone()[-6:]),
+        }
+        try:
+            import fpdf  # noqa: F401 - only checking the PDF library is installed
+        except ImportError:
+            print("fpdf is not installed: skipping generate_pdf", file=sys.stderr)
+        else:
+            scenarios['generate_pdf'] = (self.generate_pdf, lambda: self.rng.choice(self.bills))
+        return scenarios
+
+    def random_order(self, items):
+        order = self.engine.new_order({name: self.rng.randint(1, 3) for name in self.rng.sample(items, 3)})
+        return self.phone(), order
+
+    def save_order(self, phone_and_order):
+        phone, order = phone_and_order
+        self.store.save_order(self.bill_numbers.next(), 'Benchmark Customer', phone,
+                              order.to_dict(), order.totals())
+
+    def discard_saved_orders(self):
+        """Delete the orders save_order added, so every run sees the same data"""
+        def discard(cursor):
+            first_day = cursor.execute("SELECT date(MIN(order_date), 'localtime') FROM orders WHERE id > ?",
+                                       (self.generated_orders,)).fetchone()[0]
+            if first_day is None:
+                return
+            cursor.execute("DELETE FROM order_lines WHERE order_id > ?", (self.generated_orders,))
+            cursor.execute("DELETE FROM orders WHERE id > ?", (self.generated_orders,))
+            database.rebuild_daily_sales(cursor, first_day)
+        database.write_transaction(self.conn, discard)
+
+    def generate_pdf(self, bill_number):
+        """Reprint a saved bill: load it and render the PDF"""
+        import bill_pdf
+        bill_number, name, phone, date, lines, totals = next(
+            database.iter_saved_bills(self.cursor, bill_numbers=[bill_number]))
+        bill_pdf.render_bill(bill_pdf.BillJob(os.path.join(self.pdf_dir, 'bill.pdf'),
+                                              bill_number, name, phone, date, lines, totals))
+
+
+def prepare_database(data_dir, orders, seed):
+    """Path of a generated database with this many orders, creating it if needed"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'orders-{orders}-seed{seed}.db')
+    if os.path.exists(path):
+        return path, None
+    started = time.perf_counter()
+    print(f"generating {orders} orders into {path}...", file=sys.stderr)
+    try:
+        generate(path, max(orders // 10, 100), orders, seed=seed)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, round(time.perf_counter() - started, 1)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat, data_dir, seed=0, only=None, label=None):
+    results = {
+        'label': label or git_commit() or 'unknown',
+        'commit': git_commit(),
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'sizes': {},
+    }
+    for orders in sizes:
+        path, generate_seconds = prepare_database(data_dir, orders, seed)
+        conn = database.connect(path)
+        try:
+            bench = Scenarios(conn, orders, seed)
+            bench.discard_saved_orders()   # left behind by an interrupted run
+            scenarios = bench.build()
+            size = {
+                'orders': conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0],
+                'customers': conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0],
+                'generate_seconds': generate_seconds,
+                'scenarios': {},
+            }
+            for name, (step, draw) in scenarios.items():
+                if only and name not in only:
+                    continue
+                stats = time_scenario(step, draw, repeat)
+                if name == 'save_order':
+                    bench.discard_saved_orders()
+                size['scenarios'][name] = stats
+                print(f"{orders:>10} {name:<24} p50 {stats['p50_ms']:9.3f} ms  "
+                      f"p99 {stats['p99_ms']:9.3f} ms  {stats['ops_per_s']:10.1f}/s", file=sys.stderr)
+        finally:
+            conn.close()
+        results['sizes'][str(orders)] = size
+    return results
+
+
+def compare(before, after, threshold=0.2):
+    """Print each scenario's p50 change; return the (size, scenario) pairs that slowed down"""
+    regressions = []
+    print(f"{'orders':>10} {'scenario':<24} {'before':>10} {'after':>10} {'change':>8}")
+    for size, old in before['sizes'].items():
+        new = after['sizes'].get(size)
+        if new is None:
+            continue
+        for name, old_stats in old['scenarios'].items():
+            new_stats = new['scenarios'].get(name)
+            if new_stats is None:
+                continue
+            ratio = new_stats['p50_ms'] / old_stats['p50_ms'] if old_stats['p50_ms'] else 1.0
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  SLOWER'
+                regressions.append((size, name))
+            elif ratio < 1 / (1 + threshold):
+                flag = '  faster'
+            print(f"{size:>10} {name:<24} {old_stats['p50_ms']:>8.3f}ms {new_stats['p50_ms']:>8.3f}ms "
+                  f"{(ratio - 1) * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the till's hot paths at several database sizes")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="run the scenarios and save the results")
+    run_parser.add_argument('--sizes', default='10k', help="comma-separated order counts, e.g. 10k,1m,10m")
+    run_parser.add_argument('--repeat', type=int, default=200, help="timed calls per scenario")
+    run_parser.add_argument('--scenario', action='append', help="run only this scenario (repeatable)")
+    run_parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'restaurant-benchmarks'),
+                            help="where generated databases are kept")
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--label', help="name for this run (default: the git commit)")
+    run_parser.add_argument('-o', '--output', default='benchmark_results.json', help="results file")
+    compare_parser = commands.add_parser('compare', help="compare two results files")
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help="slowdown in p50 that counts as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        sizes = [parse_size(size) for size in args.sizes.split(',')]
+        results = run(sizes, args.repeat, args.data_dir, args.seed, args.scenario, args.label)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}", file=sys.stderr)
+        return
+
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+    regressions = compare(before, after, args.threshold)
+    if regressions:
+        parser.exit(1, f"{len(regressions)} scenario(s) slower by more than {args.threshold:.0%}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Multi-terminal load test: several billing stations on one database.
+
+Each terminal is a separate process that registers itself, issues its own
+bill numbers and saves orders as fast as it can through OrderStore, while
+also running the history and last-order reads a till does between bills.
+Every save is announced on the change feed and each terminal counts the
+notifications it hears from the others.
+
+    python -m benchmarks.terminals --terminals 8 --seconds 10
+    python -m benchmarks.terminals --terminals 8 --seconds 10 --wal
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import database
+from billing import BillingEngine, BillNumberGenerator
+from change_feed import ChangeNotifier
+from order_store import OrderStore
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_terminal(number, db_path, seconds, start_at, results):
+    """Body of one terminal process"""
+    conn = database.connect(db_path)
+    engine = BillingEngine()
+    store = OrderStore(conn, engine.prices)
+    bill_numbers = BillNumberGenerator(database.register_terminal(conn, f'load-{number}'))
+    cursor = conn.cursor()
+    item_names = list(engine.prices)
+
+    heard = []
+    feed = ChangeNotifier()
+    listening = feed.listen(lambda table, key: heard.append(table))
+
+    # Start every terminal at the same moment
+    time.sleep(max(0, start_at - time.time()))
+    save_latencies = []
+    read_latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        order = engine.new_order({name: random.randint(1, 3)
+                                  for name in random.sample(item_names, random.randint(1, 6))})
+        phone = f'03{number:02d}{random.randint(0, 99999):07d}'
+
+        started = time.perf_counter()
+        try:
+            store.save_order(bill_numbers.next(), f'Load Customer {phone}', phone,
+                             order.to_dict(), order.totals())
+        except Exception:
+            errors += 1
+            continue
+        save_latencies.append(time.perf_counter() - started)
+        feed.publish('orders')
+
+        # What a till reads between bills: newest history page and a last-order lookup
+        started = time.perf_counter()
+        database.OrderPager(cursor).first()
+        customer = cursor.execute(database.CUSTOMER_BY_PHONE_SQL, (phone,)).fetchone()
+        cursor.execute(database.LAST_ORDER_SQL, (customer[0],)).fetchone()
+        read_latencies.append(time.perf_counter() - started)
+
+    # Give the last notifications time to arrive
+    time.sleep(0.5)
+    feed.close()
+    conn.close()
+    results.put({
+        'terminal': number,
+        'saves': len(save_latencies),
+        'errors': errors,
+        'save_latencies': save_latencies,
+        'read_latencies': read_latencies,
+        'notifications': len(heard) if listening else None,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test several terminals sharing one database")
+    parser.add_argument('--terminals', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--db', help="database file (default: a fresh temporary file)")
+    parser.add_argument('--wal', action='store_true', help="switch the database to WAL mode first")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'terminals.db')
+    conn = database.connect(db_path)
+    if args.wal:
+        database.set_journal_mode(conn, True)
+    print(f"journal mode: {database.journal_mode(conn)}")
+    conn.close()
+
+    results = multiprocessing.Queue()
+    start_at = time.time() + 1
+    processes = [multiprocessing.Process(target=run_terminal,
+                                         args=(n, db_path, args.seconds, start_at, results))
+                 for n in range(1, args.terminals + 1)]
+    for process in processes:
+        process.start()
+    reports = sorted((results.get() for _ in processes), key=lambda r: r['terminal'])
+    for process in processes:
+        process.join()
+
+    total_saves = sum(r['saves'] for r in reports)
+    total_errors = sum(r['errors'] for r in reports)
+    print(f"{'terminal':>8} {'saves':>7} {'errors':>6} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'heard':>7}")
+    for r in reports:
+        latencies = sorted(r['save_latencies'])
+        heard = '-' if r['notifications'] is None else r['notifications']
+        print(f"{r['terminal']:>8} {r['saves']:>7} {r['errors']:>6} "
+              f"{percentile(latencies, 0.5) * 1000:>7.2f} {percentile(latencies, 0.99) * 1000:>7.2f} "
+              f"{(latencies[-1] if latencies else 0) * 1000:>7.2f} {heard:>7}")
+
+    saves = sorted(latency for r in reports for latency in r['save_latencies'])
+    reads = sorted(latency for r in reports for latency in r['read_latencies'])
+    print(f"\n{args.terminals} terminals, {args.seconds:g}s: {total_saves} orders "
+          f"({total_saves / args.seconds:.0f}/s), {total_errors} failed saves")
+    print(f"save latency  p50 {percentile(saves, 0.5) * 1000:.2f} ms, p99 {percentile(saves, 0.99) * 1000:.2f} ms")
+    print(f"read latency  p50 {percentile(reads, 0.5) * 1000:.2f} ms, p99 {percentile(reads, 0.99) * 1000:.2f} ms")
+
+    # Every order must be there exactly once
+    conn = database.connect(db_path)
+    stored, distinct = conn.execute("SELECT COUNT(*), COUNT(DISTINCT bill_number) FROM orders").fetchone()
+    conn.close()
+    print(f"orders in database: {stored} ({distinct} distinct bill numbers)")
+    if total_errors or stored != total_saves or distinct != stored:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
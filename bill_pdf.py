@@ -0,0 +1,338 @@
+"""PDF bill writer built on FPDF, with a background worker pool"""
+import collections
+import concurrent.futures
+import datetime
+import functools
+import itertools
+import os
+import queue
+
+# Everything needed to render one bill, as plain picklable data
+BillJob = collections.namedtuple('BillJob', ['filename', 'bill_number', 'customer_name',
+                                             'customer_phone', 'date', 'lines', 'totals'])
+
+
+def bill_job(filename, bill_number, customer_name, customer_phone, order, date=None):
+    """Snapshot a priced order into a BillJob"""
+    if date is None:
+        date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return BillJob(filename, bill_number, customer_name, customer_phone, date,
+                   order.lines(), tuple(order.totals()))
+
+
+def write_bill_pdf(filename, bill_number, customer_name, customer_phone, order, date=None):
+    """Render a priced order to a PDF bill"""
+    return render_bill(bill_job(filename, bill_number, customer_name, customer_phone, order, date))
+
+
+# Fonts in the order the layout first uses them, so every document numbers them alike
+FONTS = (('Arial', 'B', 10), ('Arial', '', 9))
+
+# Marks a per-bill field inside the cached header
+SLOT = '\x00'
+
+
+def draw_header(pdf, bill_number, date, customer_name, customer_phone):
+    """Restaurant header, bill details and the item table heading"""
+    pdf.set_font('Arial', 'B', 16)
+
+    # Header
+    pdf.cell(0, 10, 'PAKISTANI & CHINESE RESTAURANT', 0, 1, 'C')
+    pdf.set_font('Arial', '', 12)
+    pdf.cell(0, 8, 'Authentic Pakistani Cuisine & Chinese Delicacies', 0, 1, 'C')
+    pdf.ln(5)
+
+    # Bill details
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(0, 6, f'Bill Number: {bill_number}', 0, 1)
+    pdf.cell(0, 6, f'Date: {date}', 0, 1)
+    pdf.cell(0, 6, f'Customer: {customer_name}', 0, 1)
+    pdf.cell(0, 6, f'Phone: {customer_phone}', 0, 1)
+    pdf.ln(5)
+
+    # Table header
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(100, 8, 'ITEM', 1, 0, 'C')
+    pdf.cell(20, 8, 'QTY', 1, 0, 'C')
+    pdf.cell(30, 8, 'PRICE', 1, 0, 'C')
+    pdf.cell(30, 8, 'TOTAL', 1, 1, 'C')
+
+    # Items
+    pdf.set_font('Arial', '', 9)
+
+
+def draw_item_row(pdf, item_name, qty, price, total_price):
+    pdf.cell(100, 6, item_name[:35], 1, 0, 'L')
+    pdf.cell(20, 6, str(qty), 1, 0, 'C')
+    pdf.cell(30, 6, f'Rs. {price}', 1, 0, 'R')
+    pdf.cell(30, 6, f'Rs. {total_price}', 1, 1, 'R')
+
+
+def draw_summary(pdf, subtotal, tax, service_charge, total):
+    """Totals and footer; returns (y, height, font size) of each amount cell"""
+    slots = []
+    pdf.set_font('Arial', 'B', 10)
+
+    # Summary
+    for label, amount in (('Subtotal:', subtotal), ('Tax (18%):', tax),
+                          ('Service Charge (5%):', service_charge)):
+        pdf.cell(150, 6, label, 0, 0, 'R')
+        slots.append((pdf.get_y(), 6, 10))
+        pdf.cell(30, 6, amount, 0, 1, 'R')
+
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    pdf.ln(2)
+
+    pdf.set_font('Arial', 'B', 12)
+    pdf.cell(150, 8, 'TOTAL:', 0, 0, 'R')
+    slots.append((pdf.get_y(), 8, 12))
+    pdf.cell(30, 8, total, 0, 1, 'R')
+
+    pdf.ln(10)
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(0, 6, 'Thank you for visiting!', 0, 1, 'C')
+    pdf.cell(0, 6, 'Come again soon!', 0, 1, 'C')
+    return slots
+
+
+def amounts(totals):
+    return [f'Rs. {value:.2f}' for value in totals]
+
+
+def create_fpdf():
+    """A blank FPDF document - fpdf is only imported once a bill is rendered"""
+    from fpdf import FPDF
+    return FPDF()
+
+
+def render_bill_direct(job):
+    """Render a BillJob cell by cell with FPDF (the reference layout)"""
+    filename, bill_number, customer_name, customer_phone, date, lines, totals = job
+    pdf = create_fpdf()
+    pdf.add_page()
+    draw_header(pdf, bill_number, date, customer_name, customer_phone)
+    for line in lines:
+        draw_item_row(pdf, *line)
+    pdf.ln(5)
+    draw_summary(pdf, *amounts(totals))
+    pdf.output(filename)
+    return filename
+
+
+def new_pdf():
+    """A document with the layout's fonts registered and its first page open"""
+    pdf = create_fpdf()
+    for family, style, size in FONTS:
+        pdf.set_font(family, style, size)
+    pdf.add_page()
+    return pdf
+
+
+def escape(text):
+    return text.replace('\\', '\\\\').replace(')', '\\)').replace('(', '\\(').replace('\r', '\\r')
+
+
+class BillTemplate:
+    """The bill layout with its static parts rendered once.
+
+    The header, table heading, summary labels and footer are identical on
+    every bill, so they are laid out with FPDF a single time and kept as
+    raw page content. Rendering a bill then only splices in the bill
+    details, writes the item rows and amounts straight into the page and
+    moves the cached totals block under the last row - instead of running
+    a couple of hundred FPDF cell() calls per bill.
+    """
+
+    max_cached_rows = 4096
+
+    def __init__(self):
+        pdf = new_pdf()
+        self.k = pdf.k
+        self.page_height = pdf.h
+        self.left = pdf.l_margin
+        self.c_margin = pdf.c_margin
+        self.top = pdf.t_margin
+        self.page_break = pdf.page_break_trigger
+        self.fonts = {}
+        for style, size in (('', 9), ('B', 10), ('B', 12)):
+            pdf.set_font('Arial', style, size)
+            self.fonts[size] = (pdf.current_font['i'], pdf.current_font['cw'], pdf.font_size)
+
+        # Header with slots for the bill's own details
+        pdf = new_pdf()
+        start = len(pdf.pages[1])
+        draw_header(pdf, *(SLOT + field + SLOT for field in
+                           ('bill_number', 'date', 'customer_name', 'customer_phone')))
+        self.header = pdf.pages[1][start:].split(SLOT)
+        self.rows_top = pdf.get_y()
+
+        # Totals block laid out at the top of a page, to be moved into place
+        pdf = new_pdf()
+        pdf.set_y(0)
+        start = len(pdf.pages[1])
+        self.amount_slots = draw_summary(pdf, '', '', '', '')
+        self.summary = pdf.pages[1][start:]
+        self.summary_height = pdf.get_y()
+
+        # Formatted item rows, keyed by (item, qty, price, line total)
+        self.rows = {}
+
+    def text_x(self, text, x, width, align, font_size):
+        """Where FPDF's cell() would start a line of text"""
+        if align == 'L':
+            return x + self.c_margin
+        cw = self.fonts[font_size][1]
+        text_width = sum(cw.get(char, 0) for char in text) * self.fonts[font_size][2] / 1000.0
+        if align == 'R':
+            return x + width - self.c_margin - text_width
+        return x + (width - text_width) / 2.0
+
+    def row_format(self, line):
+        """An item row's page content with only its y positions left to fill in"""
+        item_name, qty, price, total_price = line
+        k = self.k
+        cells = []
+        x = self.left
+        for width, text, align in ((100, item_name[:35], 'L'), (20, str(qty), 'C'),
+                                   (30, f'Rs. {price}', 'R'), (30, f'Rs. {total_price}', 'R')):
+            cells.append('%.2f %%(top).2f %.2f %.2f re S BT %.2f %%(baseline).2f Td (%s) Tj ET\n' % (
+                x * k, width * k, -6 * k, self.text_x(text, x, width, align, 9) * k,
+                escape(text).replace('%', '%%')))
+            x += width
+        return ''.join(cells)
+
+    def item_row(self, y, line):
+        row = self.rows.get(line)
+        if row is None:
+            if len(self.rows) >= self.max_cached_rows:
+                self.rows.clear()
+            row = self.rows[line] = self.row_format(line)
+        return row % {'top': (self.page_height - y) * self.k,
+                      'baseline': (self.page_height - (y + 3 + .3 * self.fonts[9][2])) * self.k}
+
+    def render(self, job):
+        """Render a BillJob to its PDF file and return the file name"""
+        filename, bill_number, customer_name, customer_phone, date, lines, totals = job
+        fields = {'bill_number': str(bill_number), 'date': str(date),
+                  'customer_name': str(customer_name), 'customer_phone': str(customer_phone)}
+        pdf = new_pdf()
+        content = [''.join(escape(fields[part]) if i % 2 else part
+                           for i, part in enumerate(self.header))]
+
+        # Item rows, continuing on new pages like FPDF's automatic page break
+        y = self.rows_top
+        for line in lines:
+            if y + 6 > self.page_break:
+                pdf.pages[pdf.page] += ''.join(content)
+                content = []
+                pdf.add_page()
+                y = self.top
+            content.append(self.item_row(y, line))
+            y += 6
+
+        # Totals block, kept together on one page
+        y += 5
+        if y + self.summary_height > self.page_break:
+            pdf.pages[pdf.page] += ''.join(content)
+            content = []
+            pdf.add_page()
+            y = self.top
+        k = self.k
+        content.append('q 1 0 0 1 0 %.2f cm\n%sQ\n' % (-y * k, self.summary))
+        for (slot_y, height, size), text in zip(self.amount_slots, amounts(totals)):
+            font_index, _, font_size = self.fonts[size]
+            x = self.text_x(text, self.left + 150, 30, 'R', size)
+            baseline = self.page_height - (y + slot_y + .5 * height + .3 * font_size)
+            content.append('BT /F%d %.2f Tf %.2f %.2f Td (%s) Tj ET\n' % (
+                font_index, size, x * k, baseline * k, escape(text)))
+        pdf.pages[pdf.page] += ''.join(content)
+
+        pdf.output(filename)
+        return filename
+
+
+@functools.lru_cache(maxsize=None)
+def bill_template():
+    """This process's BillTemplate, built on first use"""
+    return BillTemplate()
+
+
+def render_bill(job):
+    """Render a BillJob to its PDF file and return the file name"""
+    return bill_template().render(job)
+
+
+def render_bill_chunk(jobs):
+    return [render_bill(job) for job in jobs]
+
+
+def render_bills(jobs, workers=None, chunksize=16):
+    """Render many bills in parallel across CPU cores, yielding file names as they finish.
+
+    jobs may be any iterable (e.g. a database stream); it is consumed only a
+    few chunks ahead of the workers, so memory stays flat however many
+    bills are rendered.
+    """
+    jobs = iter(jobs)
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while True:
+            while len(pending) < max_pending:
+                chunk = list(itertools.islice(jobs, chunksize))
+                if not chunk:
+                    break
+                pending.add(pool.submit(render_bill_chunk, chunk))
+            if not pending:
+                break
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+class PdfWorkerPool:
+    """Renders bills in background processes and reports back on the Tk thread.
+
+    submit() returns at once; when a bill is written on_done(filename, error)
+    is called from the Tk event loop via root.after, so the cashier's screen
+    never waits for FPDF. The process pool starts on first use.
+    """
+
+    poll_ms = 50
+
+    def __init__(self, root, workers=2):
+        self.root = root
+        self.workers = workers
+        self.executor = None
+        self.finished = queue.Queue()
+        self.outstanding = 0
+
+    def submit(self, job, on_done):
+        """Queue one bill for rendering"""
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        future = self.executor.submit(render_bill, job)
+        # Done-callbacks run on a pool thread, so only hand the result over here
+        future.add_done_callback(lambda f: self.finished.put((f, on_done)))
+        self.outstanding += 1
+        if self.outstanding == 1:
+            self.root.after(self.poll_ms, self.poll)
+        return future
+
+    def submit_many(self, jobs, on_done):
+        """Queue a batch of bills; on_done is called once per bill"""
+        return [self.submit(job, on_done) for job in jobs]
+
+    def poll(self):
+        while not self.finished.empty():
+            future, on_done = self.finished.get_nowait()
+            self.outstanding -= 1
+            error = future.exception()
+            on_done(None if error else future.result(), error)
+        if self.outstanding:
+            self.root.after(self.poll_ms, self.poll)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,127 @@
+"""Incremental rendering of the on-screen text bill"""
+import bisect
+import datetime
+import tkinter as tk
+from billing import format_item_line
+
+
+class IncrementalBillRenderer:
+    """Keeps a tk.Text bill in sync with an Order by patching single lines.
+
+    A full render happens when the bill is (re)started; after that a
+    quantity change only rewrites the affected item row and the summary
+    block at the bottom, so a +/- click does not rebuild the whole widget.
+    Edits to the customer's details rewrite just the bill details lines.
+    """
+
+    def __init__(self, text, order):
+        self.text = text
+        self.order = order
+        self.item_names = []    # item rows currently shown, in menu order
+        self.item_keys = []     # menu positions matching item_names, for bisect
+        self.items_line = None  # Text line number of the first item row
+        self.details_line = None  # Text line number of the "Bill No:" row
+
+    def clear(self):
+        """Empty the widget and forget the current layout"""
+        self.text.delete(1.0, tk.END)
+        self.item_names = []
+        self.item_keys = []
+        self.items_line = None
+        self.details_line = None
+
+    def render(self, bill_number, customer_name, customer_phone):
+        """Rebuild the whole bill and return the order totals"""
+        self.clear()
+
+        # Header
+        self.text.insert(tk.END, "=" * 40 + "\n")
+        self.text.insert(tk.END, "  PAKISTANI & CHINESE RESTAURANT\n")
+        self.text.insert(tk.END, "  Authentic Cuisine & Delicacies\n")
+        self.text.insert(tk.END, "=" * 40 + "\n\n")
+
+        # Bill details
+        self.details_line = int(self.text.index('end-1c').split('.')[0])
+        self.text.insert(tk.END, self.details(bill_number, customer_name, customer_phone))
+        self.text.insert(tk.END, "-" * 40 + "\n\n")
+
+        # Items
+        self.text.insert(tk.END, "ITEM                     QTY   PRICE   TOTAL\n")
+        self.text.insert(tk.END, "-" * 40 + "\n")
+
+        self.items_line = int(self.text.index('end-1c').split('.')[0])
+        positions = self.order.engine.positions
+        for item_name, qty, price, total_price in self.order.lines():
+            self.item_names.append(item_name)
+            self.item_keys.append(positions[item_name])
+            self.text.insert(tk.END, format_item_line(item_name, qty, price, total_price))
+
+        return self.render_summary()
+
+    @staticmethod
+    def details(bill_number, customer_name, customer_phone):
+        """The bill number, date, customer and phone lines"""
+        return (f"Bill No: {bill_number}\n"
+                f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                f"Customer: {customer_name}\n"
+                f"Phone: {customer_phone}\n")
+
+    def update_details(self, bill_number, customer_name, customer_phone):
+        """Rewrite the bill details lines in place, if a bill is shown"""
+        if self.details_line is None:
+            return
+        line = f"{self.details_line}.0"
+        self.text.delete(line, f"{line} +4 lines")
+        self.text.insert(line, self.details(bill_number, customer_name, customer_phone))
+
+    def update_item(self, item_name):
+        """Patch the row of one item after its quantity changed.
+
+        Returns the new totals, or None when no bill has been rendered yet
+        and the caller should do a full render instead.
+        """
+        if self.items_line is None:
+            return None
+
+        key = self.order.engine.positions[item_name]
+        index = bisect.bisect_left(self.item_keys, key)
+        shown = index < len(self.item_keys) and self.item_keys[index] == key
+        qty = self.order.quantity(item_name)
+        line = f"{self.items_line + index}.0"
+
+        if shown:
+            self.text.delete(line, f"{line} +1 lines")
+            if qty:
+                self.insert_item_line(line, item_name, qty)
+            else:
+                del self.item_names[index]
+                del self.item_keys[index]
+        elif qty:
+            self.insert_item_line(line, item_name, qty)
+            self.item_names.insert(index, item_name)
+            self.item_keys.insert(index, key)
+
+        return self.render_summary()
+
+    def insert_item_line(self, index, item_name, qty):
+        price = self.order.engine.price(item_name)
+        self.text.insert(index, format_item_line(item_name, qty, price, qty * price))
+
+    def render_summary(self):
+        """Rewrite the summary block below the item rows"""
+        summary_line = f"{self.items_line + len(self.item_names)}.0"
+        self.text.delete(summary_line, tk.END)
+
+        totals = self.order.totals()
+        subtotal, tax, service_charge, total = totals
+        if subtotal > 0:
+            self.text.insert(tk.END, "\n" + "-" * 40 + "\n")
+            self.text.insert(tk.END, f"Subtotal:              Rs. {subtotal:.2f}\n")
+            self.text.insert(tk.END, f"Tax (18%):             Rs. {tax:.2f}\n")
+            self.text.insert(tk.END, f"Service Charge (5%):   Rs. {service_charge:.2f}\n")
+            self.text.insert(tk.END, "=" * 40 + "\n")
+            self.text.insert(tk.END, f"TOTAL:                 Rs. {total:.2f}\n")
+            self.text.insert(tk.END, "=" * 40 + "\n\n")
+            self.text.insert(tk.END, "Thank you for visiting!\n")
+            self.text.insert(tk.END, "Come again soon!\n")
+        return totals
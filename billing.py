@@ -0,0 +1,269 @@
+"""Headless billing engine - menu prices, order quantities and bill totals.
+
+Nothing in here touches Tkinter, so the GUI, the PDF writer and batch jobs
+all share the same pricing, tax and service-charge math.
+"""
+import argparse
+import collections
+import datetime
+import json
+import sys
+import threading
+
+TAX_RATE = 0.18
+SERVICE_CHARGE_RATE = 0.05
+
+BILL_PREFIX = 'BILL'
+
+# Pakistani and Chinese menu items with prices
+MENU_ITEMS = {
+    'Pakistani Dishes': {
+        'Chicken Karahi': 450,
+        'Mutton Karahi': 650,
+        'Chicken Biryani': 320,
+        'Mutton Biryani': 480,
+        'Chicken Tikka': 380,
+        'Seekh Kebab': 350,
+        'Chapli Kebab': 320,
+        'Nihari': 420,
+        'Haleem': 280,
+        'Chicken Handi': 400,
+        'Mutton Handi': 550,
+        'Daal Chawal': 180,
+        'Aloo Gosht': 380,
+        'Palak Gosht': 420,
+        'Chicken Jalfrezi': 360
+    },
+    'Chinese Dishes': {
+        'Chicken Chow Mein': 280,
+        'Beef Chow Mein': 320,
+        'Chicken Fried Rice': 250,
+        'Vegetable Fried Rice': 200,
+        'Sweet & Sour Chicken': 340,
+        'Chicken Manchurian': 320,
+        'Hot & Sour Soup': 150,
+        'Chicken Corn Soup': 180,
+        'Spring Rolls': 220,
+        'Honey Chicken': 360,
+        'Szechuan Chicken': 380,
+        'Dragon Chicken': 400,
+        'Crispy Beef': 450,
+        'Vegetable Manchurian': 240,
+        'Chicken 65': 350
+    },
+    'Beverages & Desserts': {
+        'Fresh Lime': 80,
+        'Mango Lassi': 120,
+        'Rooh Afza': 60,
+        'Green Tea': 50,
+        'Kashmiri Chai': 80,
+        'Kulfi': 100,
+        'Kheer': 120,
+        'Gulab Jamun': 100,
+        'Ras Malai': 150,
+        'Ice Cream': 80,
+        'Fresh Juice': 100,
+        'Cold Drinks': 60
+    }
+}
+
+BillTotals = collections.namedtuple('BillTotals', ['subtotal', 'tax', 'service_charge', 'total'])
+
+
+class BillNumberGenerator:
+    """Issues unique, time-sortable bill numbers for one terminal.
+
+    Numbers look like BILL + YYYYMMDDHHMMSS + 2-digit terminal id + 4-digit
+    counter, so different terminals never collide and one terminal can
+    issue up to 10,000 numbers per second. If a second's counter runs out,
+    or the clock steps backwards, the generator keeps counting on from its
+    last timestamp so numbers only ever increase.
+    """
+
+    sequence_limit = 10000
+
+    def __init__(self, terminal_id, clock=datetime.datetime.now):
+        if not 0 <= terminal_id < 100:
+            raise ValueError(f"Terminal id must be between 0 and 99, got {terminal_id}")
+        self.terminal_id = terminal_id
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.last_second = None
+        self.sequence = 0
+
+    def next(self):
+        """Return the next bill number"""
+        with self.lock:
+            second = self.clock().replace(microsecond=0)
+            if self.last_second is None or second > self.last_second:
+                self.last_second = second
+                self.sequence = 0
+            else:
+                self.sequence += 1
+                if self.sequence == self.sequence_limit:
+                    self.last_second += datetime.timedelta(seconds=1)
+                    self.sequence = 0
+            return f"{BILL_PREFIX}{self.last_second:%Y%m%d%H%M%S}{self.terminal_id:02d}{self.sequence:04d}"
+
+
+def format_item_line(item_name, qty, price, total_price):
+    """Format one item row of the text bill"""
+    return f"{item_name[:20]:<20} {qty:>3} {price:>6} {total_price:>7}\n"
+
+
+class Order:
+    """Quantities for a single order with a running subtotal.
+
+    Only items with a non-zero quantity are stored, so every operation is
+    proportional to the size of the order rather than the size of the menu.
+    """
+
+    def __init__(self, engine, items=None):
+        self.engine = engine
+        self.items = {}
+        self.subtotal = 0
+        if items:
+            for item_name, qty in items.items():
+                self.set_quantity(item_name, qty)
+
+    def quantity(self, item_name):
+        """Return the ordered quantity of an item (0 if not ordered)"""
+        return self.items.get(item_name, 0)
+
+    def set_quantity(self, item_name, qty):
+        """Set the quantity of an item and return the new quantity"""
+        price = self.engine.price(item_name)
+        qty = max(int(qty), 0)
+        old_qty = self.items.get(item_name, 0)
+        if qty:
+            self.items[item_name] = qty
+        else:
+            self.items.pop(item_name, None)
+        self.subtotal += (qty - old_qty) * price
+        return qty
+
+    def add(self, item_name, qty=1):
+        """Increase the quantity of an item"""
+        return self.set_quantity(item_name, self.quantity(item_name) + qty)
+
+    def remove(self, item_name, qty=1):
+        """Decrease the quantity of an item, never below zero"""
+        return self.set_quantity(item_name, self.quantity(item_name) - qty)
+
+    def clear(self):
+        """Remove every item from the order"""
+        self.items.clear()
+        self.subtotal = 0
+
+    def is_empty(self):
+        return not self.items
+
+    def total_items(self):
+        return sum(self.items.values())
+
+    def lines(self):
+        """Return (item_name, qty, price, line_total) rows in menu order"""
+        position = self.engine.positions
+        rows = []
+        for item_name in sorted(self.items, key=lambda name: position.get(name, len(position))):
+            qty = self.items[item_name]
+            price = self.engine.price(item_name)
+            rows.append((item_name, qty, price, qty * price))
+        return rows
+
+    def to_dict(self):
+        """Item name -> quantity mapping as stored in orders.order_data"""
+        return dict(self.items)
+
+    def totals(self):
+        return self.engine.totals(self.subtotal)
+
+
+class BillingEngine:
+    """Prices orders against a menu and applies tax and service charge"""
+
+    def __init__(self, menu_items=None, tax_rate=TAX_RATE, service_charge_rate=SERVICE_CHARGE_RATE):
+        self.menu_items = menu_items if menu_items is not None else MENU_ITEMS
+        self.tax_rate = tax_rate
+        self.service_charge_rate = service_charge_rate
+
+        # Flat item -> price index so lookups never walk the categories
+        self.prices = {}
+        self.positions = {}
+        for items in self.menu_items.values():
+            for item_name, price in items.items():
+                self.positions[item_name] = len(self.prices)
+                self.prices[item_name] = price
+
+    def price(self, item_name):
+        try:
+            return self.prices[item_name]
+        except KeyError:
+            raise KeyError(f"Unknown menu item: {item_name}") from None
+
+    def new_order(self, items=None):
+        """Create an order, optionally pre-filled from an item -> qty mapping"""
+        return Order(self, items)
+
+    def totals(self, subtotal):
+        """Calculate tax, service charge and grand total for a subtotal"""
+        if isinstance(subtotal, Order):
+            subtotal = subtotal.subtotal
+        tax = round(subtotal * self.tax_rate, 2)
+        service_charge = round(subtotal * self.service_charge_rate, 2)
+        total = round(subtotal + tax + service_charge, 2)
+        return BillTotals(subtotal, tax, service_charge, total)
+
+    def price_order_data(self, order_data):
+        """Price a stored order_data mapping, skipping items no longer on the menu"""
+        order = self.new_order()
+        for item_name, qty in order_data.items():
+            if item_name in self.prices:
+                order.set_quantity(item_name, qty)
+        return order
+
+
+def run_batch(engine, infile, outfile):
+    """Price JSON-lines orders from infile and write the totals to outfile.
+
+    Each input line is an object with an "items" mapping (item -> qty) and an
+    optional "bill_number"; each output line carries the computed totals.
+    """
+    count = 0
+    for line in infile:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        order = engine.new_order(record['items'])
+        totals = order.totals()
+        result = {'bill_number': record.get('bill_number'), 'items': order.to_dict()}
+        result.update(totals._asdict())
+        outfile.write(json.dumps(result) + "\n")
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price orders in batch without the GUI")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="JSON-lines file of orders ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="where to write priced orders ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    engine = BillingEngine()
+    infile = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        count = run_batch(engine, infile, outfile)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        if outfile is not sys.stdout:
+            outfile.close()
+    print(f"Priced {count} orders", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Change notifications between billing terminals sharing one database.
+
+After a terminal commits a change it multicasts a tiny UDP datagram naming
+the table it touched; every other terminal on the machine (or LAN) hears it
+and refreshes the affected view, so nobody has to poll SQLite for changes.
+Notifications are best effort - a lost datagram only means a view refreshes
+on the next change or the next manual search.
+
+Tills on other PCs reach the database file over a network share, which
+only works with the rollback journal; WAL mode needs every terminal on the
+PC holding the file (see database.set_journal_mode).
+"""
+import json
+import socket
+import struct
+import threading
+import uuid
+
+GROUP = '239.255.42.99'
+PORT = 50999
+
+
+class ChangeNotifier:
+    """Publishes this terminal's changes and listens for everyone else's"""
+
+    def __init__(self, group=GROUP, port=PORT):
+        self.group = group
+        self.port = port
+        self.source = uuid.uuid4().hex
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sender.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        self.sender.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.receiver = None
+
+    def publish(self, table, key=None):
+        """Announce that this terminal changed a table (key: which row, if known)"""
+        message = json.dumps({'source': self.source, 'table': table, 'key': key}).encode()
+        try:
+            self.sender.sendto(message, (self.group, self.port))
+        except OSError:
+            pass  # No multicast route - other terminals refresh on their own actions
+
+    def listen(self, callback):
+        """Call callback(table, key) on a background thread for other terminals' changes.
+
+        Returns False when this machine cannot join the multicast group.
+        """
+        try:
+            receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            receiver.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'):
+                receiver.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            receiver.bind(('', self.port))
+            membership = struct.pack('4s4s', socket.inet_aton(self.group), socket.inet_aton('0.0.0.0'))
+            receiver.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        except OSError:
+            return False
+        self.receiver = receiver
+        threading.Thread(target=self.receive, args=(callback,), daemon=True).start()
+        return True
+
+    def receive(self, callback):
+        while True:
+            try:
+                data, address = self.receiver.recvfrom(1024)
+            except OSError:
+                break  # Socket closed
+            try:
+                message = json.loads(data)
+            except ValueError:
+                continue
+            if message.get('source') != self.source:
+                callback(message.get('table'), message.get('key'))
+
+    def close(self):
+        self.sender.close()
+        if self.receiver is not None:
+            self.receiver.close()
@@ -0,0 +1,74 @@
+"""In-process cache of customer lookups for the Find Customer button"""
+import collections
+import database
+
+# last_order is the customer's most recent order as ((item, qty), ...), or None
+CustomerRecord = collections.namedtuple('CustomerRecord', ['id', 'name', 'phone', 'last_order'])
+
+
+def load_customer(cursor, phone):
+    """Read a customer and their last order from the database, or None"""
+    cursor.execute(database.CUSTOMER_BY_PHONE_SQL, (phone,))
+    customer = cursor.fetchone()
+    if customer is None:
+        return None
+    cursor.execute(database.LAST_ORDER_SQL, (customer[0],))
+    last_order = cursor.fetchone()
+    items = tuple(database.order_items(cursor, last_order[0]).items()) if last_order else None
+    return CustomerRecord(customer[0], customer[1], customer[2], items)
+
+
+class CustomerCache:
+    """Least-recently-used cache of customers by phone, with their last order.
+
+    A lookup that misses runs the customer, last-order and order-lines
+    queries once; after that a regular's lookups are answered from memory
+    until an order or customer change for them calls forget(). Only found
+    customers are cached, so a new customer is never hidden by an old miss.
+    """
+
+    def __init__(self, conn, max_size=1000):
+        self.conn = conn
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()   # phone -> CustomerRecord
+        self.phones = {}                           # customer id -> phone
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, phone):
+        """Return the CustomerRecord for a phone number, or None if there is none"""
+        record = self.entries.get(phone)
+        if record is not None:
+            self.entries.move_to_end(phone)
+            self.hits += 1
+            return record
+
+        self.misses += 1
+        record = self.load(phone)
+        if record is not None:
+            self.entries[phone] = record
+            self.phones[record.id] = phone
+            if len(self.entries) > self.max_size:
+                evicted = self.entries.popitem(last=False)[1]
+                del self.phones[evicted.id]
+        return record
+
+    def load(self, phone):
+        return load_customer(self.conn.cursor(), phone)
+
+    def forget(self, customer_id=None, phone=None):
+        """Drop a customer whose details or orders have changed"""
+        if customer_id is not None:
+            phone = self.phones.get(customer_id, phone)
+        record = self.entries.pop(phone, None)
+        if record is not None:
+            del self.phones[record.id]
+
+    def clear(self):
+        self.entries.clear()
+        self.phones.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self.entries), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0}
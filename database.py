@@ -0,0 +1,987 @@
+"""SQLite schema, migrations and shared queries for the billing database"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import random
+import socket
+import sqlite3
+import sys
+import time
+from billing import BILL_PREFIX, MENU_ITEMS
+
+DB_PATH = 'restaurant_billing.db'
+
+# Seconds a connection waits for another terminal's write lock before failing
+BUSY_TIMEOUT = 10
+
+# Hot-path queries, shared with the GUI so their plans can be checked below
+CUSTOMER_BY_PHONE_SQL = "SELECT * FROM customers WHERE phone = ?"
+
+LAST_ORDER_SQL = """
+    SELECT id FROM orders
+    WHERE customer_id = ?
+    ORDER BY order_date DESC LIMIT 1
+"""
+
+# {schema} is main for the live orders, or an attached archive's name
+ORDER_HISTORY_SELECT = """
+    SELECT o.bill_number, c.name, c.phone, o.subtotal, o.tax_amount,
+           o.service_charge, o.total_amount, o.order_date, o.id
+    FROM {schema}.orders o
+    JOIN customers c ON o.customer_id = c.id
+"""
+
+
+def create_base_tables(cursor):
+    """Version 1 - the original customers and orders tables"""
+    # Create customers table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT UNIQUE NOT NULL,
+            created_date DATE DEFAULT CURRENT_DATE
+        )
+    ''')
+
+    # Create orders table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            bill_number TEXT UNIQUE,
+            order_data TEXT,
+            subtotal REAL,
+            tax_amount REAL,
+            service_charge REAL,
+            total_amount REAL,
+            order_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers (id)
+        )
+    ''')
+
+
+def create_order_lines(cursor):
+    """Version 2 - one row per ordered item instead of the order_data JSON blob"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS menu_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_lines (
+            order_id INTEGER NOT NULL,
+            item_id INTEGER NOT NULL,
+            qty INTEGER NOT NULL,
+            unit_price REAL,
+            PRIMARY KEY (order_id, item_id),
+            FOREIGN KEY (order_id) REFERENCES orders (id),
+            FOREIGN KEY (item_id) REFERENCES menu_items (id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_lines_item ON order_lines (item_id)')
+
+    cursor.executemany('INSERT OR IGNORE INTO menu_items (name) VALUES (?)',
+                       ((name,) for items in MENU_ITEMS.values() for name in items))
+
+    # Backfill lines for orders saved before this table existed. The price
+    # paid was never stored, so the current menu price is the best we have.
+    prices = {name: price for items in MENU_ITEMS.values() for name, price in items.items()}
+    for order_id, order_data in cursor.execute('SELECT id, order_data FROM orders').fetchall():
+        try:
+            items = json.loads(order_data or '{}')
+        except ValueError:
+            continue
+        insert_order_lines(cursor, order_id, items, prices)
+
+
+def create_access_indexes(cursor):
+    """Version 3 - indexes for last-order lookup and date-sorted history"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_customer_date ON orders (customer_id, order_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_orders_date ON orders (order_date)')
+
+
+def create_search_index(cursor):
+    """Version 4 - trigram full-text index on customer name/phone and bill number"""
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+            name, phone, content='customers', content_rowid='id', tokenize='trigram'
+        )
+    ''')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5(
+            bill_number, content='orders', content_rowid='id', tokenize='trigram'
+        )
+    ''')
+
+    # Keep both indexes in step with their tables
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO customers_fts (rowid, name, phone) VALUES (new.id, new.name, new.phone);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, phone)
+            VALUES ('delete', old.id, old.name, old.phone);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE OF name, phone ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, phone)
+            VALUES ('delete', old.id, old.name, old.phone);
+            INSERT INTO customers_fts (rowid, name, phone) VALUES (new.id, new.name, new.phone);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS orders_fts_insert AFTER INSERT ON orders BEGIN
+            INSERT INTO orders_fts (rowid, bill_number) VALUES (new.id, new.bill_number);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS orders_fts_delete AFTER DELETE ON orders BEGIN
+            INSERT INTO orders_fts (orders_fts, rowid, bill_number)
+            VALUES ('delete', old.id, old.bill_number);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS orders_fts_update AFTER UPDATE OF bill_number ON orders BEGIN
+            INSERT INTO orders_fts (orders_fts, rowid, bill_number)
+            VALUES ('delete', old.id, old.bill_number);
+            INSERT INTO orders_fts (rowid, bill_number) VALUES (new.id, new.bill_number);
+        END
+    ''')
+
+    # Index the rows that already exist
+    cursor.execute("INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')")
+    cursor.execute("INSERT INTO orders_fts (orders_fts) VALUES ('rebuild')")
+
+
+def create_terminals(cursor):
+    """Version 5 - billing stations sharing this database"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS terminals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            registered_date DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def create_menu_catalog(cursor):
+    """Version 6 - category, price and availability for each menu item"""
+    cursor.execute('ALTER TABLE menu_items ADD COLUMN category TEXT')
+    cursor.execute('ALTER TABLE menu_items ADD COLUMN price REAL')
+    cursor.execute('ALTER TABLE menu_items ADD COLUMN available INTEGER NOT NULL DEFAULT 1')
+    cursor.executemany('UPDATE menu_items SET category = ?, price = ? WHERE name = ?',
+                       ((category, price, name) for category, items in MENU_ITEMS.items()
+                        for name, price in items.items()))
+    # Names only known from old orders have no price, so they stay off the menu
+    cursor.execute('UPDATE menu_items SET available = 0 WHERE price IS NULL')
+
+    # Bumped on every menu change, so terminals can tell when to reload
+    cursor.execute('CREATE TABLE IF NOT EXISTS menu_version (version INTEGER NOT NULL)')
+    cursor.execute('INSERT INTO menu_version (version) VALUES (0)')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS menu_items_{event.lower()} AFTER {event} ON menu_items BEGIN
+                UPDATE menu_version SET version = version + 1;
+            END
+        ''')
+
+
+def create_sales_rollups(cursor):
+    """Version 7 - per-day sales totals kept up to date as orders are saved"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_sales (
+            day TEXT PRIMARY KEY,
+            orders INTEGER NOT NULL,
+            subtotal REAL NOT NULL,
+            tax REAL NOT NULL,
+            service_charge REAL NOT NULL,
+            revenue REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_item_sales (
+            day TEXT NOT NULL,
+            item_id INTEGER NOT NULL,
+            qty INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY (day, item_id)
+        ) WITHOUT ROWID
+    ''')
+
+    # Saving an order adds it to its day's totals in the same transaction.
+    # order_date is UTC (CURRENT_TIMESTAMP), so days are taken in local time:
+    # a late dinner belongs to the evening it was served, not to tomorrow.
+    # Rollups only ever grow: orders moved or deleted later still count
+    # until the days are rebuilt.
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS daily_sales_insert AFTER INSERT ON orders BEGIN
+            INSERT INTO daily_sales (day, orders, subtotal, tax, service_charge, revenue)
+            VALUES (date(new.order_date, 'localtime'), 1, new.subtotal, new.tax_amount,
+                    new.service_charge, new.total_amount)
+            ON CONFLICT (day) DO UPDATE SET orders = orders + 1,
+                                            subtotal = subtotal + excluded.subtotal,
+                                            tax = tax + excluded.tax,
+                                            service_charge = service_charge + excluded.service_charge,
+                                            revenue = revenue + excluded.revenue;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS daily_item_sales_insert AFTER INSERT ON order_lines BEGIN
+            INSERT INTO daily_item_sales (day, item_id, qty, revenue)
+            SELECT date(order_date, 'localtime'), new.item_id, new.qty, new.qty * coalesce(new.unit_price, 0)
+            FROM orders WHERE id = new.order_id
+            ON CONFLICT (day, item_id) DO UPDATE SET qty = qty + excluded.qty,
+                                                     revenue = revenue + excluded.revenue;
+        END
+    ''')
+
+    rebuild_daily_sales(cursor)
+
+
+def create_order_archives(cursor):
+    """Version 8 - closed months moved out to per-month archive files (see archive.py)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_archives (
+            month TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            orders INTEGER NOT NULL,
+            archived_date DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+# Each entry upgrades the schema by one version; PRAGMA user_version records
+# how many have been applied to a database file.
+MIGRATIONS = [
+    create_base_tables,
+    create_order_lines,
+    create_access_indexes,
+    create_search_index,
+    create_terminals,
+    create_menu_catalog,
+    create_sales_rollups,
+    create_order_archives,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Apply any migrations the database has not seen yet"""
+    while conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+        with conn:
+            # Take the write lock before re-reading the version, so terminals
+            # starting together never run the same migration twice
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version < SCHEMA_VERSION:
+                MIGRATIONS[version](conn.cursor())
+                conn.execute(f'PRAGMA user_version = {version + 1}')
+    return SCHEMA_VERSION
+
+
+def connect(path=DB_PATH, factory=sqlite3.Connection):
+    """Open the billing database, upgrading its schema if needed"""
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, factory=factory)
+    # The journal mode is kept in the file (see set_journal_mode). In WAL
+    # mode NORMAL only syncs at checkpoints - a power cut may lose the last
+    # commits but never corrupts the file; the rollback journal keeps FULL.
+    if journal_mode(conn) == 'wal':
+        conn.execute('PRAGMA synchronous = NORMAL')
+    migrate(conn)
+    return conn
+
+
+def journal_mode(conn):
+    return conn.execute('PRAGMA journal_mode').fetchone()[0].lower()
+
+
+def set_journal_mode(conn, wal):
+    """Switch a database file to WAL, or back to the default rollback journal.
+
+    WAL lets readers run alongside the writer, but its index lives in
+    shared memory, so every terminal must run on the PC holding the file.
+    A database opened by tills on other PCs over a network share must keep
+    the rollback journal. The mode is stored in the file, so this is done
+    once with no other terminal running, not on every connection.
+    """
+    conn.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+    return journal_mode(conn)
+
+
+def is_busy_error(error):
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+def write_transaction(conn, work, retries=5):
+    """Run work(cursor) in one short write transaction and return its result.
+
+    BEGIN IMMEDIATE takes the write lock up front, so two terminals never
+    deadlock upgrading read locks. If another terminal holds the lock for
+    longer than the busy timeout the whole transaction is retried after a
+    randomised back-off.
+    """
+    for attempt in range(retries + 1):
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                return work(cursor)
+        except sqlite3.OperationalError as e:
+            if attempt == retries or not is_busy_error(e):
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+
+def default_terminal_name():
+    """Name this billing station registers under.
+
+    Defaults to the host name; set RESTAURANT_TERMINAL to run more than one
+    station on the same PC.
+    """
+    return os.environ.get('RESTAURANT_TERMINAL') or socket.gethostname()
+
+
+def register_terminal(conn, name=None):
+    """Return the id of a terminal, registering it on first use"""
+    name = name or default_terminal_name()
+    with conn:
+        conn.execute('INSERT OR IGNORE INTO terminals (name) VALUES (?)', (name,))
+    terminal_id = conn.execute('SELECT id FROM terminals WHERE name = ?', (name,)).fetchone()[0]
+    if terminal_id > 99:
+        raise ValueError(f"Too many terminals registered; cannot give {name!r} a 2-digit id")
+    return terminal_id
+
+
+def item_id(cursor, item_name):
+    """Return the menu_items id for an item name, adding unknown names"""
+    cursor.execute('INSERT OR IGNORE INTO menu_items (name) VALUES (?)', (item_name,))
+    cursor.execute('SELECT id FROM menu_items WHERE name = ?', (item_name,))
+    return cursor.fetchone()[0]
+
+
+def insert_order_lines(cursor, order_id, order_data, prices, item_ids=None):
+    """Write one order_lines row per item of an item -> qty mapping.
+
+    item_ids (name -> menu_items id, e.g. a MenuCatalog's) saves looking up
+    each item in the database.
+    """
+    item_ids = item_ids or {}
+    cursor.executemany('''
+        INSERT OR REPLACE INTO order_lines (order_id, item_id, qty, unit_price)
+        VALUES (?, ?, ?, ?)
+    ''', [(order_id, item_ids.get(item_name) or item_id(cursor, item_name), qty, prices.get(item_name))
+          for item_name, qty in order_data.items() if qty > 0])
+
+
+def order_items(cursor, order_id):
+    """Return the item -> qty mapping of a saved order"""
+    cursor.execute('''
+        SELECT m.name, l.qty
+        FROM order_lines l
+        JOIN menu_items m ON m.id = l.item_id
+        WHERE l.order_id = ?
+    ''', (order_id,))
+    return dict(cursor.fetchall())
+
+
+def order_date_bounds(start_date=None, end_date=None):
+    """order_date bounds [start, end) of an inclusive range of local 'YYYY-MM-DD' days.
+
+    order_date is stored in UTC, so local midnight is converted to UTC
+    once here rather than every row's date to local time, which keeps the
+    date index usable. Either bound is None when its date is.
+    """
+    def utc(day):
+        return day.astimezone(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    start = utc(datetime.datetime.fromisoformat(start_date)) if start_date else None
+    end = utc(datetime.datetime.fromisoformat(end_date) + datetime.timedelta(days=1)) if end_date else None
+    return start, end
+
+
+def local_order_date(order_date):
+    """A stored UTC order_date as the local 'YYYY-MM-DD HH:MM:SS' a printed bill shows"""
+    saved = datetime.datetime.fromisoformat(order_date).replace(tzinfo=datetime.timezone.utc)
+    return saved.astimezone().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def order_date_range(column, start_date=None, end_date=None):
+    """WHERE clause and params for orders placed on an inclusive range of local days"""
+    start, end = order_date_bounds(start_date, end_date)
+    conditions, params = [], []
+    if start:
+        conditions.append(f"{column} >= ?")
+        params.append(start)
+    if end:
+        conditions.append(f"{column} < ?")
+        params.append(end)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+SAVED_BILL_SELECT = """
+    SELECT o.id, o.bill_number, c.name, c.phone, o.order_date,
+           o.subtotal, o.tax_amount, o.service_charge, o.total_amount,
+           m.name, l.qty, l.unit_price
+    FROM {schema}.orders o
+    JOIN customers c ON c.id = o.customer_id
+    JOIN {schema}.order_lines l ON l.order_id = o.id
+    JOIN menu_items m ON m.id = l.item_id
+"""
+
+
+def iter_saved_bills(cursor, start_date=None, end_date=None, bill_numbers=None, chunk=500):
+    """Stream saved bills as (bill_number, name, phone, date, lines, totals).
+
+    date is the local time the order was saved, as the bill printed it;
+    lines are (item_name, qty, unit_price, line_total) at the price paid.
+    Rows are read from the cursor as they are needed rather than fetched
+    all at once, so any number of bills can be streamed in constant memory.
+    Dates are an inclusive range of local 'YYYY-MM-DD' days. Archived
+    months are read too (see order_schemas).
+    """
+    if bill_numbers is not None:
+        yield from saved_bills_by_number(cursor, list(bill_numbers), chunk)
+        return
+
+    where, params = order_date_range('o.order_date', start_date, end_date)
+    sql = SAVED_BILL_SELECT + where + " ORDER BY o.order_date, o.id, l.item_id"
+    for schema in order_schemas(cursor, start_date, end_date):
+        yield from group_bill_rows(cursor.execute(sql.format(schema=schema), params))
+
+
+def saved_bills_by_number(cursor, bill_numbers, chunk=500):
+    """Saved bills with the given numbers, from the live orders and then the archives.
+
+    Only the archived months a number's date allows are searched, newest
+    first, and the search stops once every bill has been found.
+    """
+    missing = set(bill_numbers)
+    floors = [bill_archive_floor(bill_number) for bill_number in bill_numbers]
+    floor = None if None in floors else min(floors, default=None)
+    months = [(month, path) for month, path in archived_months(cursor) if floor is None or month >= floor]
+    for schema in itertools.chain(['main'], attached_archives(cursor, months)):
+        wanted = [bill_number for bill_number in bill_numbers if bill_number in missing]
+        if not wanted:
+            return
+        # Look bills up in batches to keep each IN list short
+        for begin in range(0, len(wanted), chunk):
+            batch = wanted[begin:begin + chunk]
+            sql = SAVED_BILL_SELECT.format(schema=schema) + f"""
+                WHERE o.bill_number IN ({', '.join('?' * len(batch))})
+                ORDER BY o.id, l.item_id
+            """
+            for bill in group_bill_rows(cursor.execute(sql, batch)):
+                missing.discard(bill[0])
+                yield bill
+
+
+def bill_archive_floor(bill_number):
+    """Oldest archived month that can hold a bill, from the date in its number, or None"""
+    try:
+        issued = datetime.datetime.strptime(bill_number[len(BILL_PREFIX):len(BILL_PREFIX) + 8], '%Y%m%d')
+    except ValueError:
+        return None
+    # The number carries the local date the bill was started; order_date is UTC
+    return f"{issued - datetime.timedelta(days=1):%Y-%m}"
+
+
+def group_bill_rows(rows):
+    """Fold consecutive line rows of SAVED_BILL_SELECT into one bill each"""
+    current_id = None
+    bill = lines = None
+    for row in rows:
+        if row[0] != current_id:
+            if bill is not None:
+                yield bill + (lines,) + totals
+            current_id = row[0]
+            bill = row[1:4] + (local_order_date(row[4]),)
+            totals = (row[5:9],)
+            lines = []
+        item_name, qty, unit_price = row[9:]
+        # Prices are stored as REAL; show whole rupees the way the menu does
+        unit_price = unit_price or 0
+        if unit_price == int(unit_price):
+            unit_price = int(unit_price)
+        lines.append((item_name, qty, unit_price, qty * unit_price))
+    if bill is not None:
+        yield bill + (lines,) + totals
+
+
+# Per-day totals of one schema's orders; {schema} is main or an attached archive
+DAILY_SALES_SELECT = """
+    SELECT date(o.order_date, 'localtime') AS day, COUNT(*) AS orders, SUM(o.subtotal) AS subtotal,
+           SUM(o.tax_amount) AS tax, SUM(o.service_charge) AS service_charge, SUM(o.total_amount) AS revenue
+    FROM {schema}.orders o{where}
+    GROUP BY 1
+"""
+DAILY_ITEM_SALES_SELECT = """
+    SELECT date(o.order_date, 'localtime') AS day, l.item_id, SUM(l.qty) AS qty,
+           SUM(l.qty * coalesce(l.unit_price, 0)) AS revenue
+    FROM {schema}.orders o
+    JOIN {schema}.order_lines l ON l.order_id = o.id{where}
+    GROUP BY 1, 2
+"""
+
+
+def rebuild_daily_sales(cursor, start_date=None, end_date=None, staged=False):
+    """Recompute the daily rollups from the orders themselves.
+
+    Dates are inclusive 'YYYY-MM-DD' local days; without them every day is
+    rebuilt. Only the live orders are read, plus with staged the archived
+    months' totals gathered by stage_archived_sales().
+    """
+    day_conditions, params = [], []
+    if start_date:
+        day_conditions.append("day >= ?")
+        params.append(start_date)
+    if end_date:
+        day_conditions.append("day <= ?")
+        params.append(end_date)
+    where = (" WHERE " + " AND ".join(day_conditions)) if day_conditions else ""
+    cursor.execute("DELETE FROM daily_sales" + where, params)
+    cursor.execute("DELETE FROM daily_item_sales" + where, params)
+
+    order_where, order_params = order_date_range('o.order_date', start_date, end_date)
+    sales = DAILY_SALES_SELECT.format(schema='main', where=order_where)
+    items = DAILY_ITEM_SALES_SELECT.format(schema='main', where=order_where)
+    if staged:
+        sales += " UNION ALL SELECT * FROM temp.staged_daily_sales"
+        items += " UNION ALL SELECT * FROM temp.staged_daily_item_sales"
+    cursor.execute(f'''
+        INSERT INTO daily_sales (day, orders, subtotal, tax, service_charge, revenue)
+        SELECT day, SUM(orders), SUM(subtotal), SUM(tax), SUM(service_charge), SUM(revenue)
+        FROM ({sales})
+        GROUP BY day
+    ''', order_params)
+    cursor.execute(f'''
+        INSERT INTO daily_item_sales (day, item_id, qty, revenue)
+        SELECT day, item_id, SUM(qty), SUM(revenue)
+        FROM ({items})
+        GROUP BY day, item_id
+    ''', order_params)
+
+
+def stage_archived_sales(conn, start_date=None, end_date=None):
+    """Total the archived orders of a range of local days into temp tables.
+
+    Attaching an archive is not allowed inside a transaction, so the
+    archives are read one at a time first; rebuild_daily_sales(staged=True)
+    then swaps in the new totals in a single write transaction.
+    """
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS temp.staged_daily_sales")
+    cursor.execute("DROP TABLE IF EXISTS temp.staged_daily_item_sales")
+    cursor.execute("CREATE TEMP TABLE staged_daily_sales (day, orders, subtotal, tax, service_charge, revenue)")
+    cursor.execute("CREATE TEMP TABLE staged_daily_item_sales (day, item_id, qty, revenue)")
+    where, params = order_date_range('o.order_date', start_date, end_date)
+    for schema in order_schemas(cursor, start_date, end_date):
+        if schema == 'main':
+            continue
+        with conn:
+            cursor.execute("INSERT INTO temp.staged_daily_sales "
+                           + DAILY_SALES_SELECT.format(schema=schema, where=where), params)
+            cursor.execute("INSERT INTO temp.staged_daily_item_sales "
+                           + DAILY_ITEM_SALES_SELECT.format(schema=schema, where=where), params)
+
+
+def best_sellers(cursor, limit=10):
+    """Return (item name, quantity sold, revenue) for the top selling items"""
+    cursor.execute('''
+        SELECT m.name, SUM(l.qty) AS sold, SUM(l.qty * l.unit_price) AS revenue
+        FROM order_lines l
+        JOIN menu_items m ON m.id = l.item_id
+        GROUP BY l.item_id
+        ORDER BY sold DESC
+        LIMIT ?
+    ''', (limit,))
+    return cursor.fetchall()
+
+
+# SQLite allows ten attached databases per connection; archives beyond
+# this many are detached again, the longest attached first
+MAX_ATTACHED_ARCHIVES = 4
+
+
+def archive_schema(month):
+    """Name a month's archive file is attached under, e.g. archive_2025_01"""
+    return 'archive_' + month.replace('-', '_')
+
+
+def archive_file(cursor, path):
+    """Resolve an order_archives path, which is relative to the live database"""
+    main_file = next(row[2] for row in cursor.execute('PRAGMA database_list') if row[1] == 'main')
+    return os.path.join(os.path.dirname(main_file), path)
+
+
+def archived_months(cursor):
+    """(month, path) of every archived month, newest first"""
+    cursor.execute("SELECT month, path FROM order_archives ORDER BY month DESC")
+    return cursor.fetchall()
+
+
+def attach_archive(cursor, month, path):
+    """Attach a month's archive file unless it already is, and return its schema name"""
+    schema = archive_schema(month)
+    attached = [row[1] for row in cursor.execute('PRAGMA database_list')]
+    if schema in attached:
+        return schema
+    archives = [name for name in attached if name.startswith('archive_')]
+    for name in archives[:max(len(archives) - MAX_ATTACHED_ARCHIVES + 1, 0)]:
+        cursor.execute(f'DETACH DATABASE {name}')
+    cursor.execute(f'ATTACH DATABASE ? AS {schema}', (archive_file(cursor, path),))
+    return schema
+
+
+def attached_archives(cursor, months):
+    """Attach each (month, path) archive in turn and yield its schema name.
+
+    Unlike history paging, which skips a missing file, a read that must
+    cover the months raises FileNotFoundError rather than leave them out.
+    """
+    for month, path in months:
+        if not os.path.exists(archive_file(cursor, path)):
+            raise FileNotFoundError(f"Archive for {month} not found at {archive_file(cursor, path)}")
+        yield attach_archive(cursor, month, path)
+
+
+def order_schemas(cursor, start_date=None, end_date=None):
+    """Schemas holding the orders of an inclusive range of local days, oldest first.
+
+    The archived months the range reaches come first, each attached only
+    when the one before has been read (so read every query to the end
+    before asking for the next schema), then main. Archived months are
+    all older than the live orders, so reading them in turn keeps the
+    orders in date order.
+    """
+    # Archives are split on the UTC months order_date is stored in
+    start, end = order_date_bounds(start_date, end_date)
+    months = [(month, path) for month, path in reversed(archived_months(cursor))
+              if (not start or month >= start[:7]) and (not end or month <= end[:7])]
+    return itertools.chain(attached_archives(cursor, months), ['main'])
+
+
+def order_history_query(where, key_clause, direction, schema='main'):
+    """Order history query for the orders matching where past a pagination key.
+
+    where may use the o/c aliases and {schema}; key_clause is one of the
+    OrderPager key comparisons, or None for the first page.
+    """
+    conditions = [f"({where.format(schema=schema)})"] if where else []
+    if key_clause:
+        conditions.append(key_clause)
+    sql = ORDER_HISTORY_SELECT.format(schema=schema)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql + f" ORDER BY o.order_date {direction}, o.id {direction} LIMIT ?"
+
+
+class OrderPager:
+    """Keyset pagination over the order history, newest first.
+
+    Pages are addressed by the (order_date, id) key of a boundary row, so
+    fetching any page costs an index seek plus page_size rows no matter how
+    deep into the history it is. An optional WHERE fragment narrows the
+    orders (e.g. for search); its columns may use the o/c aliases.
+
+    Months moved out by archive.py are read only when the live orders run
+    out: a page they cannot fill carries on into the archive files, newest
+    month first, attaching each one as it is reached. Archived months are
+    all older than the live ones, so the pages stay in order. A month whose
+    archive file is missing is skipped and listed in missing_months, for
+    the caller to tell the user those orders are not shown.
+    """
+
+    OLDER_THAN = "(o.order_date, o.id) < (?, ?)"
+    NEWER_THAN = "(o.order_date, o.id) > (?, ?)"
+
+    def __init__(self, cursor, where=None, params=(), page_size=50):
+        self.cursor = cursor
+        self.where = where
+        self.params = tuple(params)
+        self.page_size = page_size
+        self.missing_months = []
+
+    def query(self, key_clause, direction, schema='main'):
+        return order_history_query(self.where, key_clause, direction, schema)
+
+    def rows(self, schema, key_clause, direction, key, limit):
+        """Return up to limit rows of one schema past key, in paging order"""
+        self.cursor.execute(self.query(key_clause, direction, schema), self.params + tuple(key) + (limit,))
+        return self.cursor.fetchall()
+
+    def fetch(self, schemas, key_clause, direction, key=()):
+        """Fill a page from each schema in turn until it is full"""
+        rows = []
+        for schema in schemas:
+            rows += self.rows(schema, key_clause, direction, key, self.page_size - len(rows))
+            if len(rows) == self.page_size:
+                break
+        return rows
+
+    def archives(self, newest_first, key=None):
+        """Attach and yield the archives a page may reach, in paging order.
+
+        Months wholly newer (or older) than key cannot hold the page and
+        are skipped without being attached.
+        """
+        months = archived_months(self.cursor)
+        if not newest_first:
+            months.reverse()
+        for month, path in months:
+            if key is not None and (month > key[0][:7] if newest_first else month < key[0][:7]):
+                continue
+            if not os.path.exists(archive_file(self.cursor, path)):
+                if month not in self.missing_months:
+                    self.missing_months.append(month)
+                continue
+            yield attach_archive(self.cursor, month, path)
+
+    def first(self):
+        """Return the newest page"""
+        return self.fetch(itertools.chain(['main'], self.archives(True)), None, 'DESC')
+
+    def older(self, key):
+        """Return the page of orders just older than key"""
+        return self.fetch(itertools.chain(['main'], self.archives(True, key)), self.OLDER_THAN, 'DESC', key)
+
+    def newer(self, key):
+        """Return the page of orders just newer than key, newest first"""
+        return self.fetch(itertools.chain(self.archives(False, key), ['main']), self.NEWER_THAN, 'ASC', key)[::-1]
+
+
+def row_key(row):
+    """(order_date, id) pagination key of an order history row"""
+    return row[-2], row[-1]
+
+
+SEARCH_LIMIT = 500
+
+# Search conditions come in pairs: an indexed form answered by FTS or the
+# bill number index and then sorted, and a walking form checked row by row
+# along idx_orders_date, which needs no sort. See OrderSearchPager.
+CUSTOMER_MATCH_WHERE = "o.customer_id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)"
+CUSTOMER_LIKE_WHERE = "LOWER(c.name) LIKE ? ESCAPE '\\' OR c.phone LIKE ? ESCAPE '\\'"
+BILL_MATCH_WHERE = "o.id IN (SELECT rowid FROM {schema}.orders_fts WHERE orders_fts MATCH ?)"
+BILL_LIKE_WHERE = "LOWER(o.bill_number) LIKE ? ESCAPE '\\'"
+BILL_RANGE_WHERE = "o.bill_number >= ? AND o.bill_number < ?"
+# The unary + keeps the bill_number index out of the walk
+BILL_RANGE_WALK_WHERE = "+o.bill_number >= ? AND +o.bill_number < ?"
+ORDER_DATE_WINDOW_WHERE = "o.order_date >= ? AND o.order_date < ? AND "
+
+# Most matches a search condition may have past the page key and still be
+# looked up and sorted; one with more is walked along the date index
+SEARCH_SORT_LIMIT = 2000
+
+
+class OrderSearchPager(OrderPager):
+    """OrderPager over the orders matching any of several search conditions.
+
+    Each condition is a pair of forms, each a (where, params): an indexed
+    one and a walking one. For every page, each condition returns its own
+    nearest page_size orders and the page keeps the nearest of those, so
+    no query sorts more than SEARCH_SORT_LIMIT rows. A condition matching
+    fewer orders than that past the key is looked up through its index and
+    sorted; one matching more walks idx_orders_date from the key and stops
+    as soon as it has the page.
+    """
+
+    def __init__(self, cursor, conditions, page_size=50):
+        super().__init__(cursor, page_size=page_size)
+        self.conditions = conditions
+
+    def matches_many(self, schema, where, params, key_clause, key):
+        """Whether where matches at least SEARCH_SORT_LIMIT orders past key"""
+        sql = f"SELECT 1 FROM {schema}.orders o WHERE ({where.format(schema=schema)})"
+        if key_clause:
+            sql += " AND " + key_clause
+        self.cursor.execute(f"SELECT COUNT(*) FROM ({sql} LIMIT ?)",
+                            tuple(params) + tuple(key) + (SEARCH_SORT_LIMIT,))
+        return self.cursor.fetchone()[0] >= SEARCH_SORT_LIMIT
+
+    def rows(self, schema, key_clause, direction, key, limit):
+        found = {}
+        for indexed, walking in self.conditions:
+            where, params = walking if self.matches_many(schema, *indexed, key_clause, key) else indexed
+            self.cursor.execute(order_history_query(where, key_clause, direction, schema),
+                                tuple(params) + tuple(key) + (limit,))
+            found.update((row[-1], row) for row in self.cursor.fetchall())
+        return sorted(found.values(), key=row_key, reverse=direction == 'DESC')[:limit]
+
+
+def fts_phrase(term):
+    """Quote a search term as an FTS5 phrase, or None if too short for trigrams"""
+    if len(term) < 3:
+        return None
+    return '"' + term.replace('"', '""') + '"'
+
+
+def like_pattern(term):
+    """LIKE pattern, for ESCAPE '\\', matching text that contains term"""
+    escaped = term.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def bill_order_dates(prefix):
+    """order_date bounds [start, end) of the bills whose number starts with prefix.
+
+    Bill numbers begin with the local date the bill was opened, and it is
+    saved that day or, when left open past midnight, the next. Returns
+    (None, None) when prefix has no date digits yet, or None when no real
+    date starts with them.
+    """
+    digits = prefix[len(BILL_PREFIX):len(BILL_PREFIX) + 8]
+    if not digits:
+        return None, None
+    if not digits.isdigit():
+        return None
+    low, high = digits.ljust(8, '0'), digits.ljust(8, '9')
+    try:
+        first = datetime.date(int(low[:4]), max(int(low[4:6]), 1), max(int(low[6:]), 1))
+        if not first.strftime('%Y%m%d').startswith(digits):
+            return None
+        month = datetime.date(int(high[:4]), min(int(high[4:6]), 12), 1)
+        month_end = (month + datetime.timedelta(days=31)).replace(day=1) - datetime.timedelta(days=1)
+        last = month.replace(day=min(int(high[6:]), month_end.day))
+        return order_date_bounds(first.isoformat(), (last + datetime.timedelta(days=1)).isoformat())
+    except (ValueError, OverflowError):
+        return None
+
+
+def all_customers(cursor):
+    """Every customer, newest first"""
+    cursor.execute("SELECT * FROM customers ORDER BY created_date DESC")
+    return cursor.fetchall()
+
+
+def search_customers(cursor, term, limit=SEARCH_LIMIT):
+    """Customers whose name or phone contains term, newest first.
+
+    Ids grow with creation, so ordering by id instead of created_date lets
+    both queries stop after the first limit matches instead of sorting all.
+    """
+    phrase = fts_phrase(term)
+    if phrase:
+        cursor.execute("""
+            SELECT * FROM customers
+            WHERE id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?
+                         ORDER BY rowid DESC LIMIT ?)
+            ORDER BY id DESC
+        """, (phrase, limit))
+    else:
+        # One or two characters cannot use the trigram index
+        cursor.execute("""
+            SELECT * FROM customers
+            WHERE LOWER(name) LIKE ? OR phone LIKE ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (f'%{term.lower()}%', f'%{term}%', limit))
+    return cursor.fetchall()
+
+
+def order_search_pager(cursor, term, page_size=50):
+    """OrderPager over orders whose customer name, phone or bill number contains term"""
+    phrase = fts_phrase(term)
+    pattern = like_pattern(term)
+    if not phrase:
+        # One or two characters cannot use the trigram index
+        return OrderPager(cursor, f"{CUSTOMER_LIKE_WHERE} OR {BILL_LIKE_WHERE}", (pattern,) * 3, page_size)
+    conditions = [((CUSTOMER_MATCH_WHERE, (phrase,)), (CUSTOMER_LIKE_WHERE, (pattern, pattern)))]
+    if term.upper().startswith(BILL_PREFIX):
+        # Every bill number shares the same leading characters, so their
+        # trigrams match nearly every order; the UNIQUE index on bill_number
+        # answers a prefix as a plain range instead, and the date the prefix
+        # spells out bounds the walk.
+        low = term.upper()
+        high = low[:-1] + chr(ord(low[-1]) + 1)
+        bounds = bill_order_dates(low)
+        if bounds == (None, None):
+            conditions.append(((BILL_RANGE_WHERE, (low, high)), (BILL_RANGE_WALK_WHERE, (low, high))))
+        elif bounds:
+            conditions.append(((BILL_RANGE_WHERE, (low, high)),
+                               (ORDER_DATE_WINDOW_WHERE + BILL_RANGE_WALK_WHERE, bounds + (low, high))))
+    else:
+        conditions.append(((BILL_MATCH_WHERE, (phrase,)), (BILL_LIKE_WHERE, (pattern,))))
+    return OrderSearchPager(cursor, conditions, page_size)
+
+
+# Fragment each hot query's EXPLAIN QUERY PLAN output must contain
+EXPECTED_PLANS = {
+    'customer_by_phone': (CUSTOMER_BY_PHONE_SQL, ('0300',),
+                          'SEARCH customers USING INDEX sqlite_autoindex_customers_1 (phone=?)'),
+    'last_order': (LAST_ORDER_SQL, (1,),
+                   'SEARCH orders USING COVERING INDEX idx_orders_customer_date (customer_id=?)'),
+    'order_history': (OrderPager(None).query(None, 'DESC'), (50,),
+                      'SCAN o USING INDEX idx_orders_date'),
+    'order_history_page': (OrderPager(None).query(OrderPager.OLDER_THAN, 'DESC'),
+                           ('2025-01-01 00:00:00', 1, 50),
+                           'SEARCH o USING INDEX idx_orders_date (order_date<?)'),
+    'order_search_walk': (order_history_query(f"{CUSTOMER_LIKE_WHERE} OR {BILL_LIKE_WHERE}",
+                                              OrderPager.OLDER_THAN, 'DESC'),
+                          ('%khan%', '%khan%', '%khan%', '2025-01-01 00:00:00', 1, 50),
+                          'SEARCH o USING INDEX idx_orders_date (order_date<?)'),
+    'bill_prefix_search': (order_history_query(BILL_RANGE_WHERE, None, 'DESC'),
+                           ('BILL2025', 'BILL2026', 50),
+                           'SEARCH o USING INDEX sqlite_autoindex_orders_1 (bill_number>? AND bill_number<?)'),
+    'bill_prefix_walk': (order_history_query(ORDER_DATE_WINDOW_WHERE + BILL_RANGE_WALK_WHERE,
+                                             OrderPager.OLDER_THAN, 'DESC'),
+                         ('2024-12-31 19:00:00', '2026-01-01 19:00:00', 'BILL2025', 'BILL2026',
+                          '2025-06-01 00:00:00', 1, 50),
+                         'SEARCH o USING INDEX idx_orders_date (order_date>? AND order_date<?)'),
+}
+
+
+def query_plan(cursor, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for a query"""
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    return [row[3] for row in cursor.fetchall()]
+
+
+def check_query_plans(conn):
+    """Return {name: plan} for every hot query whose plan is not the expected one"""
+    cursor = conn.cursor()
+    problems = {}
+    for name, (sql, params, expected) in EXPECTED_PLANS.items():
+        plan = query_plan(cursor, sql, params)
+        if expected not in plan:
+            problems[name] = plan
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the billing database")
+    parser.add_argument('--db', default=DB_PATH, help="database file")
+    parser.add_argument('--check-plans', action='store_true',
+                        help="verify the hot queries use their indexes")
+    parser.add_argument('--journal', choices=['wal', 'delete'],
+                        help="wal: faster with several tills, but all must run on this PC; "
+                             "delete: the rollback journal (default), for a database on a network share")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    print(f"Schema version {SCHEMA_VERSION}")
+    if args.journal:
+        mode = set_journal_mode(conn, args.journal == 'wal')
+        if mode != args.journal:
+            print(f"Could not switch to {args.journal} (still {mode}); close the other terminals first")
+            sys.exit(1)
+    print(f"Journal mode {journal_mode(conn)}")
+    if args.check_plans:
+        problems = check_query_plans(conn)
+        for name, plan in problems.items():
+            print(f"{name}: unexpected plan {plan}")
+        if problems:
+            sys.exit(1)
+        print("All query plans use their indexes")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
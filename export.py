@@ -0,0 +1,239 @@
+"""Streaming export of customers and orders for accounting.
+
+Rows are read from SQLite with fetchmany() a chunk at a time and written
+out as they arrive, so memory use stays flat however many rows there are.
+Orders are exported with their line items; lines exports one row per item.
+Months moved out by archive.py are read from their archive files.
+
+    python export.py orders --from 2025-08-01 --to 2025-08-31 -o august.csv
+    python export.py lines -o lines.parquet
+    python export.py customers -o customers.jsonl
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import database
+
+CUSTOMER_COLUMNS = ('id', 'name', 'phone', 'created_date')
+ORDER_COLUMNS = ('id', 'bill_number', 'order_date', 'customer_id', 'customer_name', 'customer_phone',
+                 'subtotal', 'tax', 'service_charge', 'total', 'items')
+LINE_COLUMNS = ('order_id', 'bill_number', 'order_date', 'item', 'qty', 'unit_price', 'line_total')
+
+CUSTOMER_EXPORT_SELECT = "SELECT id, name, phone, created_date FROM customers"
+
+# Orders in date order, each followed by its lines (LEFT JOIN keeps orders without any).
+# {schema} is main or an attached archive.
+ORDER_EXPORT_SELECT = """
+    SELECT o.id, o.bill_number, o.order_date, c.id, c.name, c.phone,
+           o.subtotal, o.tax_amount, o.service_charge, o.total_amount,
+           m.name, l.qty, l.unit_price
+    FROM {schema}.orders o
+    JOIN customers c ON c.id = o.customer_id
+    LEFT JOIN {schema}.order_lines l ON l.order_id = o.id
+    LEFT JOIN menu_items m ON m.id = l.item_id
+"""
+
+CHUNK = 5000
+
+
+def date_range(column, start_date=None, end_date=None):
+    """WHERE clause and params for an inclusive 'YYYY-MM-DD' date range"""
+    conditions, params = [], []
+    if start_date:
+        conditions.append(f"{column} >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{column} < date(?, '+1 day')")
+        params.append(end_date)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def fetch_rows(cursor, sql, params=(), chunk=CHUNK):
+    """Yield a query's rows, fetching chunk rows at a time"""
+    cursor.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(chunk)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_customers(cursor, start_date=None, end_date=None, chunk=CHUNK):
+    """Yield CUSTOMER_COLUMNS rows, filtered on the date each customer was added.
+
+    Customers are never archived, so the live table holds them all.
+    """
+    where, params = date_range('created_date', start_date, end_date)
+    return fetch_rows(cursor, CUSTOMER_EXPORT_SELECT + where + " ORDER BY id", params, chunk)
+
+
+def iter_orders(cursor, start_date=None, end_date=None, chunk=CHUNK):
+    """Yield ORDER_COLUMNS rows; items is a list of {item, qty, unit_price, line_total}.
+
+    Dates are local days; order_date is written as stored, in UTC.
+    """
+    where, params = database.order_date_range('o.order_date', start_date, end_date)
+    sql = ORDER_EXPORT_SELECT + where + " ORDER BY o.order_date, o.id"
+    order = items = None
+    rows = itertools.chain.from_iterable(fetch_rows(cursor, sql.format(schema=schema), params, chunk)
+                                         for schema in database.order_schemas(cursor, start_date, end_date))
+    for row in rows:
+        if order is None or row[0] != order[0]:
+            if order is not None:
+                yield order + (items,)
+            order = row[:10]
+            items = []
+        item_name, qty, unit_price = row[10:]
+        if item_name is not None:
+            unit_price = unit_price or 0
+            items.append({'item': item_name, 'qty': qty, 'unit_price': unit_price,
+                          'line_total': qty * unit_price})
+    if order is not None:
+        yield order + (items,)
+
+
+def iter_lines(cursor, start_date=None, end_date=None, chunk=CHUNK):
+    """Yield LINE_COLUMNS rows, one per item of each order"""
+    for order in iter_orders(cursor, start_date, end_date, chunk):
+        for line in order[10]:
+            yield (order[0], order[1], order[2], line['item'], line['qty'],
+                   line['unit_price'], line['line_total'])
+
+
+DATASETS = {
+    'customers': (CUSTOMER_COLUMNS, iter_customers),
+    'orders': (ORDER_COLUMNS, iter_orders),
+    'lines': (LINE_COLUMNS, iter_lines),
+}
+
+
+class CsvWriter:
+    """CSV with a header row; nested values are written as JSON"""
+
+    def __init__(self, f, columns):
+        self.writer = csv.writer(f)
+        self.writer.writerow(columns)
+
+    def write(self, row):
+        self.writer.writerow([json.dumps(value) if isinstance(value, list) else value for value in row])
+
+    def close(self):
+        pass
+
+
+class JsonLinesWriter:
+    """One JSON object per line"""
+
+    def __init__(self, f, columns):
+        self.f = f
+        self.columns = columns
+
+    def write(self, row):
+        self.f.write(json.dumps(dict(zip(self.columns, row))) + "\n")
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """Parquet via pyarrow, one row group per batch of rows"""
+
+    def __init__(self, path, columns, batch_size=20000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+        self.pa = pyarrow
+        self.columns = columns
+        self.schema = self.parquet_schema(columns)
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.batch = []
+
+    def parquet_schema(self, columns):
+        pa = self.pa
+        types = {
+            'id': pa.int64(), 'order_id': pa.int64(), 'customer_id': pa.int64(), 'qty': pa.int64(),
+            'subtotal': pa.float64(), 'tax': pa.float64(), 'service_charge': pa.float64(),
+            'total': pa.float64(), 'unit_price': pa.float64(), 'line_total': pa.float64(),
+            'items': pa.list_(pa.struct([('item', pa.string()), ('qty', pa.int64()),
+                                         ('unit_price', pa.float64()), ('line_total', pa.float64())])),
+        }
+        return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+    def write(self, row):
+        self.batch.append(row)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            arrays = [self.pa.array(values, type=field.type)
+                      for values, field in zip(zip(*self.batch), self.schema)]
+            self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+            self.batch = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def output_format(path, requested=None):
+    """The requested format, else the one the file extension names, else CSV"""
+    if requested:
+        return requested
+    extension = os.path.splitext(path)[1].lower()
+    return {'.jsonl': 'jsonl', '.json': 'jsonl', '.parquet': 'parquet'}.get(extension, 'csv')
+
+
+def export(cursor, dataset, path, fmt=None, start_date=None, end_date=None):
+    """Stream one dataset to a file ('-' for stdout) and return the row count"""
+    columns, rows = DATASETS[dataset]
+    fmt = output_format(path, fmt)
+    f = None
+    if fmt == 'parquet':
+        if path == '-':
+            raise RuntimeError("Parquet can only be written to a file")
+        writer = ParquetWriter(path, columns)
+    else:
+        f = sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        writer = CsvWriter(f, columns) if fmt == 'csv' else JsonLinesWriter(f, columns)
+    count = 0
+    try:
+        for row in rows(cursor, start_date, end_date):
+            writer.write(row)
+            count += 1
+        writer.close()
+    finally:
+        if f is not None and f is not sys.stdout:
+            f.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export customers and orders")
+    parser.add_argument('dataset', choices=list(DATASETS))
+    parser.add_argument('-o', '--output', default='-', help="output file ('-' for stdout)")
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'parquet'],
+                        help="output format (default: from the file extension, else CSV)")
+    parser.add_argument('--from', dest='start', metavar='YYYY-MM-DD', help="first date")
+    parser.add_argument('--to', dest='end', metavar='YYYY-MM-DD', help="last date")
+    parser.add_argument('--db', default=database.DB_PATH, help="database file")
+    args = parser.parse_args(argv)
+
+    conn = database.connect(args.db)
+    try:
+        count = export(conn.cursor(), args.dataset, args.output, args.format, args.start, args.end)
+    except (RuntimeError, FileNotFoundError) as e:
+        parser.error(str(e))
+    finally:
+        conn.close()
+    print(f"Exported {count} {args.dataset}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Paginated order history Treeview"""
+import collections
+from database import row_key
+
+
+def format_order_row(order):
+    """Format an order history row for display"""
+    return (
+        order[0],  # Bill number
+        order[1],  # Customer name
+        order[2],  # Phone
+        f"Rs. {order[3]:.2f}",  # Subtotal
+        f"Rs. {order[4]:.2f}",  # Tax
+        f"Rs. {order[5]:.2f}",  # Service charge
+        f"Rs. {order[6]:.2f}",  # Total
+        order[7][:16]  # Date (formatted)
+    )
+
+
+class PagedOrderTree:
+    """Shows an OrderPager's results in a Treeview a few pages at a time.
+
+    Only a sliding window of max_pages pages is kept in the widget. Scrolling
+    near the bottom fetches the next older page and drops the newest one
+    from the top (and the other way round), so memory use and load time do
+    not depend on how many orders the database holds.
+    """
+
+    Page = collections.namedtuple('Page', ['item_ids', 'first_key', 'last_key'])
+
+    def __init__(self, tree, scrollbar, notice=None, max_pages=6, edge=0.05):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.notice = notice
+        self.max_pages = max_pages
+        self.edge = edge
+        self.pager = None
+        self.pages = collections.deque()
+        self.more_older = False
+        self.more_newer = False
+        self.scheduled = False
+        self.tree.configure(yscrollcommand=self.on_scroll)
+
+    def load(self, pager, rows=None):
+        """Show the newest page of a pager, replacing the current contents
+
+        rows may hold that page already fetched elsewhere (e.g. by a
+        background search) to save running the query again.
+        """
+        self.pager = pager
+        self.tree.delete(*self.tree.get_children())
+        self.pages.clear()
+        self.more_newer = False
+        if rows is None:
+            rows = pager.first()
+        self.more_older = len(rows) == pager.page_size
+        if rows:
+            self.add_page(rows, at_end=True)
+        self.show_missing()
+
+    def show_missing(self):
+        """Name the archived months the pager had to skip, in the notice StringVar"""
+        if self.notice is not None:
+            months = self.pager.missing_months
+            self.notice.set(f"Archive file missing for {', '.join(months)}; those orders are not shown"
+                            if months else "")
+
+    def at_top(self):
+        """True while the newest loaded row is the newest there is and is in view"""
+        return not self.more_newer and self.tree.yview()[0] <= 0
+
+    def newer_rows_available(self):
+        """Note that newer orders exist, to be fetched when the user scrolls up"""
+        if self.pager is not None:
+            self.more_newer = True
+
+    def add_page(self, rows, at_end):
+        index = 'end' if at_end else 0
+        if at_end:
+            item_ids = [self.tree.insert('', index, values=format_order_row(row)) for row in rows]
+        else:
+            item_ids = [self.tree.insert('', index, values=format_order_row(row)) for row in reversed(rows)][::-1]
+        page = self.Page(item_ids, row_key(rows[0]), row_key(rows[-1]))
+        if at_end:
+            self.pages.append(page)
+        else:
+            self.pages.appendleft(page)
+
+    def drop_page(self, from_end):
+        page = self.pages.pop() if from_end else self.pages.popleft()
+        self.tree.delete(*page.item_ids)
+        if from_end:
+            self.more_older = True
+        else:
+            self.more_newer = True
+
+    def on_scroll(self, first, last):
+        """yscrollcommand hook: keep the scrollbar in step and page at the edges"""
+        self.scrollbar.set(first, last)
+        if self.pager is None or self.scheduled:
+            return
+        if (float(last) >= 1 - self.edge and self.more_older) or \
+                (float(first) <= self.edge and self.more_newer):
+            # Page after the current redraw so a fetch never nests in another
+            self.scheduled = True
+            self.tree.after_idle(self.page_edges)
+
+    def page_edges(self):
+        self.scheduled = False
+        first, last = self.tree.yview()
+        top_item = self.tree.identify_row(1)
+
+        if last >= 1 - self.edge and self.more_older and self.pages:
+            rows = self.pager.older(self.pages[-1].last_key)
+            self.more_older = len(rows) == self.pager.page_size
+            if rows:
+                self.add_page(rows, at_end=True)
+                if len(self.pages) > self.max_pages:
+                    self.drop_page(from_end=False)
+        elif first <= self.edge and self.more_newer and self.pages:
+            rows = self.pager.newer(self.pages[0].first_key)
+            self.more_newer = len(rows) == self.pager.page_size
+            if rows:
+                self.add_page(rows, at_end=False)
+                if len(self.pages) > self.max_pages:
+                    self.drop_page(from_end=True)
+        else:
+            return
+        self.show_missing()
+
+        # Keep the row the user was looking at in the same place
+        if top_item and self.tree.exists(top_item):
+            children = len(self.tree.get_children())
+            self.tree.yview_moveto(self.tree.index(top_item) / max(children, 1))
@@ -0,0 +1,460 @@
+"""Kitchen order tickets streamed from the tills to kitchen display stations.
+
+A small asyncio server sits between them. Each till sends the full item
+list of a bill whenever it is sent to the kitchen or saved; the server
+keeps the open tickets and tells every display what changed - a new
+ticket, the items added and removed since the last send, or a ticket
+marked served - as one line of JSON each. A display that connects (or
+reconnects) first gets a snapshot of the open tickets. The server acks
+every till message once applied, and the till keeps resending a message
+until it has been acked.
+
+Displays are fed from a bounded queue each. One that stops reading
+cannot hold up the others or grow the server's memory: once its queue is
+full it is disconnected, and catches up from a fresh snapshot when it
+reconnects.
+
+    python kitchen.py serve
+    python kitchen.py display
+    python kitchen.py serve --listen unix:/tmp/kitchen.sock
+    python kitchen.py served BILL20250802185727000001
+"""
+import argparse
+import asyncio
+import collections
+import datetime
+import itertools
+import json
+import socket
+import threading
+import time
+
+ADDRESS = '127.0.0.1:50998'
+
+# Kernel send buffer per display. Left to autotune it can absorb megabytes
+# for a display that has stopped reading before its queue starts to fill.
+DISPLAY_SEND_BUFFER = 64 * 1024
+
+
+def parse_address(address):
+    """'host:port' -> ('tcp', host, port); 'unix:/path' -> ('unix', path)"""
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return 'tcp', host or '127.0.0.1', int(port)
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def decode(line):
+    """Parse one line as a JSON object, or return None if it is not one"""
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
+
+
+async def open_connection(address):
+    kind, *where = parse_address(address)
+    if kind == 'unix':
+        return await asyncio.open_unix_connection(*where)
+    return await asyncio.open_connection(*where)
+
+
+class Display:
+    """A connected display and the events waiting to be written to it"""
+
+    def __init__(self, writer, max_queue):
+        self.writer = writer
+        self.queue = asyncio.Queue(max_queue)
+        self.sender = asyncio.ensure_future(self.send())
+
+    async def send(self):
+        """Write whatever has queued up in one go, then wait for the socket to drain"""
+        while True:
+            chunks = [await self.queue.get()]
+            while not self.queue.empty():
+                chunks.append(self.queue.get_nowait())
+            self.writer.write(b''.join(chunks))
+            await self.writer.drain()
+
+    def disconnect(self):
+        self.writer.transport.abort()
+        self.sender.cancel()
+
+
+class KitchenServer:
+    """Keeps the open tickets and broadcasts their changes to the displays.
+
+    Everything runs on one event loop, so tickets and displays need no
+    locking. Broadcasting only queues the encoded event for each display,
+    whose own task writes it out, so a slow socket never delays the
+    broadcast or the other displays.
+    """
+
+    def __init__(self, max_tickets=200, max_queue=1000):
+        self.max_tickets = max_tickets
+        self.max_queue = max_queue
+        self.tickets = collections.OrderedDict()   # bill number -> ticket, oldest first
+        self.displays = set()
+        self.connections = {}   # handler task -> its writer, tills and displays alike
+        self.dropped = 0
+        self.server = None
+
+    async def start(self, address=ADDRESS):
+        kind, *where = parse_address(address)
+        if kind == 'unix':
+            self.server = await asyncio.start_unix_server(self.handle, *where)
+        else:
+            self.server = await asyncio.start_server(self.handle, *where)
+        return self.server
+
+    async def close(self):
+        self.server.close()
+        for writer in self.connections.values():
+            writer.transport.abort()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            # A missing or garbled hello is taken for a till's
+            hello = decode(await reader.readline()) or {}
+            if hello.get('role') == 'display':
+                await self.serve_display(reader, writer)
+            else:
+                await self.serve_till(reader, writer)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            del self.connections[task]
+            writer.close()
+
+    async def serve_till(self, reader, writer):
+        async for line in reader:
+            message = decode(line)
+            if message is None:
+                continue
+            if message.get('type') == 'order':
+                self.apply(message)
+            elif message.get('type') == 'served':
+                self.served(message)
+            # Only now may the till stop resending it
+            writer.write(encode({'ack': message.get('id'), 'bill': message.get('bill')}))
+            await writer.drain()
+
+    def apply(self, message):
+        """Update a bill's ticket from a till's message and broadcast the change"""
+        bill = message['bill']
+        items = {name: qty for name, qty in message['items'].items() if qty > 0}
+        ticket = self.tickets.get(bill)
+        if ticket is None:
+            if not items:
+                return
+            ticket = {'bill': bill, 'customer': message.get('customer'), 'terminal': message.get('terminal'),
+                      'items': items, 'sent': message.get('sent')}
+            self.tickets[bill] = ticket
+            if len(self.tickets) > self.max_tickets:
+                self.tickets.popitem(last=False)
+            self.broadcast(dict(ticket, type='ticket'))
+            return
+
+        old = ticket['items']
+        added = {name: qty - old.get(name, 0) for name, qty in items.items() if qty > old.get(name, 0)}
+        removed = {name: qty - items.get(name, 0) for name, qty in old.items() if qty > items.get(name, 0)}
+        if not added and not removed:
+            return   # Sent again unchanged, e.g. on save after Send to Kitchen
+        ticket['items'] = items
+        self.tickets.move_to_end(bill)
+        self.broadcast({'type': 'update', 'bill': bill, 'added': added, 'removed': removed,
+                        'items': items, 'sent': message.get('sent')})
+
+    def served(self, message):
+        """Close a bill's ticket and take it off the displays"""
+        if self.tickets.pop(message['bill'], None) is not None:
+            self.broadcast({'type': 'served', 'bill': message['bill'], 'sent': message.get('sent')})
+
+    def broadcast(self, event):
+        data = encode(event)
+        for display in list(self.displays):
+            try:
+                display.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self.drop(display)
+
+    def drop(self, display):
+        """Disconnect a display that has fallen too far behind"""
+        self.displays.discard(display)
+        self.dropped += 1
+        display.disconnect()
+
+    async def serve_display(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, DISPLAY_SEND_BUFFER)
+        display = Display(writer, self.max_queue)
+        display.queue.put_nowait(encode({'type': 'snapshot', 'tickets': list(self.tickets.values())}))
+        self.displays.add(display)
+        # Displays send nothing after their hello, so this read ends when one hangs up
+        hung_up = asyncio.ensure_future(reader.read())
+        try:
+            await asyncio.wait([display.sender, hung_up], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.displays.discard(display)
+            display.sender.cancel()
+            hung_up.cancel()
+
+
+class KitchenPublisher:
+    """Sends this till's bills to the kitchen server from a background thread.
+
+    send() only records the bill's latest items and returns, so the Tk
+    thread never waits on the network. Bills are held while the server
+    is unreachable - only the newest state of each, and at most
+    max_pending bills - and sent once it is back. A bill stays pending
+    until the server acks it, so a message written into a connection
+    that turns out to be dead is sent again on the next one. Messages are
+    not held back waiting for the previous ack; a second thread reads
+    the acks as they come.
+    """
+
+    retry_seconds = 2
+
+    def __init__(self, address=ADDRESS, terminal=None, max_pending=500):
+        self.address = address
+        self.terminal = terminal
+        self.max_pending = max_pending
+        self.pending = collections.OrderedDict()   # bill number -> message not yet acked
+        self.unsent = collections.OrderedDict()    # bills whose message is not on the current connection
+        self.ids = itertools.count(1)
+        self.wake = threading.Condition()
+        self.sock = None
+        self.waiting_since = None   # when the oldest unanswered write went out
+        self.connected = None   # None until the first attempt to connect
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def send(self, bill_number, customer, items):
+        """Queue a bill's current items (item -> qty) for the kitchen"""
+        self.queue({'type': 'order', 'bill': bill_number, 'customer': customer, 'terminal': self.terminal,
+                    'items': dict(items)})
+
+    def served(self, bill_number):
+        """Queue a bill's ticket to be closed on the kitchen displays"""
+        self.queue({'type': 'served', 'bill': bill_number, 'terminal': self.terminal})
+
+    def delivered(self, bill_number):
+        """Whether the server has acked the latest message for a bill"""
+        with self.wake:
+            return bill_number not in self.pending
+
+    def queue(self, message):
+        bill_number = message['bill']
+        message.update(id=next(self.ids), sent=time.time())
+        with self.wake:
+            self.pending.pop(bill_number, None)
+            self.pending[bill_number] = message
+            self.unsent[bill_number] = None
+            if len(self.pending) > self.max_pending:
+                self.unsent.pop(self.pending.popitem(last=False)[0], None)
+            self.wake.notify()
+
+    def close(self):
+        with self.wake:
+            self.closed = True
+            self.wake.notify()
+            sock = self.sock
+        if sock is not None:
+            self.disconnect(sock)
+
+    def connect(self):
+        kind, *where = parse_address(self.address)
+        if kind == 'unix':
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.retry_seconds)
+            sock.connect(where[0])
+        else:
+            sock = socket.create_connection(tuple(where), timeout=self.retry_seconds)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(encode({'role': 'till', 'terminal': self.terminal}))
+        return sock
+
+    def disconnect(self, sock):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)   # wakes the ack reader
+        except OSError:
+            pass
+        sock.close()
+        with self.wake:
+            if self.sock is sock:
+                self.sock = self.waiting_since = None
+                self.connected = False
+                self.wake.notify()
+
+    def run(self):
+        # Connects straight away and stays connected, so `connected` is right before the first send
+        while True:
+            with self.wake:
+                while not self.closed and self.sock is not None and not self.unsent:
+                    self.wake.wait()
+                if self.closed:
+                    break
+                sock = self.sock
+                batch = [self.pending[bill] for bill in self.unsent]
+                self.unsent.clear()
+            if sock is None:
+                try:
+                    sock = self.connect()
+                except OSError:
+                    self.connected = False
+                    with self.wake:
+                        self.wake.wait(self.retry_seconds)
+                    continue
+                with self.wake:
+                    # Everything not acked yet goes again on the new connection
+                    self.sock = sock
+                    self.unsent = collections.OrderedDict.fromkeys(self.pending)
+                    self.connected = True
+                threading.Thread(target=self.read_acks, args=(sock,), daemon=True).start()
+                continue
+            try:
+                sock.sendall(b''.join(map(encode, batch)))
+            except OSError:
+                self.disconnect(sock)
+                continue
+            with self.wake:
+                if self.waiting_since is None:
+                    self.waiting_since = time.monotonic()
+
+    def read_acks(self, sock):
+        """Drop acked messages from pending until the connection fails or stops answering"""
+        buffer = b''
+        while True:
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                # A write into a connection the server has dropped still succeeds;
+                # only a missing ack shows it never arrived
+                with self.wake:
+                    if self.waiting_since is None or time.monotonic() - self.waiting_since < self.retry_seconds:
+                        continue
+                break
+            except OSError:
+                break
+            if not data:
+                break
+            *lines, buffer = (buffer + data).split(b'\n')
+            with self.wake:
+                for line in lines:
+                    ack = decode(line)
+                    if ack is None:
+                        continue
+                    message = self.pending.get(ack.get('bill'))
+                    # Unless a newer state of the bill has been queued meanwhile
+                    if message is not None and message['id'] == ack.get('ack'):
+                        del self.pending[ack['bill']]
+                self.waiting_since = time.monotonic() if self.pending else None
+        self.disconnect(sock)
+
+
+def format_event(event):
+    """Lines a console display prints for one server event"""
+    stamp = datetime.datetime.fromtimestamp(event.get('sent') or time.time()).strftime('%H:%M:%S')
+    if event['type'] == 'ticket':
+        lines = [f"[{stamp}] NEW     {event['bill']}  {event.get('customer') or ''}"]
+        lines += [f"            {qty} x {name}" for name, qty in event['items'].items()]
+        return lines
+    if event['type'] == 'served':
+        return [f"[{stamp}] SERVED  {event['bill']}"]
+    changes = [f"+{qty} {name}" for name, qty in event['added'].items()]
+    changes += [f"-{qty} {name}" for name, qty in event['removed'].items()]
+    return [f"[{stamp}] CHANGED {event['bill']}  " + ', '.join(changes)]
+
+
+async def watch(address=ADDRESS, show=print, retry_seconds=2):
+    """Console kitchen display: print tickets and changes as they arrive, reconnecting as needed"""
+    while True:
+        try:
+            reader, writer = await open_connection(address)
+        except OSError:
+            await asyncio.sleep(retry_seconds)
+            continue
+        writer.write(encode({'role': 'display'}))
+        try:
+            async for line in reader:
+                event = decode(line)
+                if event is None:
+                    show("--- skipped a garbled message ---")
+                    continue
+                if event.get('type') == 'snapshot':
+                    show(f"--- {len(event['tickets'])} open tickets ---")
+                    for ticket in event['tickets']:
+                        for text in format_event(dict(ticket, type='ticket')):
+                            show(text)
+                else:
+                    for text in format_event(event):
+                        show(text)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+        show("--- disconnected from the kitchen server, reconnecting ---")
+        await asyncio.sleep(retry_seconds)
+
+
+async def serve(address, max_tickets):
+    server = KitchenServer(max_tickets)
+    await server.start(address)
+    print(f"Kitchen server listening on {address}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+def mark_served(address, bill_numbers, timeout=10):
+    """Close tickets from the command line; return the bills the server did not ack in time"""
+    publisher = KitchenPublisher(address, 'kitchen')
+    for bill_number in bill_numbers:
+        publisher.served(bill_number)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not all(map(publisher.delivered, bill_numbers)):
+        time.sleep(0.05)
+    publisher.close()
+    return [bill_number for bill_number in bill_numbers if not publisher.delivered(bill_number)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream kitchen order tickets from the tills to the kitchen")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help="run the kitchen server")
+    serve_parser.add_argument('--listen', default=ADDRESS, help="host:port or unix:/path (default %(default)s)")
+    serve_parser.add_argument('--max-tickets', type=int, default=200, help="open tickets kept for new displays")
+    display_parser = commands.add_parser('display', help="show tickets as they arrive")
+    display_parser.add_argument('--server', default=ADDRESS, help="host:port or unix:/path (default %(default)s)")
+    served_parser = commands.add_parser('served', help="take served bills off the displays")
+    served_parser.add_argument('bills', nargs='+', metavar='BILL')
+    served_parser.add_argument('--server', default=ADDRESS, help="host:port or unix:/path (default %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'serve':
+            asyncio.run(serve(args.listen, args.max_tickets))
+        elif args.command == 'served':
+            failed = mark_served(args.server, args.bills)
+            if failed:
+                parser.exit(1, f"Kitchen server did not confirm: {' '.join(failed)}\n")
+        else:
+            asyncio.run(watch(args.server, lambda text: print(text, flush=True)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Debounced search-as-you-type with queries run off the Tk main thread"""
+import queue
+import sqlite3
+import threading
+
+
+class SearchWorker:
+    """Runs search queries on one background thread with its own connection.
+
+    The Tk thread only queues jobs and later picks up results, so typing
+    never waits on SQLite. A job superseded by a newer keystroke is skipped
+    if still queued and interrupted if already running.
+    """
+
+    poll_ms = 15
+
+    def __init__(self, db_path, factory=sqlite3.Connection):
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.conn = None
+        self.running = None
+        self.polling = False
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(db_path, factory), daemon=True)
+        self.thread.start()
+
+    def run(self, db_path, factory):
+        # The app has already migrated the schema, so a plain connection will do
+        self.conn = sqlite3.connect(db_path, factory=factory)
+        cursor = self.conn.cursor()
+        self.ready.set()
+        while True:
+            job = self.requests.get()
+            if job is None:
+                break
+            search, generation, term = job
+            while generation == search.generation:
+                self.running = search
+                try:
+                    result = search.query(cursor, term)
+                except sqlite3.OperationalError as e:
+                    if 'interrupt' not in str(e):
+                        result = e
+                    elif generation == search.generation:
+                        # Interrupted on behalf of another search box - run it again
+                        continue
+                    else:
+                        break
+                finally:
+                    self.running = None
+                self.results.put((search, generation, term, result))
+                break
+        self.conn.close()
+
+    def submit(self, search, generation, term, root):
+        """Queue a query for a search box, cancelling its in-flight one"""
+        if self.running is search and self.ready.is_set():
+            self.conn.interrupt()
+        self.requests.put((search, generation, term))
+        if not self.polling:
+            self.polling = True
+            root.after(self.poll_ms, self.poll, root)
+
+    def poll(self, root):
+        """Deliver finished results on the Tk thread, dropping stale ones"""
+        while True:
+            try:
+                search, generation, term, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == search.generation:
+                search.deliver(term, result)
+
+        if self.running is not None or not self.requests.empty() or not self.results.empty():
+            root.after(self.poll_ms, self.poll, root)
+        else:
+            self.polling = False
+
+    def close(self):
+        self.requests.put(None)
+
+
+class LiveSearch:
+    """Re-runs a search a short delay after the user stops typing.
+
+    query(cursor, term) runs on the worker thread; apply(term, result) runs
+    on the Tk thread with the result of the newest query only.
+    """
+
+    def __init__(self, root, worker, variable, query, apply, delay_ms=250):
+        self.root = root
+        self.worker = worker
+        self.variable = variable
+        self.query = query
+        self.apply = apply
+        self.delay_ms = delay_ms
+        self.generation = 0
+        self.pending = None
+        variable.trace_add('write', self.on_change)
+
+    def on_change(self, *args):
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+        self.pending = self.root.after(self.delay_ms, self.run)
+
+    def run(self):
+        """Search for the current text now"""
+        if self.pending is not None:
+            self.root.after_cancel(self.pending)
+            self.pending = None
+        self.generation += 1
+        self.worker.submit(self, self.generation, self.variable.get().strip(), self.root)
+
+    def deliver(self, term, result):
+        if isinstance(result, Exception):
+            raise result
+        self.apply(term, result)
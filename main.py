@@ -1,19 +1,78 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import sqlite3
-from fpdf import FPDF
+import argparse
 import datetime
+import importlib
 import os
-import json
+import queue
+import sys
+import time
+import database
+from billing import BillNumberGenerator
+from bill_pdf import BillJob, PdfWorkerPool, bill_job, render_bills
+from bill_renderer import IncrementalBillRenderer
+from change_feed import ChangeNotifier
+from customer_cache import CustomerCache
+from history_view import PagedOrderTree
+from kitchen import ADDRESS as KITCHEN_ADDRESS, KitchenPublisher
+from live_search import LiveSearch, SearchWorker
+from menu_catalog import MenuCatalog
+from menu_grid import VirtualMenuGrid
+from metrics import Metrics
+from order_store import OrderStore
+
+class StartupProfile:
+    """Wall-clock time spent in each startup phase, for --profile-startup"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []
+        
+    def mark(self, phase):
+        """Record the time since the previous mark against a phase"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+        
+    def report(self, deferred=()):
+        lines = ["Startup phases:"]
+        for phase, seconds in self.phases:
+            lines.append(f"  {phase:<28} {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'ready for input':<28} {(self.last - self.started) * 1000:8.1f} ms")
+        if deferred:
+            lines.append("Deferred until first use:")
+            for phase, seconds in deferred:
+                lines.append(f"  {phase:<28} {seconds * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+# Cashier actions timed when the till runs with --metrics
+INSTRUMENTED_ACTIONS = ('save_order', 'send_to_kitchen', 'find_customer', 'update_bill_display',
+                        'generate_pdf', 'load_order_history', 'search_customers', 'search_orders',
+                        'query_customers', 'query_orders')
 
 class ModernRestaurantBilling:
-    def __init__(self, root):
+    def __init__(self, root, profile=None, metrics=None, kitchen_address=KITCHEN_ADDRESS):
         self.root = root
+        self.profile = profile
+        self.metrics = metrics
+        self.kitchen_address = kitchen_address
         self.setup_window()
+        self.mark('window')
         self.setup_database()
+        if metrics is not None:
+            self.start_metrics()
+        self.mark('database')
         self.setup_variables()
+        self.mark('menu and variables')
         self.create_modern_ui()
-        self.load_customers()
+        self.mark('New Order tab')
+        self.check_remote_changes()
+        
+    def mark(self, phase):
+        if self.profile is not None:
+            self.profile.mark(phase)
         
     def setup_window(self):
         self.root.title("🍽️ Pakistani & Chinese Restaurant")
@@ -39,96 +98,60 @@ class ModernRestaurantBilling:
         
     def setup_database(self):
         """Initialize SQLite database for customers and orders"""
-        self.conn = sqlite3.connect('restaurant_billing.db')
+        # With --metrics every statement is timed; otherwise a plain connection
+        self.connection_factory = (self.metrics.connection_factory() if self.metrics is not None
+                                   else sqlite3.Connection)
+        self.conn = database.connect(database.DB_PATH, self.connection_factory)
         self.cursor = self.conn.cursor()
         
-        # Create customers table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT UNIQUE NOT NULL,
-                created_date DATE DEFAULT CURRENT_DATE
-            )
-        ''')
-        
-        # Create orders table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                bill_number TEXT UNIQUE,
-                order_data TEXT,
-                subtotal REAL,
-                tax_amount REAL,
-                service_charge REAL,
-                total_amount REAL,
-                order_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers (id)
-            )
-        ''')
-        
-        self.conn.commit()
+        # Bill numbers carry this terminal's id so tills never collide
+        self.bill_numbers = BillNumberGenerator(database.register_terminal(self.conn))
+        
+        # Regulars' repeat lookups are answered from memory
+        self.customers = CustomerCache(self.conn)
+        
+        # Search-as-you-type queries run on their own thread and connection,
+        # started with the first tab that searches
+        self.search_worker = None
+        
+        # PDF bills render in background processes
+        self.pdf_pool = PdfWorkerPool(self.root)
+        
+        # Hear about orders and customers saved by the other terminals
+        self.remote_changes = queue.Queue()
+        self.change_feed = ChangeNotifier()
+        self.change_feed.listen(lambda table, key: self.remote_changes.put((table, key)))
+        
+        # Tickets go to the kitchen displays from a background thread
+        self.kitchen = KitchenPublisher(self.kitchen_address, database.default_terminal_name())
+        self.kitchen_status_job = None
+        
+    def start_metrics(self):
+        """Time the cashier actions and write the metrics file every interval"""
+        # Wrapped before the UI exists, so buttons and searches bind the timed versions
+        self.metrics.instrument(self, INSTRUMENTED_ACTIONS)
+        self.metrics.exclude_waits(messagebox, ('askyesno', 'showerror', 'showinfo', 'showwarning'))
+        if self.metrics.path:
+            self.root.after(self.metrics.interval * 1000, self.dump_metrics)
+        
+    def dump_metrics(self):
+        try:
+            self.metrics.dump()
+        except OSError:
+            pass  # Try again next interval
+        self.root.after(self.metrics.interval * 1000, self.dump_metrics)
         
     def setup_variables(self):
         """Initialize all tkinter variables"""
         self.customer_name = tk.StringVar()
         self.customer_phone = tk.StringVar()
-        self.bill_number = tk.StringVar(value=f"BILL{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}")
-        
-        # Pakistani and Chinese menu items with prices
-        self.menu_items = {
-            'Pakistani Dishes': {
-                'Chicken Karahi': 450,
-                'Mutton Karahi': 650,
-                'Chicken Biryani': 320,
-                'Mutton Biryani': 480,
-                'Chicken Tikka': 380,
-                'Seekh Kebab': 350,
-                'Chapli Kebab': 320,
-                'Nihari': 420,
-                'Haleem': 280,
-                'Chicken Handi': 400,
-                'Mutton Handi': 550,
-                'Daal Chawal': 180,
-                'Aloo Gosht': 380,
-                'Palak Gosht': 420,
-                'Chicken Jalfrezi': 360
-            },
-            'Chinese Dishes': {
-                'Chicken Chow Mein': 280,
-                'Beef Chow Mein': 320,
-                'Chicken Fried Rice': 250,
-                'Vegetable Fried Rice': 200,
-                'Sweet & Sour Chicken': 340,
-                'Chicken Manchurian': 320,
-                'Hot & Sour Soup': 150,
-                'Chicken Corn Soup': 180,
-                'Spring Rolls': 220,
-                'Honey Chicken': 360,
-                'Szechuan Chicken': 380,
-                'Dragon Chicken': 400,
-                'Crispy Beef': 450,
-                'Vegetable Manchurian': 240,
-                'Chicken 65': 350
-            },
-            'Beverages & Desserts': {
-                'Fresh Lime': 80,
-                'Mango Lassi': 120,
-                'Rooh Afza': 60,
-                'Green Tea': 50,
-                'Kashmiri Chai': 80,
-                'Kulfi': 100,
-                'Kheer': 120,
-                'Gulab Jamun': 100,
-                'Ras Malai': 150,
-                'Ice Cream': 80,
-                'Fresh Juice': 100,
-                'Cold Drinks': 60
-            }
-        }
+        self.bill_number = tk.StringVar(value=self.bill_numbers.next())
+        
+        # The menu is loaded from the database; pricing lives in the headless billing engine
+        self.menu = MenuCatalog(self.conn)
+        self.menu_grids = {}
+        self.use_menu()
         
-        self.order_items = {}
         self.current_customer_id = None
         
     def create_modern_ui(self):
@@ -163,10 +186,34 @@ class ModernRestaurantBilling:
         self.history_frame = tk.Frame(self.notebook, bg=self.colors['white'])
         self.notebook.add(self.history_frame, text='📋 Order History')
         
-        # Create tab contents
+        # Only the New Order tab is built now; the others are built, and their
+        # lists loaded, the first time they are opened
+        self.customer_tree = None
+        self.order_history = None
         self.create_billing_tab()
-        self.create_customer_tab()
-        self.create_history_tab()
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        
+    def on_tab_changed(self, event=None):
+        """Build the Customer and History tabs on first view"""
+        tab = self.notebook.select()
+        if tab == str(self.customer_frame):
+            self.open_customer_tab()
+        elif tab == str(self.history_frame):
+            self.open_history_tab()
+        
+    def open_customer_tab(self):
+        if self.customer_tree is None:
+            self.create_customer_tab()
+            self.load_customers()
+        
+    def open_history_tab(self):
+        if self.order_history is None:
+            self.create_history_tab()
+        
+    def get_search_worker(self):
+        if self.search_worker is None:
+            self.search_worker = SearchWorker(database.DB_PATH, self.connection_factory)
+        return self.search_worker
         
     def create_header(self, parent):
         """Create header with restaurant name and info"""
@@ -278,83 +325,34 @@ class ModernRestaurantBilling:
                                  relief='groove', bd=2)
         menu_frame.pack(fill='both', expand=True)
         
-        # Create notebook for menu categories
-        menu_notebook = ttk.Notebook(menu_frame)
-        menu_notebook.pack(fill='both', expand=True, padx=10, pady=10)
-        
-        for category, items in self.menu_items.items():
-            self.create_category_tab(menu_notebook, category, items)
+        # Create notebook for menu categories; each tab is filled in when first shown
+        self.menu_notebook = ttk.Notebook(menu_frame)
+        self.menu_notebook.pack(fill='both', expand=True, padx=10, pady=10)
+        self.menu_notebook.bind('<<NotebookTabChanged>>', self.show_category_tab)
+        self.build_menu_tabs()
+        
+    def build_menu_tabs(self):
+        """(Re)create one empty tab per menu category"""
+        for tab in self.menu_notebook.tabs():
+            self.menu_notebook.nametowidget(tab).destroy()
+        self.menu_grids = {}
+        self.menu_tabs = {}
+        for category in self.menu_items:
+            tab_frame = tk.Frame(self.menu_notebook, bg=self.colors['white'])
+            self.menu_notebook.add(tab_frame, text=category)
+            self.menu_tabs[str(tab_frame)] = category
+        self.show_category_tab()
             
-    def create_category_tab(self, parent, category, items):
-        """Create a tab for each menu category"""
-        tab_frame = tk.Frame(parent, bg=self.colors['white'])
-        parent.add(tab_frame, text=category)
-        
-        # Create scrollable frame
-        canvas = tk.Canvas(tab_frame, bg=self.colors['white'])
-        scrollbar = ttk.Scrollbar(tab_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg=self.colors['white'])
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
-        
-        # Add menu items
-        row = 0
-        col = 0
-        for item_name, price in items.items():
-            self.create_menu_item(scrollable_frame, item_name, price, row, col)
-            col += 1
-            if col > 2:  # 3 items per row
-                col = 0
-                row += 1
-                
-        # Bind mousewheel to canvas
-        def _on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
-        canvas.bind_all("<MouseWheel>", _on_mousewheel)
-        
-    def create_menu_item(self, parent, item_name, price, row, col):
-        """Create individual menu item widget"""
-        item_frame = tk.Frame(parent, bg=self.colors['light'], relief='raised', bd=1)
-        item_frame.grid(row=row, column=col, padx=5, pady=5, sticky='ew')
-        
-        # Item name and price
-        tk.Label(item_frame, text=item_name, font=('Arial', 10, 'bold'),
-                bg=self.colors['light']).pack(pady=2)
-        tk.Label(item_frame, text=f"Rs. {price}", font=('Arial', 9),
-                bg=self.colors['light'], fg=self.colors['danger']).pack()
-        
-        # Quantity controls
-        qty_frame = tk.Frame(item_frame, bg=self.colors['light'])
-        qty_frame.pack(pady=5)
-        
-        if item_name not in self.order_items:
-            self.order_items[item_name] = tk.IntVar()
-        
-        # Decrease button
-        dec_btn = tk.Button(qty_frame, text="-", font=('Arial', 10, 'bold'),
-                           bg=self.colors['danger'], fg='white', width=2,
-                           command=lambda item=item_name: self.decrease_quantity(item))
-        dec_btn.pack(side='left')
-        
-        # Quantity display
-        qty_label = tk.Label(qty_frame, textvariable=self.order_items[item_name],
-                           font=('Arial', 10), bg='white', width=3, relief='sunken')
-        qty_label.pack(side='left', padx=2)
-        
-        # Increase button
-        inc_btn = tk.Button(qty_frame, text="+", font=('Arial', 10, 'bold'),
-                           bg=self.colors['success'], fg='white', width=2,
-                           command=lambda item=item_name: self.increase_quantity(item))
-        inc_btn.pack(side='left')
+    def show_category_tab(self, event=None):
+        """Build the selected category's item grid the first time it is shown"""
+        tab = self.menu_notebook.select()
+        category = self.menu_tabs.get(tab)
+        if category is None or category in self.menu_grids:
+            return
+        self.menu_grids[category] = VirtualMenuGrid(
+            self.menu_notebook.nametowidget(tab), self.menu_items[category], self.colors,
+            lambda item_name: self.order.quantity(item_name),
+            self.increase_quantity, self.decrease_quantity)
         
     def create_bill_section(self, parent):
         """Create bill display and summary section"""
@@ -375,6 +373,10 @@ class ModernRestaurantBilling:
         self.bill_text.configure(yscrollcommand=bill_scrollbar.set)
         
         self.bill_text.pack(side="left", fill="both", expand=True)
+        self.bill_renderer = IncrementalBillRenderer(self.bill_text, self.order)
+        # Typing the customer's details patches them into the bill shown
+        for variable in (self.customer_name, self.customer_phone):
+            variable.trace_add('write', lambda *args: self.refresh_bill_details())
         bill_scrollbar.pack(side="right", fill="y")
         
         # Summary and buttons
@@ -458,6 +460,20 @@ class ModernRestaurantBilling:
                            font=('Arial', 11, 'bold'), height=2)
         save_btn.pack(fill='x', pady=2)
         
+        # Send to Kitchen button
+        kitchen_btn = tk.Button(button_frame, text="🍳 Send to Kitchen",
+                              command=self.send_to_kitchen,
+                              bg=self.colors['secondary'], fg='white',
+                              font=('Arial', 11, 'bold'), height=2)
+        kitchen_btn.pack(fill='x', pady=2)
+        
+        # Mark Served button - takes the ticket off the kitchen displays
+        served_btn = tk.Button(button_frame, text="🍽️ Mark Served",
+                             command=self.mark_served,
+                             bg=self.colors['secondary'], fg='white',
+                             font=('Arial', 11, 'bold'), height=2)
+        served_btn.pack(fill='x', pady=2)
+        
         # Generate PDF button
         pdf_btn = tk.Button(button_frame, text="📄 Generate PDF",
                           command=self.generate_pdf,
@@ -479,6 +495,16 @@ class ModernRestaurantBilling:
                             font=('Arial', 11, 'bold'), height=2)
         clear_btn.pack(fill='x', pady=2)
         
+        # Background PDF progress
+        self.pdf_status = tk.StringVar()
+        tk.Label(button_frame, textvariable=self.pdf_status, font=('Arial', 9),
+                bg=self.colors['light'], fg=self.colors['dark']).pack(fill='x', pady=2)
+        
+        # Last ticket sent to the kitchen
+        self.kitchen_status = tk.StringVar()
+        tk.Label(button_frame, textvariable=self.kitchen_status, font=('Arial', 9),
+                bg=self.colors['light'], fg=self.colors['dark']).pack(fill='x', pady=2)
+        
     def create_customer_tab(self):
         """Create customer management tab"""
         # Customer search
@@ -491,6 +517,8 @@ class ModernRestaurantBilling:
         self.search_var = tk.StringVar()
         search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=('Arial', 11), width=30)
         search_entry.pack(side='left', padx=10)
+        self.customer_search = LiveSearch(self.root, self.get_search_worker(), self.search_var,
+                                          self.query_customers, self.show_customers)
         
         search_btn = tk.Button(search_frame, text="🔍 Search",
                              command=self.search_customers,
@@ -530,6 +558,8 @@ class ModernRestaurantBilling:
         history_search_entry = tk.Entry(history_search_frame, textvariable=self.history_search_var, 
                                       font=('Arial', 11), width=30)
         history_search_entry.pack(side='left', padx=10)
+        self.order_search = LiveSearch(self.root, self.get_search_worker(), self.history_search_var,
+                                       self.query_orders, self.show_orders)
         
         history_search_btn = tk.Button(history_search_frame, text="🔍 Search Orders",
                                      command=self.search_orders,
@@ -537,6 +567,11 @@ class ModernRestaurantBilling:
                                      font=('Arial', 10, 'bold'))
         history_search_btn.pack(side='left', padx=5)
         
+        # Says when archived months are left out because their file is missing
+        self.history_notice = tk.StringVar()
+        tk.Label(self.history_frame, textvariable=self.history_notice, font=('Arial', 10),
+                fg=self.colors['danger'], bg=self.colors['white']).pack(fill='x', padx=10)
+        
         # Order history list
         history_list_frame = tk.Frame(self.history_frame, bg=self.colors['white'])
         history_list_frame.pack(fill='both', expand=True, padx=10, pady=10)
@@ -554,7 +589,7 @@ class ModernRestaurantBilling:
         
         # Scrollbar for order treeview
         order_tree_scroll = ttk.Scrollbar(history_list_frame, orient="vertical", command=self.order_tree.yview)
-        self.order_tree.configure(yscrollcommand=order_tree_scroll.set)
+        self.order_history = PagedOrderTree(self.order_tree, order_tree_scroll, self.history_notice)
         
         self.order_tree.pack(side="left", fill="both", expand=True)
         order_tree_scroll.pack(side="right", fill="y")
@@ -562,78 +597,80 @@ class ModernRestaurantBilling:
         # Load order history
         self.load_order_history()
         
+    def use_menu(self):
+        """Price new orders against the catalog as it is now"""
+        self.engine = self.menu.engine()
+        self.menu_items = self.engine.menu_items
+        self.menu_version = self.menu.version
+        self.order = self.engine.new_order()
+        self.order_store = OrderStore(self.conn, self.engine.prices, self.menu.ids)
+        self.item_categories = {item_name: category for category, items in self.menu_items.items()
+                                for item_name in items}
+        if hasattr(self, 'bill_renderer'):
+            self.bill_renderer.order = self.order
+        if hasattr(self, 'menu_notebook'):
+            self.build_menu_tabs()
+        
+    def apply_menu_changes(self):
+        """Switch to an edited menu, but never in the middle of an order"""
+        self.menu.reload_if_changed()
+        if self.menu.version != self.menu_version and self.order.is_empty():
+            self.use_menu()
+        
+    def set_item_quantity(self, item_name, qty):
+        """Set an item quantity in the order and its on-screen counter"""
+        qty = self.order.set_quantity(item_name, qty)
+        self.show_item_quantity(item_name, qty)
+        return qty
+        
+    def show_item_quantity(self, item_name, qty):
+        """Update an item's counter if its category tab has been built"""
+        grid = self.menu_grids.get(self.item_categories.get(item_name))
+        if grid is not None:
+            grid.show_quantity(item_name, qty)
+        
+    def reset_order_items(self):
+        """Zero every ordered item without touching the rest of the menu"""
+        for item_name in list(self.order.items):
+            self.show_item_quantity(item_name, 0)
+        self.order.clear()
+        self.apply_menu_changes()
+        
     def increase_quantity(self, item_name):
         """Increase quantity of an item"""
-        current = self.order_items[item_name].get()
-        self.order_items[item_name].set(current + 1)
-        self.update_bill_display()
+        self.set_item_quantity(item_name, self.order.quantity(item_name) + 1)
+        self.update_bill_display(item_name)
         
     def decrease_quantity(self, item_name):
         """Decrease quantity of an item"""
-        current = self.order_items[item_name].get()
-        if current > 0:
-            self.order_items[item_name].set(current - 1)
-        self.update_bill_display()
-        
-    def update_bill_display(self):
-        """Update the bill display in real-time"""
-        self.bill_text.delete(1.0, tk.END)
-        
-        # Header
-        self.bill_text.insert(tk.END, "=" * 40 + "\n")
-        self.bill_text.insert(tk.END, "  PAKISTANI & CHINESE RESTAURANT\n")
-        self.bill_text.insert(tk.END, "  Authentic Cuisine & Delicacies\n")
-        self.bill_text.insert(tk.END, "=" * 40 + "\n\n")
-        
-        # Bill details
-        self.bill_text.insert(tk.END, f"Bill No: {self.bill_number.get()}\n")
-        self.bill_text.insert(tk.END, f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        self.bill_text.insert(tk.END, f"Customer: {self.customer_name.get()}\n")
-        self.bill_text.insert(tk.END, f"Phone: {self.customer_phone.get()}\n")
-        self.bill_text.insert(tk.END, "-" * 40 + "\n\n")
-        
-        # Items
-        self.bill_text.insert(tk.END, "ITEM                     QTY   PRICE   TOTAL\n")
-        self.bill_text.insert(tk.END, "-" * 40 + "\n")
-        
-        subtotal = 0
-        for category, items in self.menu_items.items():
-            for item_name, price in items.items():
-                qty = self.order_items[item_name].get()
-                if qty > 0:
-                    total_price = qty * price
-                    subtotal += total_price
-                    # Format item line
-                    item_line = f"{item_name[:20]:<20} {qty:>3} {price:>6} {total_price:>7}\n"
-                    self.bill_text.insert(tk.END, item_line)
-        
-        if subtotal > 0:
-            # Calculations
-            tax = round(subtotal * 0.18, 2)
-            service_charge = round(subtotal * 0.05, 2)
-            total = round(subtotal + tax + service_charge, 2)
-            
-            # Summary
-            self.bill_text.insert(tk.END, "\n" + "-" * 40 + "\n")
-            self.bill_text.insert(tk.END, f"Subtotal:              Rs. {subtotal:.2f}\n")
-            self.bill_text.insert(tk.END, f"Tax (18%):             Rs. {tax:.2f}\n")
-            self.bill_text.insert(tk.END, f"Service Charge (5%):   Rs. {service_charge:.2f}\n")
-            self.bill_text.insert(tk.END, "=" * 40 + "\n")
-            self.bill_text.insert(tk.END, f"TOTAL:                 Rs. {total:.2f}\n")
-            self.bill_text.insert(tk.END, "=" * 40 + "\n\n")
-            self.bill_text.insert(tk.END, "Thank you for visiting!\n")
-            self.bill_text.insert(tk.END, "Come again soon!\n")
-            
-            # Update summary variables
-            self.subtotal_var.set(f"{subtotal:.2f}")
-            self.tax_var.set(f"{tax:.2f}")
-            self.service_var.set(f"{service_charge:.2f}")
-            self.total_var.set(f"{total:.2f}")
-        else:
-            self.subtotal_var.set("0.00")
-            self.tax_var.set("0.00")
-            self.service_var.set("0.00")
-            self.total_var.set("0.00")
+        self.set_item_quantity(item_name, self.order.quantity(item_name) - 1)
+        self.update_bill_display(item_name)
+        
+    def update_bill_display(self, item_name=None):
+        """Update the bill display in real-time
+        
+        With an item name only that item's row and the summary are patched;
+        without one the whole bill is rebuilt.
+        """
+        totals = None
+        if item_name is not None:
+            totals = self.bill_renderer.update_item(item_name)
+        if totals is None:
+            totals = self.bill_renderer.render(self.bill_number.get(),
+                                               self.customer_name.get(),
+                                               self.customer_phone.get())
+        
+        # Update summary variables
+        subtotal, tax, service_charge, total = totals
+        self.subtotal_var.set(f"{subtotal:.2f}")
+        self.tax_var.set(f"{tax:.2f}")
+        self.service_var.set(f"{service_charge:.2f}")
+        self.total_var.set(f"{total:.2f}")
+    
+    def refresh_bill_details(self):
+        """Rewrite the customer and date lines of the bill shown"""
+        self.bill_renderer.update_details(self.bill_number.get(), self.customer_name.get(),
+                                          self.customer_phone.get())
     
     def calculate_total(self):
         """Calculate and display total"""
@@ -647,33 +684,24 @@ class ModernRestaurantBilling:
             messagebox.showwarning("Warning", "Please enter phone number to search!")
             return
         
-        self.cursor.execute("SELECT * FROM customers WHERE phone = ?", (phone,))
-        customer = self.cursor.fetchone()
+        customer = self.customers.lookup(phone)
         
         if customer:
-            self.current_customer_id = customer[0]
-            self.customer_name.set(customer[1])
+            self.current_customer_id = customer.id
+            self.customer_name.set(customer.name)
             
             # Load last order if exists
-            self.cursor.execute("""
-                SELECT order_data FROM orders 
-                WHERE customer_id = ? 
-                ORDER BY order_date DESC LIMIT 1
-            """, (customer[0],))
-            
-            last_order = self.cursor.fetchone()
-            if last_order:
+            if customer.last_order:
                 try:
-                    order_data = json.loads(last_order[0])
-                    for item_name, qty in order_data.items():
-                        if item_name in self.order_items:
-                            self.order_items[item_name].set(qty)
+                    for item_name, qty in customer.last_order:
+                        if item_name in self.engine.prices:
+                            self.set_item_quantity(item_name, qty)
                     self.update_bill_display()
-                    messagebox.showinfo("Customer Found", f"Customer found! Last order loaded.\nName: {customer[1]}")
+                    messagebox.showinfo("Customer Found", f"Customer found! Last order loaded.\nName: {customer.name}")
                 except:
-                    messagebox.showinfo("Customer Found", f"Customer found!\nName: {customer[1]}")
+                    messagebox.showinfo("Customer Found", f"Customer found!\nName: {customer.name}")
             else:
-                messagebox.showinfo("Customer Found", f"Customer found!\nName: {customer[1]}")
+                messagebox.showinfo("Customer Found", f"Customer found!\nName: {customer.name}")
         else:
             # Ask if want to create new customer
             result = messagebox.askyesno("Customer Not Found", 
@@ -718,13 +746,10 @@ class ModernRestaurantBilling:
                 return
             
             try:
-                self.cursor.execute("""
-                    INSERT INTO customers (name, phone) 
-                    VALUES (?, ?, ?, ?)
-                """, (name_var.get().strip(), phone_var.get().strip()))
-                
-                self.conn.commit()
-                self.current_customer_id = self.cursor.lastrowid
+                self.current_customer_id = self.order_store.create_customer(
+                    name_var.get().strip(), phone_var.get().strip())
+                self.customers.forget(self.current_customer_id, phone_var.get().strip())
+                self.change_feed.publish('customers', self.current_customer_id)
                 
                 # Update main form
                 self.customer_name.set(name_var.get().strip())
@@ -746,7 +771,7 @@ class ModernRestaurantBilling:
     
     def edit_order(self):
         """Edit current order"""
-        if not any(var.get() > 0 for var in self.order_items.values()):
+        if self.order.is_empty():
             messagebox.showwarning("Warning", "No items in current order to edit!")
             return
         
@@ -776,37 +801,34 @@ class ModernRestaurantBilling:
         
         # Add current items to edit dialog
         row = 0
-        for category, items in self.menu_items.items():
-            for item_name, price in items.items():
-                qty = self.order_items[item_name].get()
-                if qty > 0:
-                    item_edit_frame = tk.Frame(scrollable_frame, bg=self.colors['light'], relief='raised', bd=1)
-                    item_edit_frame.grid(row=row, column=0, columnspan=4, sticky='ew', padx=5, pady=2)
-                    
-                    tk.Label(item_edit_frame, text=item_name, font=('Arial', 11, 'bold'),
-                            bg=self.colors['light']).grid(row=0, column=0, sticky='w', padx=10)
-                    tk.Label(item_edit_frame, text=f"Rs. {price}", font=('Arial', 10),
-                            bg=self.colors['light']).grid(row=0, column=1, padx=10)
-                    
-                    # Quantity controls
-                    tk.Button(item_edit_frame, text="-", font=('Arial', 10, 'bold'),
-                             bg=self.colors['danger'], fg='white', width=2,
-                             command=lambda item=item_name: self.decrease_quantity(item)).grid(row=0, column=2, padx=2)
-                    
-                    qty_label = tk.Label(item_edit_frame, text=str(qty), font=('Arial', 10),
-                                       bg='white', width=3, relief='sunken')
-                    qty_label.grid(row=0, column=3, padx=2)
-                    
-                    tk.Button(item_edit_frame, text="+", font=('Arial', 10, 'bold'),
-                             bg=self.colors['success'], fg='white', width=2,
-                             command=lambda item=item_name: self.increase_quantity(item)).grid(row=0, column=4, padx=2)
-                    
-                    # Remove item button
-                    tk.Button(item_edit_frame, text="🗑️", font=('Arial', 8),
-                             bg=self.colors['danger'], fg='white',
-                             command=lambda item=item_name: self.remove_item(item)).grid(row=0, column=5, padx=10)
-                    
-                    row += 1
+        for item_name, qty, price, _ in self.order.lines():
+            item_edit_frame = tk.Frame(scrollable_frame, bg=self.colors['light'], relief='raised', bd=1)
+            item_edit_frame.grid(row=row, column=0, columnspan=4, sticky='ew', padx=5, pady=2)
+            
+            tk.Label(item_edit_frame, text=item_name, font=('Arial', 11, 'bold'),
+                    bg=self.colors['light']).grid(row=0, column=0, sticky='w', padx=10)
+            tk.Label(item_edit_frame, text=f"Rs. {price}", font=('Arial', 10),
+                    bg=self.colors['light']).grid(row=0, column=1, padx=10)
+            
+            # Quantity controls
+            tk.Button(item_edit_frame, text="-", font=('Arial', 10, 'bold'),
+                     bg=self.colors['danger'], fg='white', width=2,
+                     command=lambda item=item_name: self.decrease_quantity(item)).grid(row=0, column=2, padx=2)
+            
+            qty_label = tk.Label(item_edit_frame, text=str(qty), font=('Arial', 10),
+                               bg='white', width=3, relief='sunken')
+            qty_label.grid(row=0, column=3, padx=2)
+            
+            tk.Button(item_edit_frame, text="+", font=('Arial', 10, 'bold'),
+                     bg=self.colors['success'], fg='white', width=2,
+                     command=lambda item=item_name: self.increase_quantity(item)).grid(row=0, column=4, padx=2)
+            
+            # Remove item button
+            tk.Button(item_edit_frame, text="🗑️", font=('Arial', 8),
+                     bg=self.colors['danger'], fg='white',
+                     command=lambda item=item_name: self.remove_item(item)).grid(row=0, column=5, padx=10)
+            
+            row += 1
         
         # Close button
         tk.Button(edit_dialog, text="✅ Done Editing", command=edit_dialog.destroy,
@@ -814,8 +836,8 @@ class ModernRestaurantBilling:
     
     def remove_item(self, item_name):
         """Remove item from order"""
-        self.order_items[item_name].set(0)
-        self.update_bill_display()
+        self.set_item_quantity(item_name, 0)
+        self.update_bill_display(item_name)
         messagebox.showinfo("Item Removed", f"{item_name} removed from order!")
     
     def save_order(self):
@@ -825,45 +847,23 @@ class ModernRestaurantBilling:
             return
         
         # Check if there are items in order
-        order_data = {}
-        total_items = 0
-        for item_name, qty_var in self.order_items.items():
-            qty = qty_var.get()
-            if qty > 0:
-                order_data[item_name] = qty
-                total_items += qty
-        
-        if total_items == 0:
+        if self.order.is_empty():
             messagebox.showerror("Error", "No items in order!")
             return
         
-        # Calculate totals
-        subtotal = float(self.subtotal_var.get())
-        tax = float(self.tax_var.get())
-        service_charge = float(self.service_var.get())
-        total = float(self.total_var.get())
-        
         try:
-            # Save or update customer if needed
-            if not self.current_customer_id:
-                self.cursor.execute("""
-                    INSERT OR IGNORE INTO customers (name, phone)
-                """, (self.customer_name.get().strip(), self.customer_phone.get().strip(),))
-                self.conn.commit()
-                
-                self.cursor.execute("SELECT id FROM customers WHERE phone = ?", (self.customer_phone.get().strip(),))
-                result = self.cursor.fetchone()
-                if result:
-                    self.current_customer_id = result[0]
+            # Save the customer (if new) and the order in one transaction
+            self.current_customer_id, order_id = self.order_store.save_order(
+                self.bill_number.get(), self.customer_name.get().strip(),
+                self.customer_phone.get().strip(), self.order.to_dict(),
+                self.order.totals(), self.current_customer_id)
             
-            # Save order
-            self.cursor.execute("""
-                INSERT INTO orders (customer_id, bill_number, order_data, subtotal, tax_amount, service_charge, total_amount)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (self.current_customer_id, self.bill_number.get(), json.dumps(order_data),
-                 subtotal, tax, service_charge, total))
+            # Their cached last order is now out of date, here and on the other terminals
+            self.customers.forget(self.current_customer_id, self.customer_phone.get().strip())
+            self.change_feed.publish('orders', self.current_customer_id)
             
-            self.conn.commit()
+            # A saved order is cooked too; if it was already sent, only changes go out
+            self.send_to_kitchen()
             
             # Show success message with options
             result = messagebox.askyesno("Order Saved Successfully!", 
@@ -880,20 +880,47 @@ class ModernRestaurantBilling:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save order: {str(e)}")
     
+    def send_to_kitchen(self):
+        """Send the current bill to the kitchen displays (again, after changes)"""
+        if self.order.is_empty():
+            messagebox.showerror("Error", "No items in order!")
+            return
+        
+        self.kitchen.send(self.bill_number.get(), self.customer_name.get().strip(), self.order.to_dict())
+        self.watch_kitchen(self.bill_number.get(), "Sent {} to the kitchen")
+    
+    def mark_served(self):
+        """Take the current bill's ticket off the kitchen displays"""
+        self.kitchen.served(self.bill_number.get())
+        self.watch_kitchen(self.bill_number.get(), "Marked {} served")
+    
+    def watch_kitchen(self, bill_number, done):
+        """Show a kitchen message's progress until the server acks it"""
+        if self.kitchen_status_job is not None:
+            self.root.after_cancel(self.kitchen_status_job)
+            self.kitchen_status_job = None
+        if self.kitchen.delivered(bill_number):
+            self.kitchen_status.set(done.format(bill_number))
+            return
+        if self.kitchen.connected is False:
+            self.kitchen_status.set("Kitchen display offline - ticket will be sent when it is back")
+        else:
+            self.kitchen_status.set(f"Sending {bill_number} to the kitchen...")
+        self.kitchen_status_job = self.root.after(250, self.watch_kitchen, bill_number, done)
+    
     def new_order(self):
         """Start a new order - reset form but keep customer info"""
         result = messagebox.askyesno("New Order", 
                                    "Start a new order?\n\nThis will clear current order items but keep customer information.")
         if result:
             # Clear order items only
-            for var in self.order_items.values():
-                var.set(0)
+            self.reset_order_items()
             
             # Generate new bill number
-            self.bill_number.set(f"BILL{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}")
+            self.bill_number.set(self.bill_numbers.next())
             
             # Clear bill display
-            self.bill_text.delete(1.0, tk.END)
+            self.bill_renderer.clear()
             
             # Reset summary
             self.subtotal_var.set("0.00")
@@ -913,97 +940,31 @@ class ModernRestaurantBilling:
             return
         
         # Check if there are items
-        total_items = sum(var.get() for var in self.order_items.values())
-        if total_items == 0:
+        if self.order.is_empty():
             messagebox.showerror("Error", "No items in order!")
             return
         
-        try:
-            # Create PDF
-            pdf = FPDF()
-            pdf.add_page()
-            pdf.set_font('Arial', 'B', 16)
-            
-            # Header
-            pdf.cell(0, 10, 'PAKISTANI & CHINESE RESTAURANT', 0, 1, 'C')
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 8, 'Authentic Pakistani Cuisine & Chinese Delicacies', 0, 1, 'C')
-            pdf.ln(5)
-            
-            # Bill details
-            pdf.set_font('Arial', 'B', 10)
-            pdf.cell(0, 6, f'Bill Number: {self.bill_number.get()}', 0, 1)
-            pdf.cell(0, 6, f'Date: {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', 0, 1)
-            pdf.cell(0, 6, f'Customer: {self.customer_name.get()}', 0, 1)
-            pdf.cell(0, 6, f'Phone: {self.customer_phone.get()}', 0, 1)
-            pdf.ln(5)
-            
-            # Table header
-            pdf.set_font('Arial', 'B', 10)
-            pdf.cell(100, 8, 'ITEM', 1, 0, 'C')
-            pdf.cell(20, 8, 'QTY', 1, 0, 'C')
-            pdf.cell(30, 8, 'PRICE', 1, 0, 'C')
-            pdf.cell(30, 8, 'TOTAL', 1, 1, 'C')
-            
-            # Items
-            pdf.set_font('Arial', '', 9)
-            subtotal = 0
-            
-            for category, items in self.menu_items.items():
-                for item_name, price in items.items():
-                    qty = self.order_items[item_name].get()
-                    if qty > 0:
-                        total_price = qty * price
-                        subtotal += total_price
-                        
-                        pdf.cell(100, 6, item_name[:35], 1, 0, 'L')
-                        pdf.cell(20, 6, str(qty), 1, 0, 'C')
-                        pdf.cell(30, 6, f'Rs. {price}', 1, 0, 'R')
-                        pdf.cell(30, 6, f'Rs. {total_price}', 1, 1, 'R')
-            
-            # Calculations
-            tax = round(subtotal * 0.18, 2)
-            service_charge = round(subtotal * 0.05, 2)
-            total = round(subtotal + tax + service_charge, 2)
-            
-            pdf.ln(5)
-            pdf.set_font('Arial', 'B', 10)
-            
-            # Summary
-            pdf.cell(150, 6, 'Subtotal:', 0, 0, 'R')
-            pdf.cell(30, 6, f'Rs. {subtotal:.2f}', 0, 1, 'R')
-            
-            pdf.cell(150, 6, 'Tax (18%):', 0, 0, 'R')
-            pdf.cell(30, 6, f'Rs. {tax:.2f}', 0, 1, 'R')
-            
-            pdf.cell(150, 6, 'Service Charge (5%):', 0, 0, 'R')
-            pdf.cell(30, 6, f'Rs. {service_charge:.2f}', 0, 1, 'R')
-            
-            pdf.line(10, pdf.get_y(), 200, pdf.get_y())
-            pdf.ln(2)
-            
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(150, 8, 'TOTAL:', 0, 0, 'R')
-            pdf.cell(30, 8, f'Rs. {total:.2f}', 0, 1, 'R')
-            
-            pdf.ln(10)
-            pdf.set_font('Arial', '', 10)
-            pdf.cell(0, 6, 'Thank you for visiting!', 0, 1, 'C')
-            pdf.cell(0, 6, 'Come again soon!', 0, 1, 'C')
-            
-            # Save PDF
-            filename = f"Bill_{self.bill_number.get()}.pdf"
-            pdf.output(filename)
-            
-            # Show success message with options
-            result = messagebox.askyesno("PDF Generated Successfully!", 
-                                       f"PDF bill saved as: {filename}\n\nWould you like to start a new order?")
-            
-            if result:
-                self.new_order()
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate PDF: {str(e)}")
+        # Snapshot the bill and render it in the background
+        filename = f"Bill_{self.bill_number.get()}.pdf"
+        job = bill_job(filename, self.bill_number.get(), self.customer_name.get(),
+                       self.customer_phone.get(), self.order)
+        self.pdf_pool.submit(job, self.pdf_finished)
+        self.pdf_status.set(f"Generating {filename}...")
+        
+        # The snapshot is taken, so the next order can start straight away
+        result = messagebox.askyesno("PDF Bill Queued", 
+                                   f"PDF bill is being saved as: {filename}\n\nWould you like to start a new order?")
+        
+        if result:
+            self.new_order()
+    
+    def pdf_finished(self, filename, error):
+        """Called on the Tk thread when a background PDF is written"""
+        if error:
+            self.pdf_status.set("PDF generation failed")
+            messagebox.showerror("Error", f"Failed to generate PDF: {str(error)}")
+        else:
+            self.pdf_status.set(f"PDF saved: {filename}")
     
     def clear_all(self):
         """Clear all fields and reset form"""
@@ -1014,17 +975,16 @@ class ModernRestaurantBilling:
             self.customer_phone.set("")
             
             # Clear order items
-            for var in self.order_items.values():
-                var.set(0)
+            self.reset_order_items()
             
             # Reset bill number
-            self.bill_number.set(f"BILL{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}")
+            self.bill_number.set(self.bill_numbers.next())
             
             # Clear current customer id
             self.current_customer_id = None
             
             # Clear bill display
-            self.bill_text.delete(1.0, tk.END)
+            self.bill_renderer.clear()
             
             # Reset summary
             self.subtotal_var.set("0.00")
@@ -1035,114 +995,175 @@ class ModernRestaurantBilling:
             messagebox.showinfo("Cleared", "All fields have been cleared!")
     
     def load_customers(self):
-        """Load customers into the treeview"""
-        # Clear existing items
-        for item in self.customer_tree.get_children():
-            self.customer_tree.delete(item)
-        
-        # Load customers from database
-        self.cursor.execute("SELECT * FROM customers ORDER BY created_date DESC")
-        customers = self.cursor.fetchall()
-        
-        for customer in customers:
-            self.customer_tree.insert('', 'end', values=customer)
+        """Load customers into the treeview (once its tab has been opened)"""
+        if self.customer_tree is not None:
+            self.show_customers('', database.all_customers(self.cursor))
     
     def load_order_history(self):
-        """Load order history into the treeview"""
-        # Clear existing items
-        for item in self.order_tree.get_children():
-            self.order_tree.delete(item)
-        
-        # Load orders with customer details
-        self.cursor.execute("""
-            SELECT o.bill_number, c.name, c.phone, o.subtotal, o.tax_amount, 
-                   o.service_charge, o.total_amount, o.order_date
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.id
-            ORDER BY o.order_date DESC
-        """)
-        orders = self.cursor.fetchall()
-        
-        for order in orders:
-            # Format the order data for display
-            formatted_order = (
-                order[0],  # Bill number
-                order[1],  # Customer name
-                order[2],  # Phone
-                f"Rs. {order[3]:.2f}",  # Subtotal
-                f"Rs. {order[4]:.2f}",  # Tax
-                f"Rs. {order[5]:.2f}",  # Service charge
-                f"Rs. {order[6]:.2f}",  # Total
-                order[7][:16]  # Date (formatted)
-            )
-            self.order_tree.insert('', 'end', values=formatted_order)
+        """Load the newest page of order history into the treeview (once its tab has been opened)"""
+        if self.order_history is not None:
+            self.order_history.load(database.OrderPager(self.cursor))
     
-    def search_customers(self):
-        """Search customers by name or phone"""
-        search_term = self.search_var.get().strip().lower()
+    def query_customers(self, cursor, search_term):
+        """Customer search query - runs on the search worker thread"""
         if not search_term:
-            self.load_customers()
-            return
-        
-        # Clear existing items
-        for item in self.customer_tree.get_children():
-            self.customer_tree.delete(item)
-        
-        # Search customers
-        self.cursor.execute("""
-            SELECT * FROM customers 
-            WHERE LOWER(name) LIKE ? OR phone LIKE ?
-            ORDER BY created_date DESC
-        """, (f'%{search_term}%', f'%{search_term}%'))
-        
-        customers = self.cursor.fetchall()
+            return database.all_customers(cursor)
+        return database.search_customers(cursor, search_term)
+    
+    def show_customers(self, search_term, customers):
+        """Replace the customer list with search results"""
+        self.customer_tree.delete(*self.customer_tree.get_children())
         for customer in customers:
             self.customer_tree.insert('', 'end', values=customer)
     
-    def search_orders(self):
-        """Search orders by customer name, phone, or bill number"""
-        search_term = self.history_search_var.get().strip().lower()
+    def query_orders(self, cursor, search_term):
+        """First page of an order search, and any archived months it skipped - runs on the search worker thread"""
+        pager = self.order_pager(cursor, search_term)
+        return pager.first(), pager.missing_months
+    
+    def show_orders(self, search_term, result):
+        """Show the first page of an order search; later pages load on scroll"""
+        rows, missing_months = result
+        pager = self.order_pager(self.cursor, search_term)
+        pager.missing_months.extend(missing_months)
+        self.order_history.load(pager, rows)
+    
+    def order_pager(self, cursor, search_term):
         if not search_term:
-            self.load_order_history()
-            return
+            return database.OrderPager(cursor)
+        return database.order_search_pager(cursor, search_term)
+    
+    def check_remote_changes(self):
+        """Refresh the lists when another terminal has saved something"""
+        tables = set()
+        while not self.remote_changes.empty():
+            table, key = self.remote_changes.get_nowait()
+            tables.add(table)
+            if table in ('orders', 'customers'):
+                # The key names the customer; without one, any could have changed
+                if key is None:
+                    self.customers.clear()
+                else:
+                    self.customers.forget(key)
+        
+        if 'menu' in tables:
+            self.apply_menu_changes()
+        if tables - {'menu'} and self.customer_tree is not None:
+            # A saved order may also have added its customer
+            self.customer_search.run()
+        if 'orders' in tables and self.order_history is not None:
+            if self.order_history.at_top():
+                self.order_search.run()
+            else:
+                # Don't yank the list away from someone reading older orders
+                self.order_history.newer_rows_available()
         
-        # Clear existing items
-        for item in self.order_tree.get_children():
-            self.order_tree.delete(item)
-        
-        # Search orders
-        self.cursor.execute("""
-            SELECT o.bill_number, c.name, c.phone, o.subtotal, o.tax_amount, 
-                   o.service_charge, o.total_amount, o.order_date
-            FROM orders o
-            JOIN customers c ON o.customer_id = c.id
-            WHERE LOWER(c.name) LIKE ? OR c.phone LIKE ? OR LOWER(o.bill_number) LIKE ?
-            ORDER BY o.order_date DESC
-        """, (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-        
-        orders = self.cursor.fetchall()
-        for order in orders:
-            formatted_order = (
-                order[0],  # Bill number
-                order[1],  # Customer name
-                order[2],  # Phone
-                f"Rs. {order[3]:.2f}",  # Subtotal
-                f"Rs. {order[4]:.2f}",  # Tax
-                f"Rs. {order[5]:.2f}",  # Service charge
-                f"Rs. {order[6]:.2f}",  # Total
-                order[7][:16]  # Date (formatted)
-            )
-            self.order_tree.insert('', 'end', values=formatted_order)
+        self.root.after(250, self.check_remote_changes)
+    
+    def search_customers(self):
+        """Search customers by name or phone"""
+        self.customer_search.run()
+    
+    def search_orders(self):
+        """Search orders by customer name, phone, or bill number"""
+        self.order_search.run()
     
     def __del__(self):
         """Close database connection when object is destroyed"""
+        if getattr(self, 'search_worker', None) is not None:
+            self.search_worker.close()
+        if hasattr(self, 'change_feed'):
+            self.change_feed.close()
+        if hasattr(self, 'kitchen'):
+            self.kitchen.close()
+        if hasattr(self, 'pdf_pool'):
+            self.pdf_pool.shutdown()
         if hasattr(self, 'conn'):
             self.conn.close()
 
-def main():
+def reprint_bills(args):
+    """Regenerate PDF bills for saved orders straight from the database"""
+    conn = database.connect(args.db)
+    os.makedirs(args.out_dir, exist_ok=True)
+    
+    bills = database.iter_saved_bills(conn.cursor(), args.start, args.end, args.bills)
+    found = set()
+    
+    def jobs():
+        for bill_number, name, phone, date, lines, totals in bills:
+            found.add(bill_number)
+            yield BillJob(os.path.join(args.out_dir, f"Bill_{bill_number}.pdf"),
+                          bill_number, name, phone, date, lines, totals)
+    
+    started = time.perf_counter()
+    count = 0
+    for filename in render_bills(jobs(), args.workers):
+        count += 1
+        if count % 1000 == 0:
+            print(f"{count} bills rendered...")
+    conn.close()
+    print(f"Rendered {count} bills to {args.out_dir} in {time.perf_counter() - started:.1f}s")
+    missing = [bill_number for bill_number in args.bills or () if bill_number not in found]
+    if missing:
+        print(f"No saved bill numbered {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pakistani & Chinese Restaurant billing system")
+    commands = parser.add_subparsers(dest='command')
+    
+    reprint = commands.add_parser('reprint', help="regenerate PDF bills from saved orders")
+    reprint.add_argument('--from', dest='start', metavar='YYYY-MM-DD', help="first order date")
+    reprint.add_argument('--to', dest='end', metavar='YYYY-MM-DD', help="last order date")
+    reprint.add_argument('--bills', nargs='+', metavar='BILL', help="specific bill numbers")
+    reprint.add_argument('--out-dir', default='reprints', help="where to write the PDFs")
+    reprint.add_argument('--workers', type=int, help="rendering processes (default: one per CPU)")
+    reprint.add_argument('--db', default=database.DB_PATH, help="database file")
+    
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="time each startup phase, print the report and exit")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="record action and query latencies to FILE (.json, else Prometheus text)")
+    parser.add_argument('--metrics-interval', type=int, default=60, metavar='SECONDS',
+                        help="how often the metrics file is rewritten")
+    parser.add_argument('--slow-query-log', metavar='FILE', help="append slow SQL statements to FILE")
+    parser.add_argument('--slow-query-ms', type=float, default=100,
+                        help="threshold for the slow-query log (default 100 ms)")
+    parser.add_argument('--kitchen', default=KITCHEN_ADDRESS, metavar='ADDRESS',
+                        help="kitchen server, host:port or unix:/path (default %(default)s)")
+    
+    args = parser.parse_args(argv)
+    if args.command == 'reprint':
+        reprint_bills(args)
+        return
+    
+    profile = StartupProfile() if args.profile_startup else None
+    metrics = None
+    if args.metrics or args.slow_query_log:
+        metrics = Metrics(args.metrics, args.slow_query_log, args.slow_query_ms, args.metrics_interval)
     root = tk.Tk()
-    app = ModernRestaurantBilling(root)
-    root.mainloop()
+    if profile:
+        profile.mark('Tk')
+    app = ModernRestaurantBilling(root, profile, metrics, args.kitchen)
+    if not profile:
+        root.mainloop()
+        if metrics is not None:
+            metrics.close()
+        return
+    
+    # Draw the window, then time what startup no longer does
+    root.update()
+    profile.mark('first draw')
+    deferred = []
+    for phase, work in (('Customer tab and list', app.open_customer_tab),
+                        ('Order History tab and query', app.open_history_tab),
+                        ('fpdf import', lambda: importlib.import_module('fpdf'))):
+        started = time.perf_counter()
+        work()
+        root.update_idletasks()
+        deferred.append((phase, time.perf_counter() - started))
+    print(profile.report(deferred))
+    root.destroy()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
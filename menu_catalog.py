@@ -0,0 +1,157 @@
+"""Menu catalog stored in the database, with an in-memory index.
+
+The menu_items table holds every dish with its category, price and an
+availability flag. A MenuCatalog loads it once into flat dicts keyed by id
+and by name, so the billing loop never queries the database or walks the
+categories, however many items the menu grows to.
+
+    python menu_catalog.py list
+    python menu_catalog.py add "Chicken Jalfrezi" "Pakistani Dishes" 420
+    python menu_catalog.py price 12 450
+    python menu_catalog.py disable 12
+"""
+import argparse
+import collections
+import database
+from billing import BillingEngine
+from change_feed import ChangeNotifier
+
+MenuItem = collections.namedtuple('MenuItem', ['id', 'name', 'category', 'price', 'available'])
+
+MENU_SELECT = """
+    SELECT id, name, category, price, available FROM menu_items
+    WHERE price IS NOT NULL
+    ORDER BY id
+"""
+
+
+class MenuCatalog:
+    """Every priced menu item, indexed by id and by name.
+
+    A trigger bumps menu_version whenever menu_items changes, so
+    reload_if_changed() costs one single-row read when nothing has.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.version = None
+        self.items = {}
+        self.ids = {}
+        self.load()
+
+    def current_version(self):
+        return self.conn.execute("SELECT version FROM menu_version").fetchone()[0]
+
+    def load(self):
+        """Read the whole menu into memory"""
+        # Version first: a change landing during the read is picked up next time
+        version = self.current_version()
+        items = {}
+        for row in self.conn.execute(MENU_SELECT):
+            item = MenuItem(*row)
+            if item.price == int(item.price):
+                item = item._replace(price=int(item.price))
+            items[item.id] = item
+        self.items = items
+        self.ids = {item.name: item.id for item in items.values()}
+        self.version = version
+
+    def reload_if_changed(self):
+        """Reload if the menu changed since the last load; return True if it did"""
+        if self.current_version() == self.version:
+            return False
+        self.load()
+        return True
+
+    def get(self, item_id):
+        try:
+            return self.items[item_id]
+        except KeyError:
+            raise KeyError(f"Unknown menu item id: {item_id}") from None
+
+    def by_name(self, item_name):
+        return self.get(self.ids[item_name])
+
+    def menu_items(self):
+        """Available items as {category: {item: price}}, in menu order"""
+        menu = {}
+        for item in self.items.values():
+            if item.available:
+                menu.setdefault(item.category or 'Other', {})[item.name] = item.price
+        return menu
+
+    def engine(self, **kwargs):
+        """A BillingEngine pricing against the available items"""
+        return BillingEngine(self.menu_items(), **kwargs)
+
+
+def add_item(conn, name, category, price):
+    """Add an item (or bring back one with this name) and return its id"""
+    def upsert(cursor):
+        cursor.execute("""
+            INSERT INTO menu_items (name, category, price, available) VALUES (?, ?, ?, 1)
+            ON CONFLICT (name) DO UPDATE SET category = excluded.category,
+                                             price = excluded.price, available = 1
+        """, (name, category, price))
+        cursor.execute("SELECT id FROM menu_items WHERE name = ?", (name,))
+        return cursor.fetchone()[0]
+    return database.write_transaction(conn, upsert)
+
+
+def update_item(conn, item_id, **changes):
+    """Change an item's name, category, price or availability"""
+    columns = [column for column in ('name', 'category', 'price', 'available') if column in changes]
+    if not columns:
+        return
+    assignments = ', '.join(f'{column} = ?' for column in columns)
+    params = [changes[column] for column in columns] + [item_id]
+
+    def update(cursor):
+        cursor.execute(f"UPDATE menu_items SET {assignments} WHERE id = ?", params)
+        if not cursor.rowcount:
+            raise KeyError(f"Unknown menu item id: {item_id}")
+    database.write_transaction(conn, update)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="View and edit the menu")
+    parser.add_argument('--db', default=database.DB_PATH, help="database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="show every item")
+    add = commands.add_parser('add', help="add an item")
+    add.add_argument('name')
+    add.add_argument('category')
+    add.add_argument('price', type=float)
+    price = commands.add_parser('price', help="change an item's price")
+    price.add_argument('id', type=int)
+    price.add_argument('price', type=float)
+    for command in ('enable', 'disable'):
+        commands.add_parser(command, help=f"{command} an item").add_argument('id', type=int)
+    args = parser.parse_args(argv)
+
+    conn = database.connect(args.db)
+    try:
+        if args.command == 'list':
+            for item in MenuCatalog(conn).items.values():
+                status = '' if item.available else '  (unavailable)'
+                print(f"{item.id:>5}  {item.category or 'Other':<22} {item.name:<30} Rs. {item.price}{status}")
+            return
+        if args.command == 'add':
+            print(f"Added item {add_item(conn, args.name, args.category, args.price)}")
+        elif args.command == 'price':
+            update_item(conn, args.id, price=args.price)
+        else:
+            update_item(conn, args.id, available=int(args.command == 'enable'))
+    except KeyError as e:
+        parser.exit(1, f"{e.args[0]}\n")
+    finally:
+        conn.close()
+
+    # Running terminals switch to the new menu when they hear this
+    notifier = ChangeNotifier()
+    notifier.publish('menu')
+    notifier.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Virtualized menu item grid for the New Order tab"""
+import math
+import tkinter as tk
+from tkinter import ttk
+
+
+class ItemCell:
+    """One reusable menu item tile: name, price and quantity controls"""
+
+    def __init__(self, parent, colors, on_increase, on_decrease):
+        self.item_name = None
+        self.frame = tk.Frame(parent, bg=colors['light'], relief='raised', bd=1)
+
+        # Item name and price
+        self.name_label = tk.Label(self.frame, font=('Arial', 10, 'bold'), bg=colors['light'])
+        self.name_label.pack(pady=2)
+        self.price_label = tk.Label(self.frame, font=('Arial', 9),
+                                    bg=colors['light'], fg=colors['danger'])
+        self.price_label.pack()
+
+        # Quantity controls
+        qty_frame = tk.Frame(self.frame, bg=colors['light'])
+        qty_frame.pack(pady=5)
+        tk.Button(qty_frame, text="-", font=('Arial', 10, 'bold'),
+                  bg=colors['danger'], fg='white', width=2,
+                  command=lambda: on_decrease(self.item_name)).pack(side='left')
+        self.qty_label = tk.Label(qty_frame, font=('Arial', 10), bg='white', width=3, relief='sunken')
+        self.qty_label.pack(side='left', padx=2)
+        tk.Button(qty_frame, text="+", font=('Arial', 10, 'bold'),
+                  bg=colors['success'], fg='white', width=2,
+                  command=lambda: on_increase(self.item_name)).pack(side='left')
+
+    def show(self, item_name, price, qty):
+        self.item_name = item_name
+        self.name_label.config(text=item_name)
+        self.price_label.config(text=f"Rs. {price}")
+        self.qty_label.config(text=qty)
+
+
+class VirtualMenuGrid:
+    """Scrollable grid of menu items with widgets only for the rows in view.
+
+    A small pool of row frames - just enough to fill the visible height -
+    is moved down the canvas and refilled with whichever items scroll into
+    view, so a category with a thousand dishes costs no more widgets (or
+    startup time) than one with a dozen.
+    """
+
+    def __init__(self, parent, items, colors, quantity, on_increase, on_decrease, columns=3):
+        self.items = list(items.items())
+        self.colors = colors
+        self.quantity = quantity
+        self.on_increase = on_increase
+        self.on_decrease = on_decrease
+        self.columns = columns
+        self.total_rows = math.ceil(len(self.items) / columns)
+        self.rows = []       # pool of (canvas window id, row frame, cells)
+        self.visible = {}    # item name -> cell currently showing it
+        self.shown = None    # (first row, pool size) last drawn
+
+        self.canvas = tk.Canvas(parent, bg=colors['white'])
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Every row has the same height, so one sample row sizes them all
+        self.add_row()
+        window, row_frame, cells = self.rows[0]
+        if self.items:
+            cells[0].show(*self.items[0], 0)
+        row_frame.update_idletasks()
+        self.row_height = max(row_frame.winfo_reqheight(), 1)
+        self.canvas.configure(scrollregion=(0, 0, 0, self.total_rows * self.row_height),
+                              yscrollcommand=self.on_scroll)
+
+        self.canvas.bind('<Configure>', self.on_resize)
+        # Only the grid under the pointer scrolls with the wheel
+        self.canvas.bind('<Enter>', lambda e: self.canvas.bind_all('<MouseWheel>', self.on_mousewheel))
+        self.canvas.bind('<Leave>', lambda e: self.canvas.unbind_all('<MouseWheel>'))
+        self.refresh()
+
+    def add_row(self):
+        row_frame = tk.Frame(self.canvas, bg=self.colors['white'])
+        cells = []
+        for col in range(self.columns):
+            row_frame.grid_columnconfigure(col, weight=1, uniform='item')
+            cell = ItemCell(row_frame, self.colors, self.on_increase, self.on_decrease)
+            cell.frame.grid(row=0, column=col, padx=5, pady=5, sticky='ew')
+            cells.append(cell)
+        window = self.canvas.create_window((0, 0), window=row_frame, anchor="nw",
+                                           width=self.canvas.winfo_width())
+        self.rows.append((window, row_frame, cells))
+
+    def on_resize(self, event):
+        for window, row_frame, cells in self.rows:
+            self.canvas.itemconfigure(window, width=event.width)
+        self.canvas.configure(scrollregion=(0, 0, event.width, self.total_rows * self.row_height))
+        self.refresh()
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+
+    def on_mousewheel(self, event):
+        self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+
+    def refresh(self):
+        """Move the row pool to the visible part of the grid and refill it"""
+        first_row = max(0, int(self.canvas.canvasy(0) // self.row_height))
+        needed = min(self.total_rows, self.canvas.winfo_height() // self.row_height + 2)
+        while len(self.rows) < needed:
+            self.add_row()
+        if (first_row, len(self.rows)) == self.shown:
+            return
+        self.shown = (first_row, len(self.rows))
+
+        self.visible = {}
+        for offset, (window, row_frame, cells) in enumerate(self.rows):
+            row = first_row + offset
+            if row >= self.total_rows:
+                self.canvas.itemconfigure(window, state='hidden')
+                continue
+            self.canvas.itemconfigure(window, state='normal')
+            self.canvas.coords(window, 0, row * self.row_height)
+            for col, cell in enumerate(cells):
+                index = row * self.columns + col
+                if index < len(self.items):
+                    item_name, price = self.items[index]
+                    cell.show(item_name, price, self.quantity(item_name))
+                    cell.frame.grid()
+                    self.visible[item_name] = cell
+                else:
+                    cell.frame.grid_remove()
+
+    def show_quantity(self, item_name, qty):
+        """Update an item's quantity if it is on screen"""
+        cell = self.visible.get(item_name)
+        if cell is not None:
+            cell.qty_label.config(text=qty)
@@ -0,0 +1,229 @@
+"""Latency histograms, query counts and a slow-query log for the till.
+
+Nothing here runs unless the app is started with --metrics: the handlers
+are only wrapped, and the database only opened with a timing connection,
+once a Metrics object exists, so a till without it runs exactly the
+code it always did.
+
+    python main.py --metrics metrics.prom --slow-query-log slow.log
+"""
+import bisect
+import collections
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Upper bounds of the latency buckets, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def to_ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class Histogram:
+    """Counts of observations per latency bucket, plus their sum"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) per bucket, Prometheus style"""
+        total = 0
+        bounds = [str(bound) for bound in BUCKETS] + ['+Inf']
+        result = []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile, in seconds (None past the last)"""
+        rank = fraction * self.count
+        total = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return None
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.sum, 6),
+            'p50_ms': to_ms(self.quantile(0.5)),
+            'p95_ms': to_ms(self.quantile(0.95)),
+            'p99_ms': to_ms(self.quantile(0.99)),
+            'buckets': dict(self.cumulative()),
+        }
+
+
+class Metrics:
+    """Action and query latencies for one running till.
+
+    Actions are the wrapped UI handlers; each SQL statement is charged to
+    the innermost action running on its thread ('other' outside any).
+    Query time is the time execute() takes - for a SELECT, up to its first
+    row, which is where SQLite does any sorting or index search.
+    """
+
+    def __init__(self, path=None, slow_query_log=None, slow_query_ms=100, interval=60):
+        self.path = path
+        self.interval = interval   # seconds between rewrites of the metrics file
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.slow_log = open(slow_query_log, 'a', encoding='utf-8') if slow_query_log else None
+        self.slow_queries = 0
+        self.started = datetime.datetime.now()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.actions = collections.defaultdict(Histogram)
+        self.queries = collections.defaultdict(Histogram)
+
+    def state(self):
+        """This thread's (action stack, seconds spent waiting on the user)"""
+        local = self.local
+        if not hasattr(local, 'stack'):
+            local.stack = []
+            local.waited = 0.0
+        return local
+
+    def timed(self, name, func):
+        """Wrap func so each call is recorded under the action name"""
+        def wrapper(*args, **kwargs):
+            local = self.state()
+            local.stack.append(name)
+            waited = local.waited
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                # Time the cashier spends reading a dialog is not the till being slow
+                elapsed = time.perf_counter() - started - (local.waited - waited)
+                local.stack.pop()
+                with self.lock:
+                    self.actions[name].observe(elapsed)
+        return wrapper
+
+    def instrument(self, obj, names):
+        """Replace obj's methods with timed ones (before anything binds them)"""
+        for name in names:
+            setattr(obj, name, self.timed(name, getattr(obj, name)))
+
+    def exclude_waits(self, module, names):
+        """Leave the time spent in these (blocking, modal) functions out of actions"""
+        for name in names:
+            func = getattr(module, name)
+
+            def waiting(*args, func=func, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.state().waited += time.perf_counter() - started
+            setattr(module, name, waiting)
+
+    def record_query(self, sql, seconds):
+        stack = self.state().stack
+        action = stack[-1] if stack else 'other'
+        with self.lock:
+            self.queries[action].observe(seconds)
+            if self.slow_log is not None and seconds >= self.slow_query_seconds:
+                self.slow_queries += 1
+                self.slow_log.write(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} {seconds * 1000:9.1f} ms "
+                                    f"[{action}] {' '.join(sql.split())}\n")
+                self.slow_log.flush()
+
+    def connection_factory(self):
+        """A sqlite3.Connection subclass whose statements are timed into these metrics"""
+        metrics = self
+
+        class TimedCursor(sqlite3.Cursor):
+            def execute(self, sql, parameters=()):
+                started = time.perf_counter()
+                try:
+                    return super().execute(sql, parameters)
+                finally:
+                    metrics.record_query(sql, time.perf_counter() - started)
+
+            def executemany(self, sql, seq_of_parameters):
+                started = time.perf_counter()
+                try:
+                    return super().executemany(sql, seq_of_parameters)
+                finally:
+                    metrics.record_query(sql, time.perf_counter() - started)
+
+        class TimedConnection(sqlite3.Connection):
+            def cursor(self, factory=TimedCursor):
+                return super().cursor(factory)
+
+            def execute(self, sql, parameters=()):
+                return self.cursor().execute(sql, parameters)
+
+            def executemany(self, sql, seq_of_parameters):
+                return self.cursor().executemany(sql, seq_of_parameters)
+
+        return TimedConnection
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'started': self.started.isoformat(timespec='seconds'),
+                'updated': datetime.datetime.now().isoformat(timespec='seconds'),
+                'actions': {name: histogram.summary() for name, histogram in sorted(self.actions.items())},
+                'queries': {name: histogram.summary() for name, histogram in sorted(self.queries.items())},
+                'slow_queries': self.slow_queries,
+            }
+
+    def prometheus(self):
+        """The metrics in Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for metric, help_text, histograms in (
+                    ('restaurant_action_duration_seconds', "Time the till spent in each cashier action",
+                     self.actions),
+                    ('restaurant_query_duration_seconds', "SQL statement time by the action that ran it",
+                     self.queries)):
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for name, histogram in sorted(histograms.items()):
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{metric}_bucket{{action="{name}",le="{bound}"}} {count}')
+                    lines.append(f'{metric}_sum{{action="{name}"}} {histogram.sum:.6f}')
+                    lines.append(f'{metric}_count{{action="{name}"}} {histogram.count}')
+            lines.append("# HELP restaurant_queries_total SQL statements run by each action")
+            lines.append("# TYPE restaurant_queries_total counter")
+            for name, histogram in sorted(self.queries.items()):
+                lines.append(f'restaurant_queries_total{{action="{name}"}} {histogram.count}')
+            lines.append("# HELP restaurant_slow_queries_total Statements slower than the slow-query threshold")
+            lines.append("# TYPE restaurant_slow_queries_total counter")
+            lines.append(f"restaurant_slow_queries_total {self.slow_queries}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path=None):
+        """Write the metrics file: JSON for a .json path, Prometheus text otherwise"""
+        path = path or self.path
+        if path.lower().endswith('.json'):
+            text = json.dumps(self.snapshot(), indent=2)
+        else:
+            text = self.prometheus()
+        # Write aside and rename, so a scraper never reads half a file
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+
+    def close(self):
+        if self.path:
+            self.dump()
+        if self.slow_log is not None:
+            self.slow_log.close()
@@ -0,0 +1,318 @@
+"""Local HTTP API for orders from waiter tablets and the online storefront.
+
+Orders taken here land in the same customers, orders and order_lines
+tables as the till's Save Order, priced from the same menu, and are
+announced to the tills and the kitchen the same way.
+
+    python order_api.py --port 8080
+
+    GET  /menu                      available items by category
+    GET  /customers/<phone>         a customer and their last order
+    POST /orders                    {"name": ..., "phone": ..., "items": {"Chicken Karahi": 2}}
+    GET  /bills/<bill number>       a saved bill with its lines and totals
+
+SQLite allows one writer at a time, so every order goes through a single
+GroupCommitWriter thread, which commits whatever has queued up in one
+transaction; reads run on a small thread pool, each with a connection of
+its own from a pool opened at startup. The event loop itself only parses
+HTTP and never touches the database.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import queue
+import sqlite3
+import time
+import urllib.parse
+import database
+from billing import BillNumberGenerator
+from change_feed import ChangeNotifier
+from customer_cache import load_customer
+from kitchen import KitchenPublisher
+from menu_catalog import MenuCatalog
+from order_store import GroupCommitWriter
+
+MAX_BODY = 64 * 1024
+
+# Seconds between checks that the menu has not changed under us
+MENU_CHECK_SECONDS = 1.0
+
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ConnectionPool:
+    """A fixed set of database connections lent out to worker threads.
+
+    Opening a connection costs more than the lookups the API runs, so they
+    are opened once up front. With one connection per worker thread a
+    borrower never has to wait.
+    """
+
+    def __init__(self, db_path, size):
+        self.idle = queue.Queue()
+        for _ in range(size):
+            self.idle.put(sqlite3.connect(db_path, timeout=database.BUSY_TIMEOUT, check_same_thread=False))
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.idle.get()
+        try:
+            yield conn
+        finally:
+            self.idle.put(conn)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+def bill_json(bill_number, name, phone, date, lines, totals):
+    subtotal, tax, service_charge, total = totals
+    return {
+        'bill_number': bill_number, 'name': name, 'phone': phone, 'date': date,
+        'lines': [{'item': item, 'qty': qty, 'unit_price': price, 'line_total': line_total}
+                  for item, qty, price, line_total in lines],
+        'subtotal': subtotal, 'tax': tax, 'service_charge': service_charge, 'total': total,
+    }
+
+
+def changed_menu(cursor, version):
+    """A freshly loaded MenuCatalog if the menu is no longer at version, else None"""
+    cursor.execute("SELECT version FROM menu_version")
+    if cursor.fetchone()[0] == version:
+        return None
+    return MenuCatalog(cursor.connection)
+
+
+class OrderApi:
+    """The API's routes, database access and HTTP handling"""
+
+    def __init__(self, db_path=database.DB_PATH, readers=8, kitchen_address=None):
+        conn = database.connect(db_path)
+        self.conn = conn
+        catalog = MenuCatalog(conn)
+        self.engine = catalog.engine()
+        self.menu_version = catalog.version
+        self.menu_checked = time.monotonic()
+        # The writer prices order lines from this dict, so it is updated in place
+        self.prices = dict(self.engine.prices)
+        self.bill_numbers = BillNumberGenerator(
+            database.register_terminal(conn, f"{database.default_terminal_name()}-api"))
+        self.writer = GroupCommitWriter(db_path, self.prices, item_ids=catalog.ids)
+        self.pool = ConnectionPool(db_path, readers)
+        self.executor = concurrent.futures.ThreadPoolExecutor(readers)
+        self.change_feed = ChangeNotifier()
+        self.kitchen = KitchenPublisher(kitchen_address, 'order-api') if kitchen_address else None
+        self.connections = {}   # handler task -> writer
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+        for writer in self.connections.values():
+            writer.transport.abort()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        self.writer.close()
+        self.executor.shutdown()
+        self.pool.close()
+        self.change_feed.close()
+        if self.kitchen is not None:
+            self.kitchen.close()
+        self.conn.close()
+
+    async def read(self, work, *args):
+        """Run work(cursor, *args) on a pooled connection in a worker thread"""
+        def run():
+            with self.pool.connection() as conn:
+                return work(conn.cursor(), *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, run)
+
+    async def current_engine(self):
+        """The billing engine, reloaded if the menu has changed.
+
+        The version check, and the reload when there is one, run on the read
+        pool so the event loop never waits on the database.
+        """
+        if time.monotonic() - self.menu_checked >= MENU_CHECK_SECONDS:
+            self.menu_checked = time.monotonic()
+            catalog = await self.read(changed_menu, self.menu_version)
+            # A slow check may finish after a newer one has already applied
+            if catalog is not None and catalog.version > self.menu_version:
+                self.engine = catalog.engine()
+                self.menu_version = catalog.version
+                self.prices.update(self.engine.prices)
+                self.writer.item_ids.update(catalog.ids)
+        return self.engine
+
+    # Routes
+
+    async def route(self, method, path, body):
+        parts = [urllib.parse.unquote(part) for part in path.strip('/').split('/')]
+        if parts == ['menu']:
+            self.expect(method, 'GET')
+            return 200, (await self.current_engine()).menu_items
+        if parts == ['orders']:
+            self.expect(method, 'POST')
+            return 201, await self.create_order(body)
+        if len(parts) == 2 and parts[0] == 'customers':
+            self.expect(method, 'GET')
+            return 200, await self.find_customer(parts[1])
+        if len(parts) == 2 and parts[0] == 'bills':
+            self.expect(method, 'GET')
+            return 200, await self.get_bill(parts[1])
+        raise HttpError(404, f"No such resource: {path}")
+
+    @staticmethod
+    def expect(method, allowed):
+        if method != allowed:
+            raise HttpError(405, f"Use {allowed}")
+
+    async def find_customer(self, phone):
+        record = await self.read(load_customer, phone)
+        if record is None:
+            raise HttpError(404, f"No customer with phone {phone}")
+        return {'id': record.id, 'name': record.name, 'phone': record.phone,
+                'last_order': dict(record.last_order) if record.last_order else None}
+
+    async def get_bill(self, bill_number):
+        bills = await self.read(lambda cursor: list(database.iter_saved_bills(cursor, bill_numbers=[bill_number])))
+        if not bills:
+            raise HttpError(404, f"No bill {bill_number}")
+        return bill_json(*bills[0])
+
+    async def create_order(self, body):
+        try:
+            request = json.loads(body)
+            name = request['name'].strip()
+            phone = request['phone'].strip()
+            items = request['items']
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise HttpError(400, 'Send JSON with "name", "phone" and "items" ({item: qty})') from None
+        if not name or not phone or not isinstance(items, dict) or not items:
+            raise HttpError(400, "name, phone and at least one item are required")
+        engine = await self.current_engine()
+        unknown = [item for item in items if item not in engine.prices]
+        if unknown:
+            raise HttpError(400, f"Not on the menu: {', '.join(unknown)}")
+        if not all(type(qty) is int and qty > 0 for qty in items.values()):
+            raise HttpError(400, "Quantities must be positive whole numbers")
+
+        order = engine.new_order(items)
+        bill_number = self.bill_numbers.next()
+        try:
+            customer_id, order_id = await asyncio.wrap_future(self.writer.submit(
+                bill_number, name, phone, order.to_dict(), order.totals()))
+        except sqlite3.IntegrityError as e:
+            raise HttpError(409, str(e)) from None
+
+        # Tell the tills (and the kitchen) as Save Order does
+        self.change_feed.publish('orders', customer_id)
+        if self.kitchen is not None:
+            self.kitchen.send(bill_number, name, order.to_dict())
+        bill = bill_json(bill_number, name, phone, time.strftime('%Y-%m-%d %H:%M:%S'),
+                         order.lines(), order.totals())
+        bill.update(order_id=order_id, customer_id=customer_id)
+        return bill
+
+    # HTTP/1.1 with keep-alive, just enough for JSON clients
+
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            while await self.handle_request(reader, writer):
+                pass
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            del self.connections[task]
+            writer.close()
+
+    async def handle_request(self, reader, writer):
+        """Answer one request; return whether to keep the connection open"""
+        request_line = await reader.readline()
+        if not request_line:
+            return False
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            await self.respond(writer, 400, {'error': "Malformed request line"}, False)
+            return False
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self.respond(writer, 400, {'error': "Invalid Content-Length"}, False)
+            return False
+        if length > MAX_BODY:
+            await self.respond(writer, 413, {'error': f"Body larger than {MAX_BODY} bytes"}, False)
+            return False
+        body = await reader.readexactly(length) if length else b''
+        try:
+            status, payload = await self.route(method, urllib.parse.urlsplit(target).path, body)
+        except HttpError as e:
+            status, payload = e.status, {'error': str(e)}
+        except Exception as e:
+            status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+        await self.respond(writer, status, payload, keep_alive)
+        return keep_alive
+
+    @staticmethod
+    async def respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                      f"Content-Type: application/json\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + body)
+        await writer.drain()
+
+
+async def serve(db_path, host, port, readers, kitchen_address):
+    api = OrderApi(db_path, readers, kitchen_address)
+    await api.start(host, port)
+    print(f"Order API listening on http://{host}:{port}")
+    try:
+        await api.server.serve_forever()
+    finally:
+        await api.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API for online and tablet orders")
+    parser.add_argument('--db', default=database.DB_PATH, help="database file")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--readers', type=int, default=8, help="pooled read connections (and threads)")
+    parser.add_argument('--kitchen', metavar='ADDRESS', help="also send orders to this kitchen server")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.db, args.host, args.port, args.readers, args.kitchen))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
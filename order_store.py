@@ -0,0 +1,143 @@
+"""Transactional order persistence with optional group commit"""
+import concurrent.futures
+import json
+import queue
+import threading
+import time
+import database
+
+
+class OrderStore:
+    """Saves customers and orders, one transaction per call.
+
+    A bill's customer upsert, order row and order lines commit together,
+    so a crash can never leave a customer without their order (or an order
+    without its lines), and each bill costs a single commit.
+    """
+
+    def __init__(self, conn, prices, item_ids=None):
+        self.conn = conn
+        self.prices = prices
+        self.item_ids = item_ids
+
+    def upsert_customer(self, cursor, name, phone):
+        """Return the id of the customer with this phone, adding them if new"""
+        cursor.execute("INSERT OR IGNORE INTO customers (name, phone) VALUES (?, ?)", (name, phone))
+        if cursor.rowcount:
+            return cursor.lastrowid
+        cursor.execute("SELECT id FROM customers WHERE phone = ?", (phone,))
+        return cursor.fetchone()[0]
+
+    def insert_order(self, cursor, bill_number, customer_id, order_data, totals):
+        """Insert an order and its lines, returning the new order id"""
+        subtotal, tax, service_charge, total = totals
+        cursor.execute("""
+            INSERT INTO orders (customer_id, bill_number, order_data, subtotal, tax_amount, service_charge, total_amount)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (customer_id, bill_number, json.dumps(order_data), subtotal, tax, service_charge, total))
+        order_id = cursor.lastrowid
+        database.insert_order_lines(cursor, order_id, order_data, self.prices, self.item_ids)
+        return order_id
+
+    def write(self, cursor, bill_number, customer_name, customer_phone, order_data, totals, customer_id=None):
+        if customer_id is None:
+            customer_id = self.upsert_customer(cursor, customer_name, customer_phone)
+        order_id = self.insert_order(cursor, bill_number, customer_id, order_data, totals)
+        return customer_id, order_id
+
+    def save_order(self, bill_number, customer_name, customer_phone, order_data, totals, customer_id=None):
+        """Save one order atomically and return (customer_id, order_id)"""
+        return database.write_transaction(self.conn, lambda cursor: self.write(
+            cursor, bill_number, customer_name, customer_phone, order_data, totals, customer_id))
+
+    def create_customer(self, name, phone):
+        """Add a new customer and return their id (IntegrityError if the phone exists)"""
+        def insert(cursor):
+            cursor.execute("INSERT INTO customers (name, phone) VALUES (?, ?)", (name, phone))
+            return cursor.lastrowid
+        return database.write_transaction(self.conn, insert)
+
+
+class GroupCommitWriter:
+    """Background writer that commits queued orders in batches.
+
+    submit() returns a Future at once; the writer thread gathers whatever
+    arrives within max_delay (up to max_batch orders) and saves the lot in
+    one transaction, so a burst of bills costs one fsync instead of one per
+    bill. Each order gets its own savepoint, so a bad order (for example a
+    duplicate bill number) fails alone without losing the rest of its batch.
+    """
+
+    def __init__(self, db_path, prices, max_batch=200, max_delay=0.01, item_ids=None):
+        self.db_path = db_path
+        self.prices = prices
+        self.item_ids = item_ids
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, bill_number, customer_name, customer_phone, order_data, totals, customer_id=None):
+        """Queue an order; the Future resolves to (customer_id, order_id)"""
+        future = concurrent.futures.Future()
+        self.jobs.put((future, (bill_number, customer_name, customer_phone, order_data, totals, customer_id)))
+        return future
+
+    def close(self):
+        """Flush queued orders and stop the writer thread"""
+        self.jobs.put(None)
+        self.thread.join()
+
+    def next_batch(self):
+        job = self.jobs.get()
+        if job is None:
+            return None
+        batch = [job]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                job = self.jobs.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if job is None:
+                # Finish this batch, then stop
+                self.jobs.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def run(self):
+        conn = database.connect(self.db_path)
+        store = OrderStore(conn, self.prices, self.item_ids)
+
+        def write_batch(cursor, batch):
+            results = []
+            for future, args in batch:
+                cursor.execute("SAVEPOINT order_save")
+                try:
+                    results.append((future, store.write(cursor, *args)))
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO order_save")
+                    results.append((future, e))
+                cursor.execute("RELEASE order_save")
+            return results
+
+        while True:
+            batch = self.next_batch()
+            if batch is None:
+                break
+            try:
+                results = database.write_transaction(conn, lambda cursor: write_batch(cursor, batch))
+            except Exception as e:
+                # The commit itself failed - nothing in the batch was saved
+                results = [(future, e) for future, args in batch]
+            for future, result in results:
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        conn.close()
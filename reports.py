@@ -0,0 +1,125 @@
+"""Sales reports read from the pre-aggregated daily rollups.
+
+Every saved order is added to daily_sales and daily_item_sales in the same
+transaction, so a report over years of trading reads one row per day
+instead of scanning every order. Days run from local midnight to midnight.
+
+    python reports.py sales --by month
+    python reports.py sales --by week --from 2025-08-01 --to 2025-08-31 --csv august.csv
+    python reports.py items --from 2025-08-01 --limit 20
+    python reports.py backfill
+"""
+import argparse
+import csv
+import sys
+import database
+
+# SQL naming the period a rollup day falls in
+PERIODS = {
+    'day': "day",
+    'week': "date(day, '-6 days', 'weekday 1')",  # the Monday the week starts on
+    'month': "substr(day, 1, 7)",
+}
+
+SALES_COLUMNS = ('Period', 'Orders', 'Subtotal', 'Tax', 'Service Charge', 'Revenue', 'Average Ticket')
+ITEM_COLUMNS = ('Item', 'Category', 'Quantity', 'Revenue')
+
+
+def day_range(start_date=None, end_date=None, column='day'):
+    """WHERE clause and params for an inclusive 'YYYY-MM-DD' range of rollup days"""
+    conditions, params = [], []
+    if start_date:
+        conditions.append(f"{column} >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append(f"{column} <= ?")
+        params.append(end_date)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def sales_report(cursor, by='day', start_date=None, end_date=None):
+    """Return one SALES_COLUMNS row per day, week or month, oldest first"""
+    where, params = day_range(start_date, end_date)
+    cursor.execute(f"""
+        SELECT {PERIODS[by]} AS period, SUM(orders), ROUND(SUM(subtotal), 2), ROUND(SUM(tax), 2),
+               ROUND(SUM(service_charge), 2), ROUND(SUM(revenue), 2),
+               ROUND(SUM(revenue) / SUM(orders), 2)
+        FROM daily_sales{where}
+        GROUP BY period
+        ORDER BY period
+    """, params)
+    return cursor.fetchall()
+
+
+def item_report(cursor, start_date=None, end_date=None, limit=-1):
+    """Return ITEM_COLUMNS rows for the items sold in a date range, best first"""
+    where, params = day_range(start_date, end_date, 's.day')
+    cursor.execute(f"""
+        SELECT m.name, m.category, SUM(s.qty), ROUND(SUM(s.revenue), 2) AS revenue
+        FROM daily_item_sales s
+        JOIN menu_items m ON m.id = s.item_id{where}
+        GROUP BY s.item_id
+        ORDER BY revenue DESC
+        LIMIT ?
+    """, params + [limit])
+    return cursor.fetchall()
+
+
+def backfill(conn, start_date=None, end_date=None):
+    """Rebuild the rollups for a date range (all days by default) from the orders.
+
+    Archived months are totalled from their archive files first, so their
+    days are rebuilt along with the live ones.
+    """
+    database.stage_archived_sales(conn, start_date, end_date)
+    database.write_transaction(conn, lambda cursor: database.rebuild_daily_sales(cursor, start_date, end_date,
+                                                                                  staged=True))
+    where, params = day_range(start_date, end_date)
+    return conn.execute("SELECT COUNT(*) FROM daily_sales" + where, params).fetchone()[0]
+
+
+def write_rows(columns, rows, csv_path=None):
+    """Print rows as a table, or save them as CSV"""
+    if csv_path:
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        print(f"Wrote {len(rows)} rows to {csv_path}", file=sys.stderr)
+        return
+    widths = [max([len(str(column))] + [len(str(row[i])) for row in rows]) for i, column in enumerate(columns)]
+    print("  ".join(str(column).ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sales reports from the daily rollups")
+    parser.add_argument('--db', default=database.DB_PATH, help="database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    sales = commands.add_parser('sales', help="revenue and order counts per period")
+    sales.add_argument('--by', choices=list(PERIODS), default='day')
+    items = commands.add_parser('items', help="quantity and revenue per menu item")
+    items.add_argument('--limit', type=int, default=-1, help="show only the top N items")
+    rebuild = commands.add_parser('backfill', help="rebuild the rollups from the orders")
+    for command in (sales, items, rebuild):
+        command.add_argument('--from', dest='start', metavar='YYYY-MM-DD', help="first day")
+        command.add_argument('--to', dest='end', metavar='YYYY-MM-DD', help="last day")
+    for command in (sales, items):
+        command.add_argument('--csv', metavar='FILE', help="save the report as CSV")
+    args = parser.parse_args(argv)
+
+    conn = database.connect(args.db)
+    try:
+        if args.command == 'backfill':
+            print(f"Rebuilt {backfill(conn, args.start, args.end)} days of sales")
+        elif args.command == 'sales':
+            write_rows(SALES_COLUMNS, sales_report(conn.cursor(), args.by, args.start, args.end), args.csv)
+        else:
+            write_rows(ITEM_COLUMNS, item_report(conn.cursor(), args.start, args.end, args.limit), args.csv)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
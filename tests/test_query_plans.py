@@ -0,0 +1,67 @@
+"""The hot queries' EXPLAIN QUERY PLAN on a freshly migrated database"""
+import os
+import tempfile
+import unittest
+
+import database
+
+
+class QueryPlanTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.conn = database.connect(os.path.join(directory.name, 'billing.db'))
+        self.addCleanup(self.conn.close)
+        self.cursor = self.conn.cursor()
+
+    def test_migrated_to_latest_schema(self):
+        self.cursor.execute("PRAGMA user_version")
+        self.assertEqual(self.cursor.fetchone()[0], database.SCHEMA_VERSION)
+
+    def test_expected_plans(self):
+        for name, (sql, params, expected) in database.EXPECTED_PLANS.items():
+            with self.subTest(name):
+                self.assertIn(expected, database.query_plan(self.cursor, sql, params))
+        self.assertEqual(database.check_query_plans(self.conn), {})
+
+    def test_search_walks_never_sort(self):
+        pattern = database.like_pattern('khan')
+        walks = {
+            'search': (f"{database.CUSTOMER_LIKE_WHERE} OR {database.BILL_LIKE_WHERE}", (pattern,) * 3),
+            'bill_prefix': (database.BILL_RANGE_WALK_WHERE, ('BILL', 'BILM')),
+            'bill_prefix_window': (database.ORDER_DATE_WINDOW_WHERE + database.BILL_RANGE_WALK_WHERE,
+                                   database.bill_order_dates('BILL2025') + ('BILL2025', 'BILL2026')),
+        }
+        pages = [(None, 'DESC', ()),
+                 (database.OrderPager.OLDER_THAN, 'DESC', ('2025-06-01 00:00:00', 1)),
+                 (database.OrderPager.NEWER_THAN, 'ASC', ('2025-06-01 00:00:00', 1))]
+        for name, (where, params) in walks.items():
+            for key_clause, direction, key in pages:
+                with self.subTest(name, key_clause=key_clause):
+                    sql = database.order_history_query(where, key_clause, direction)
+                    plan = database.query_plan(self.cursor, sql, params + key + (50,))
+                    self.assertTrue(any('USING INDEX idx_orders_date' in line for line in plan), plan)
+                    self.assertFalse(any('TEMP B-TREE' in line for line in plan), plan)
+
+    def test_search_pager_pages(self):
+        self.cursor.execute("INSERT INTO customers (name, phone) VALUES ('Ali Khan', '03001234567')")
+        customer_id = self.cursor.lastrowid
+        for day in range(1, 4):
+            self.cursor.execute(
+                "INSERT INTO orders (customer_id, bill_number, subtotal, tax_amount, service_charge, "
+                "total_amount, order_date) VALUES (?, ?, 100, 0, 0, 100, ?)",
+                (customer_id, f'BILL202506{day:02d}120000010001', f'2025-06-{day:02d} 12:00:00'))
+        for term in ('khan', '0300', 'BILL202506', 'BILL2025060', 'Bill'):
+            with self.subTest(term):
+                pager = database.order_search_pager(self.cursor, term, page_size=2)
+                first = pager.first()
+                self.assertEqual([row[0][:12] for row in first], ['BILL20250603', 'BILL20250602'])
+                older = pager.older(database.row_key(first[-1]))
+                self.assertEqual([row[0][:12] for row in older], ['BILL20250601'])
+                self.assertEqual(pager.newer(database.row_key(older[0])), first)
+        self.assertEqual(database.order_search_pager(self.cursor, 'BILL2025023').first(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()